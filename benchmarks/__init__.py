@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for nsw_fuel. These are not part of the installed
+package; run them from the repository root, e.g.
+``python -m benchmarks.timestamps``.
+"""
@@ -0,0 +1,70 @@
+"""
+Times evaluating a large number of alert rules against a state-wide
+snapshot, and against the prices changed by a following poll, and
+replacing a tenth of the rules.
+
+    python -m benchmarks.alerts [rules]
+"""
+import random
+import sys
+import time
+from typing import List
+
+from nsw_fuel import AlertEngine, AlertRule, GetFuelPricesResponse, Price
+
+from .synthetic import FUEL_TYPES, fuel_prices_payload
+
+
+def main(rules: int = 1000000) -> None:
+    rng = random.Random(0)
+    response = GetFuelPricesResponse.deserialize(fuel_prices_payload())
+    stations = [s for s in response.stations if s.latitude is not None]
+
+    start = time.perf_counter()
+    engine = AlertEngine(stations)
+    added: List[AlertRule] = []
+    for i in range(rules):
+        station = rng.choice(stations)
+        fuel_type = rng.choice(FUEL_TYPES)
+        below = rng.uniform(120.0, 220.0)
+        if i % 2:
+            rule = AlertRule(i, fuel_type, below, station_code=station.code)
+        else:
+            rule = AlertRule(
+                i, fuel_type, below, latitude=station.latitude,
+                longitude=station.longitude, radius=rng.uniform(1.0, 10.0))
+        engine.add_rule(rule)
+        added.append(rule)
+    print('{} rules added in {:.2f}s'.format(
+        rules, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    matches = engine.evaluate(response.prices)
+    print('{} prices: {} matches in {:.3f}s'.format(
+        len(response.prices), len(matches), time.perf_counter() - start))
+
+    # A poll cycle: a tenth of the prices move by a few cents.
+    changed = [
+        Price(price.fuel_type, price.price + rng.uniform(-10.0, 10.0),
+              price.last_updated, price.price_unit, price.station_code)
+        for price in rng.sample(list(response.prices),
+                                len(response.prices) // 10)]
+    start = time.perf_counter()
+    matches = engine.evaluate(changed)
+    print('{} changed prices: {} matches in {:.3f}s'.format(
+        len(changed), len(matches), time.perf_counter() - start))
+
+    # Users edit their alerts: a tenth of the rules are replaced.
+    start = time.perf_counter()
+    for rule in rng.sample(added, rules // 10):
+        engine.remove_rule(rule)
+        engine.add_rule(AlertRule(
+            rule.id, rule.fuel_type, rule.below - 5.0, rule.station_code,
+            rule.latitude, rule.longitude, rule.radius))
+    matches = engine.evaluate(changed)
+    print('{} rules replaced, then re-evaluated in {:.3f}s'.format(
+        rules // 10, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
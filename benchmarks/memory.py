@@ -0,0 +1,187 @@
+"""
+Measures the memory retained by deserialized state-wide snapshots, once
+the decoded JSON has been released, against the previous dict backed
+DTOs.
+
+    python -m benchmarks.memory [scale]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from nsw_fuel import GetFuelPricesResponse, GetReferenceDataResponse
+
+from .synthetic import (
+    STATE_STATIONS, fuel_prices_payload, reference_data_payload)
+
+
+class LegacyPrice(object):
+    def __init__(self, fuel_type: str, price: float,
+                 last_updated: Optional[datetime], price_unit: Optional[str],
+                 station_code: Optional[int]) -> None:
+        self.fuel_type = fuel_type
+        self.price = price
+        self.last_updated = last_updated
+        self.price_unit = price_unit
+        self.station_code = station_code
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyPrice':
+        lastupdated = None
+        try:
+            lastupdated = datetime.strptime(
+                data['lastupdated'], '%d/%m/%Y %H:%M:%S')
+        except ValueError:
+            pass
+        try:
+            lastupdated = datetime.strptime(
+                data['lastupdated'], '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+
+        station_code: Optional[int] = None
+        if 'stationcode' in data:
+            station_code = int(data['stationcode'])
+
+        return LegacyPrice(
+            fuel_type=data['fueltype'],
+            price=data['price'],
+            last_updated=lastupdated,
+            price_unit=data.get('priceunit'),
+            station_code=station_code
+        )
+
+
+class LegacyStation(object):
+    # Carries the location as well, so that both sides hold the same fields.
+    def __init__(self, id: Optional[str], brand: str, code: int, name: str,
+                 address: str, latitude: Optional[float],
+                 longitude: Optional[float]) -> None:
+        self.id = id
+        self.brand = brand
+        self.code = code
+        self.name = name
+        self.address = address
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyStation':
+        location = data.get('location') or {}
+        latitude = location.get('latitude')
+        longitude = location.get('longitude')
+        return LegacyStation(
+            id=data.get('stationid'),
+            brand=data['brand'],
+            code=int(data['code']),
+            name=data['name'],
+            address=data['address'],
+            latitude=None if latitude is None else float(latitude),
+            longitude=None if longitude is None else float(longitude),
+        )
+
+
+class LegacyCode(object):
+    # Stands in for FuelType and SortField, which had the same shape.
+    def __init__(self, code: str, name: str) -> None:
+        self.code = code
+        self.name = name
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyCode':
+        return LegacyCode(code=data['code'], name=data['name'])
+
+
+class LegacyTrendPeriod(object):
+    def __init__(self, period: str, description: str) -> None:
+        self.period = period
+        self.description = description
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyTrendPeriod':
+        return LegacyTrendPeriod(
+            period=data['period'],
+            description=data['description']
+        )
+
+
+class LegacyReferenceData(object):
+    def __init__(self, stations: List[LegacyStation], brands: List[str],
+                 fuel_types: List[LegacyCode],
+                 trend_periods: List[LegacyTrendPeriod],
+                 sort_fields: List[LegacyCode]) -> None:
+        self.stations = stations
+        self.brands = brands
+        self.fuel_types = fuel_types
+        self.trend_periods = trend_periods
+        self.sort_fields = sort_fields
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyReferenceData':
+        return LegacyReferenceData(
+            stations=[LegacyStation.deserialize(x)
+                      for x in data['stations']['items']],
+            brands=[x['name'] for x in data['brands']['items']],
+            fuel_types=[LegacyCode.deserialize(x)
+                        for x in data['fueltypes']['items']],
+            trend_periods=[LegacyTrendPeriod.deserialize(x)
+                           for x in data['trendperiods']['items']],
+            sort_fields=[LegacyCode.deserialize(x)
+                         for x in data['sortfields']['items']],
+        )
+
+
+class LegacyFuelPrices(object):
+    def __init__(self, stations: List[LegacyStation],
+                 prices: List[LegacyPrice]) -> None:
+        self.stations = stations
+        self.prices = prices
+
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any]) -> 'LegacyFuelPrices':
+        return LegacyFuelPrices(
+            stations=[LegacyStation.deserialize(x) for x in data['stations']],
+            prices=[LegacyPrice.deserialize(x) for x in data['prices']],
+        )
+
+
+def _measure(build: Callable[[], object]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before) / 2 ** 20
+
+
+def main(scale: int = 10) -> None:
+    stations = STATE_STATIONS * scale
+    prices = json.dumps(fuel_prices_payload(stations))
+    lovs = json.dumps(reference_data_payload(stations))
+    print('{} stations, {} prices'.format(
+        stations, len(json.loads(prices)['prices'])))
+    cases = [
+        ('GetFuelPricesResponse',
+         lambda: LegacyFuelPrices.deserialize(json.loads(prices)),
+         lambda: GetFuelPricesResponse.deserialize(json.loads(prices))),
+        ('GetReferenceDataResponse',
+         lambda: LegacyReferenceData.deserialize(json.loads(lovs)),
+         lambda: GetReferenceDataResponse.deserialize(json.loads(lovs))),
+    ]
+    print('{:<28}{:>14}{:>14}{:>10}'.format(
+        '', 'previous MiB', 'current MiB', 'ratio'))
+    for name, legacy, current in cases:
+        baseline = _measure(legacy)
+        retained = _measure(current)
+        print('{:<28}{:>14.2f}{:>14.2f}{:>9.2f}x'.format(
+            name, baseline, retained, retained / baseline))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,224 @@
+"""
+Times deserialization and the client's hot paths against synthetic payloads
+at multiples of the state's size, and saves the results as JSON so that
+runs from different versions can be compared.
+
+    python -m benchmarks.suite [--scales 1 10 100] [--repeat 5]
+                               [--output results.json]
+                               [--compare baseline.json]
+
+The client is benchmarked against a local mock server, so the timings
+include HTTP and JSON decoding but no network latency.
+"""
+import argparse
+import datetime
+import json
+import platform
+import os
+import statistics
+import tempfile
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+import nsw_fuel
+from nsw_fuel import (
+    AveragePrice, CheapestIndex, FuelCheckClient, GetFuelPricesResponse,
+    GetReferenceDataResponse, Price, StationIndex)
+from nsw_fuel import snapshot
+from nsw_fuel.decode import available_decoders
+from nsw_fuel_tests.server import MockServer
+
+from .synthetic import (
+    STATE_STATIONS, fuel_prices_payload, reference_data_payload,
+    trends_payload)
+
+Result = Dict[str, Any]
+
+
+def _time(name: str, scale: int, items: int, fn: Callable[[], Any],
+          repeat: int) -> Result:
+    timings = timeit.repeat(fn, number=1, repeat=repeat)
+    best = min(timings)
+    return {
+        'name': name,
+        'scale': scale,
+        'items': items,
+        'best': best,
+        'mean': statistics.mean(timings),
+        'items_per_second': items / best if best else None,
+    }
+
+
+def _nearby_payload(prices: Dict[str, Any]) -> Dict[str, Any]:
+    # A /prices/nearby response with every E10 price. Unlike /prices, it
+    # gives station codes as numbers.
+    e10 = [dict(price, stationcode=int(price['stationcode']))
+           for price in prices['prices'] if price['fueltype'] == 'E10']
+    codes = {price['stationcode'] for price in e10}
+    return {
+        'stations': [dict(station, code=int(station['code']))
+                     for station in prices['stations']
+                     if int(station['code']) in codes],
+        'prices': e10,
+    }
+
+
+def run_scale(scale: int, repeat: int) -> List[Result]:
+    stations = STATE_STATIONS * scale
+    prices = fuel_prices_payload(stations)
+    lovs = reference_data_payload(stations)
+    average_prices = trends_payload()['AveragePrices'] * scale
+    nearby = _nearby_payload(prices)
+
+    def deserialize_prices() -> None:
+        for price in prices['prices']:
+            Price.deserialize(price)
+
+    def read_lazy_prices() -> None:
+        # The common case of reading only a couple of fields.
+        for price in GetFuelPricesResponse.deserialize(
+                prices, lazy=True).prices:
+            price.price, price.station_code
+
+    def deserialize_average_prices() -> None:
+        for average_price in average_prices:
+            AveragePrice.deserialize(average_price)
+
+    prices_body = json.dumps(prices).encode('utf-8')
+    lovs_body = json.dumps(lovs).encode('utf-8')
+
+    results = []
+    for label, body in [('/prices', prices_body), ('/lovs', lovs_body)]:
+        # What response.json() did: decode to text, then parse the text.
+        results.append(_time(
+            'json.loads(text) {}'.format(label), scale, len(body),
+            lambda body=body: json.loads(body.decode('utf-8')), repeat))
+        for name, decoder in available_decoders().items():
+            results.append(_time(
+                '{}(bytes) {}'.format(name, label), scale, len(body),
+                lambda body=body, decoder=decoder: decoder(body), repeat))
+
+    results += [
+        _time('GetFuelPricesResponse.deserialize', scale,
+              len(prices['prices']),
+              lambda: GetFuelPricesResponse.deserialize(prices), repeat),
+        _time('GetFuelPricesResponse.deserialize(lazy=True)', scale,
+              len(prices['prices']), read_lazy_prices, repeat),
+        _time('GetReferenceDataResponse.deserialize', scale, stations,
+              lambda: GetReferenceDataResponse.deserialize(lovs), repeat),
+        _time('Price.deserialize', scale, len(prices['prices']),
+              deserialize_prices, repeat),
+        _time('AveragePrice.deserialize', scale, len(average_prices),
+              deserialize_average_prices, repeat),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'prices.snapshot')
+        snapshot.save(GetFuelPricesResponse.deserialize(prices), path)
+        results.append(_time(
+            'snapshot.load_fuel_prices', scale, len(prices['prices']),
+            lambda: snapshot.load_fuel_prices(path), repeat))
+
+    response = GetFuelPricesResponse.deserialize(prices)
+    index = CheapestIndex.from_response(response)
+    # A poll's worth of changes: a tenth of the prices move. Updates
+    # alternate between two sets, so every update changes a price.
+    update_sets = [
+        [Price(price.fuel_type, price.price + change, price.last_updated,
+               price.price_unit, price.station_code)
+         for price in response.prices[::10]]
+        for change in (-0.5, 0.5)]
+    updated_prices = list(response.prices)
+    updated_prices[::10] = update_sets[0]
+
+    def update_index() -> None:
+        update_sets.reverse()
+        index.update_prices(update_sets[0])
+
+    def sort_cheapest() -> None:
+        sorted((price for price in response.prices
+                if price.fuel_type == 'E10'),
+               key=lambda price: price.price)[:10]
+
+    # Sydney to Albury, the length of the Hume Highway, as 500 points.
+    route = [(-33.87 - 2.2 * i / 499, 151.21 - 4.3 * i / 499)
+             for i in range(500)]
+    station_index = StationIndex(response.stations, response.prices)
+
+    results.extend([
+        _time('StationIndex.get_fuel_prices_along_route', scale, len(route),
+              lambda: station_index.get_fuel_prices_along_route(
+                  route, 5, 'E10'), repeat),
+        _time('sorted cheapest E10', scale, len(prices['prices']),
+              sort_cheapest, repeat),
+        _time('CheapestIndex.cheapest', scale, 10,
+              lambda: index.cheapest('E10', 10), repeat),
+        _time('CheapestIndex.update_prices', scale, len(update_sets[0]),
+              update_index, repeat),
+        _time('CheapestIndex rebuild after update', scale,
+              len(updated_prices),
+              lambda: CheapestIndex(response.stations, updated_prices),
+              repeat),
+    ])
+
+    with MockServer() as server, \
+            FuelCheckClient(base_url=server.url, coalesce=False) as client:
+        server.add('POST', '/prices/nearby', nearby)
+        results.append(_time(
+            'FuelCheckClient.get_fuel_prices_within_radius', scale,
+            len(nearby['prices']),
+            lambda: client.get_fuel_prices_within_radius(
+                -33.8688, 151.2093, 10000, 'E10'),
+            repeat))
+
+    return results
+
+
+def _print(results: List[Result],
+           baseline: Optional[List[Result]] = None) -> None:
+    previous = {(result['name'], result['scale']): result['best']
+                for result in baseline or []}
+    print('{:<48}{:>6}{:>10}{:>12}{:>10}'.format(
+        '', 'scale', 'items', 'seconds', 'change'))
+    for result in results:
+        before = previous.get((result['name'], result['scale']))
+        change = '' if before is None else '{:+.1%}'.format(
+            result['best'] / before - 1)
+        print('{:<48}{:>5}x{:>10}{:>12.4f}{:>10}'.format(
+            result['name'], result['scale'], result['items'],
+            result['best'], change))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='Multiples of the state station count')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='File to save JSON results to')
+    parser.add_argument('--compare',
+                        help='JSON results of a previous run to compare to')
+    args = parser.parse_args(argv)
+
+    results: List[Result] = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    _print(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'version': nsw_fuel.__version__,
+                'python': platform.python_version(),
+                'created': datetime.datetime.now().isoformat(),
+                'repeat': args.repeat,
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic, state-sized API payloads for benchmarking."""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+# Roughly the size of the NSW FuelCheck station list.
+STATE_STATIONS = 2500
+
+FUEL_TYPES = ['E10', 'U91', 'P95', 'P98', 'DL', 'PDL', 'LPG', 'E85']
+BRANDS = ['Ampol', 'BP', 'Caltex', 'Coles Express', 'Costco', 'Metro Fuel',
+          'Shell', 'United', '7-Eleven', 'Independent']
+SUBURBS = ['Hurstville', 'Kogarah', 'Parramatta', 'Penrith', 'Newcastle',
+           'Wollongong', 'Dubbo', 'Orange', 'Albury', 'Tamworth']
+
+_EPOCH = datetime(2018, 6, 1)
+
+
+def _stations(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    stations = []
+    for code in range(1, count + 1):
+        brand = rng.choice(BRANDS)
+        suburb = rng.choice(SUBURBS)
+        stations.append({
+            'stationid': 'S{:07d}'.format(code),
+            'brandid': 'B{:07d}'.format(BRANDS.index(brand)),
+            'brand': brand,
+            'code': str(code),
+            'name': '{} {}'.format(brand, suburb),
+            'address': '{} Fake Street, {} NSW 2000'.format(code, suburb),
+            'location': {
+                'latitude': rng.uniform(-37.5, -28.2),
+                'longitude': rng.uniform(141.0, 153.6),
+            },
+        })
+    return stations
+
+
+def _timestamp(rng: random.Random, iso: bool) -> str:
+    # Prices are updated in bursts, so timestamps repeat across stations.
+    dt = _EPOCH + timedelta(minutes=rng.randrange(0, 7 * 24 * 60, 5))
+    if iso:
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    return dt.strftime('%d/%m/%Y %H:%M:%S')
+
+
+def fuel_prices_payload(stations: int = STATE_STATIONS,
+                        seed: int = 0) -> Dict[str, Any]:
+    """A ``/prices`` response with 2-6 prices per station."""
+    rng = random.Random(seed)
+    serialized_stations = _stations(stations, rng)
+    prices = []
+    for station in serialized_stations:
+        for fuel_type in rng.sample(FUEL_TYPES, rng.randint(2, 6)):
+            prices.append({
+                'stationcode': station['code'],
+                'fueltype': fuel_type,
+                'price': round(rng.uniform(130.0, 220.0), 1),
+                'priceunit': 'litre',
+                'lastupdated': _timestamp(rng, iso=rng.random() < 0.5),
+            })
+    return {'stations': serialized_stations, 'prices': prices}
+
+
+def reference_data_payload(stations: int = STATE_STATIONS,
+                           seed: int = 0) -> Dict[str, Any]:
+    """A ``/lovs`` response."""
+    rng = random.Random(seed)
+    return {
+        'brands': {'items': [{'name': brand} for brand in BRANDS]},
+        'fueltypes': {'items': [
+            {'code': code, 'name': code} for code in FUEL_TYPES]},
+        'stations': {'items': _stations(stations, rng)},
+        'trendperiods': {'items': [
+            {'period': period, 'description': period}
+            for period in ['Day', 'Week', 'Month', 'Year']]},
+        'sortfields': {'items': [
+            {'code': 'Price', 'name': 'Price'},
+            {'code': 'Distance', 'name': 'Distance'}]},
+    }
+
+
+def trends_payload(fuel_types: List[str] = FUEL_TYPES,
+                   seed: int = 0) -> Dict[str, Any]:
+    """A ``/prices/trends/`` response."""
+    rng = random.Random(seed)
+    periods = ['Day', 'Week', 'Month', 'Year']
+    average_prices = []
+    for code in fuel_types:
+        for day in range(31):
+            captured = _EPOCH - timedelta(days=day)
+            average_prices.append({
+                'Code': code, 'Period': 'Month',
+                'Price': round(rng.uniform(130.0, 220.0), 1),
+                'Captured': captured.strftime('%Y-%m-%d'),
+            })
+        for month in range(1, 13):
+            average_prices.append({
+                'Code': code, 'Period': 'Year',
+                'Price': round(rng.uniform(130.0, 220.0), 1),
+                'Captured': datetime(2017, month, 1).strftime('%B %Y'),
+            })
+    return {
+        'Variances': [
+            {'Code': code, 'Period': period,
+             'Price': round(rng.uniform(-5.0, 5.0), 1)}
+            for code in fuel_types for period in periods],
+        'AveragePrices': average_prices,
+    }
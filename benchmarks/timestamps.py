@@ -0,0 +1,81 @@
+"""
+Compares Price.deserialize against the previous strptime based
+implementation on a synthetic 10k station feed.
+
+    python -m benchmarks.timestamps
+"""
+import timeit
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from nsw_fuel import Price
+from nsw_fuel.dto import _parse_last_updated
+
+from .synthetic import fuel_prices_payload
+
+
+def legacy_deserialize(data: Dict[str, Any]) -> Price:
+    lastupdated = None
+    try:
+        lastupdated = datetime.strptime(
+            data['lastupdated'], '%d/%m/%Y %H:%M:%S')
+    except ValueError:
+        pass
+    try:
+        lastupdated = datetime.strptime(
+            data['lastupdated'], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        pass
+
+    station_code: Optional[int] = None
+    if 'stationcode' in data:
+        station_code = int(data['stationcode'])
+
+    return Price(
+        fuel_type=data['fueltype'],
+        price=data['price'],
+        last_updated=lastupdated,
+        price_unit=data.get('priceunit'),
+        station_code=station_code
+    )
+
+
+def _best_of(fn: Any, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main(stations: int = 10000, repeat: int = 5) -> None:
+    prices: List[Dict[str, Any]] = fuel_prices_payload(stations)['prices']
+
+    legacy = [legacy_deserialize(p) for p in prices]
+    current = [Price.deserialize(p) for p in prices]
+    assert [p.last_updated for p in legacy] == \
+        [p.last_updated for p in current]
+
+    def run_legacy() -> None:
+        for p in prices:
+            legacy_deserialize(p)
+
+    def run_cold() -> None:
+        _parse_last_updated.cache_clear()
+        for p in prices:
+            Price.deserialize(p)
+
+    def run_warm() -> None:
+        for p in prices:
+            Price.deserialize(p)
+
+    baseline = _best_of(run_legacy, repeat)
+    print('{} prices from {} stations'.format(len(prices), stations))
+    print('{:<28}{:>10}{:>10}'.format('', 'seconds', 'speedup'))
+    print('{:<28}{:>10.4f}{:>9.1f}x'.format(
+        'strptime (previous)', baseline, 1.0))
+    for name, fn in [('fast path, cold cache', run_cold),
+                     ('fast path, warm cache', run_warm)]:
+        elapsed = _best_of(fn, repeat)
+        print('{:<28}{:>10.4f}{:>9.1f}x'.format(
+            name, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
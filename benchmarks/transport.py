@@ -0,0 +1,104 @@
+"""
+Compares the client's transports against local servers: sequential
+station lookups, a concurrent batch of lookups to a server which takes
+20ms per request, and a state-wide prices download.
+
+    python -m benchmarks.transport [--stations 200] [--workers 50]
+
+``requests``, ``http.client`` and ``httpx`` over HTTP/1.1 are run against
+:class:`nsw_fuel_tests.server.MockServer`, and ``httpx`` over HTTP/2
+against :class:`nsw_fuel_tests.h2server.H2Server`. The HTTP/1.1 transports
+hold at most ``--pool-size`` connections, while HTTP/2 multiplexes every
+concurrent lookup over one.
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, List, Optional
+
+import httpx
+
+from nsw_fuel import (
+    FuelCheckClient, HttpClientTransport, HttpxTransport, RequestsTransport,
+    Transport)
+from nsw_fuel_tests.h2server import H2Server
+from nsw_fuel_tests.server import MockServer
+
+from .synthetic import fuel_prices_payload
+
+LATENCY = 0.02
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _run(name: str, server: Any, transport: Transport, stations: List[int],
+         workers: int, repeat: int) -> None:
+    with FuelCheckClient(base_url=server.url, transport=transport,
+                         coalesce=False) as client:
+        sequential = _best(lambda: [
+            client.get_fuel_prices_for_station(code)
+            for code in stations], repeat)
+        batch = _best(lambda: client.get_fuel_prices_for_stations(
+            [code + 1000000 for code in stations], max_workers=workers,
+            full_fetch_threshold=None), repeat)
+        full = _best(client.get_fuel_prices, repeat)
+    transport.close()
+    print('{:<22}{:>14.1f}{:>14.1f}{:>14.1f}{:>8}'.format(
+        name, sequential * 1000, batch * 1000, full * 1000,
+        len(server.connections)))
+
+
+def _serve(server: Any, stations: List[int], prices: bytes) -> None:
+    station_prices = json.dumps({'prices': []}).encode('utf-8')
+    for code in stations:
+        server.add('GET', '/prices/station/{}'.format(code),
+                   body=station_prices)
+        server.add('GET', '/prices/station/{}'.format(code + 1000000),
+                   body=station_prices, delay=LATENCY)
+    server.add('GET', '/prices', body=prices)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--stations', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=50)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    stations = list(range(1, args.stations + 1))
+    prices = json.dumps(fuel_prices_payload()).encode('utf-8')
+    pool_size = args.pool_size
+
+    print('{:<22}{:>14}{:>14}{:>14}{:>8}'.format(
+        'transport', 'sequential ms', 'batch ms', '/prices ms', 'conns'))
+    transports = [
+        ('requests', lambda: RequestsTransport(pool_size=pool_size)),
+        ('http.client', lambda: HttpClientTransport(pool_size=pool_size)),
+        ('httpx HTTP/1.1', lambda: HttpxTransport(
+            http2=False, pool_size=pool_size)),
+    ]
+    for name, create in transports:
+        with MockServer() as server:
+            _serve(server, stations, prices)
+            _run(name, server, create(), stations, args.workers,
+                 args.repeat)
+
+    with H2Server() as h2_server:
+        _serve(h2_server, stations, prices)
+        # Cleartext HTTP/2 needs prior knowledge, so HTTP/1.1 is disabled.
+        client = httpx.Client(http1=False, http2=True)
+        _run('httpx HTTP/2', h2_server, HttpxTransport(client=client),
+             stations, args.workers, args.repeat)
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,35 @@
+from .alerts import AlertEngine, AlertMatch, AlertRule
+from .async_client import AsyncFuelCheckClient
+from .cache import ReferenceDataCache
+from .cheapest import CheapestIndex
 from .client import FuelCheckClient
+from .delta import PriceDelta, PriceDeltaSync
+from .history import PriceHistory
+from .instrument import (
+    LoggingObserver, MetricsObserver, MetricsRegistry, Observer)
+from .ratelimit import RetryPolicy, TokenBucket
+from .shared import SharedPriceCache
+from .spatial import StationIndex
+from .table import PriceTable
+from .transport import (
+    HttpClientTransport, HttpxTransport, RequestsTransport, Transport,
+    TransportError)
+from .trends import TrendEngine
 from .dto import (
     AveragePrice, Variance, Station, Period, Price, FuelCheckError,
     GetFuelPricesResponse, FuelType, GetReferenceDataResponse,
-    SortField, TrendPeriod
+    SortField, TrendPeriod, FuelPrices, ReferenceData
 )
 
-__all__ = ["FuelCheckClient", "AveragePrice", "Variance", "Station", "Period",
-           "Price", "FuelCheckError", "GetFuelPricesResponse", "FuelType",
-           "GetReferenceDataResponse", "SortField", "TrendPeriod"]
+__all__ = ["FuelCheckClient", "AsyncFuelCheckClient", "AveragePrice",
+           "Variance", "Station", "Period", "Price", "FuelCheckError",
+           "GetFuelPricesResponse", "FuelType", "GetReferenceDataResponse",
+           "SortField", "TrendPeriod", "PriceDelta", "PriceDeltaSync",
+           "PriceTable", "StationIndex", "ReferenceDataCache",
+           "RetryPolicy", "TokenBucket", "Observer", "LoggingObserver",
+           "MetricsObserver", "MetricsRegistry", "PriceHistory",
+           "TrendEngine", "SharedPriceCache", "AlertEngine", "AlertRule",
+           "AlertMatch", "CheapestIndex", "Transport", "TransportError",
+           "RequestsTransport", "HttpxTransport", "HttpClientTransport",
+           "FuelPrices", "ReferenceData"]
 __version__ = "0.0.0-dev"
@@ -0,0 +1,264 @@
+"""
+Price alerts: rules such as "E10 at station 1234 below 170" or "any U91
+within 5km of here below 165", evaluated against price changes.
+"""
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from typing import (
+    Any, DefaultDict, Dict, Hashable, Iterable, List, NamedTuple, Optional,
+    Tuple)
+
+from .dto import Price, Station
+from .spatial import Cell, _KM_PER_DEGREE, haversine_km
+
+PriceKey = Tuple[int, str]
+
+
+class AlertRule(object):
+    """
+    A rule matching when the price of a fuel drops below ``below``, either
+    at one station or at any station within ``radius`` km of a point.
+
+    :param id: Identifies the rule to its owner, e.g. a user and alert id.
+    """
+    __slots__ = ('id', 'fuel_type', 'below', 'station_code', 'latitude',
+                 'longitude', 'radius')
+
+    def __init__(self, id: Hashable, fuel_type: str, below: float,
+                 station_code: Optional[int] = None,
+                 latitude: Optional[float] = None,
+                 longitude: Optional[float] = None,
+                 radius: Optional[float] = None) -> None:
+        has_area = (latitude, longitude, radius) != (None, None, None)
+        if (station_code is None) == (not has_area):
+            raise ValueError(
+                'A rule needs either a station code or an area')
+        if has_area and None in (latitude, longitude, radius):
+            raise ValueError(
+                'An area needs a latitude, longitude and radius')
+        self.id = id
+        self.fuel_type = fuel_type
+        self.below = below
+        self.station_code = station_code
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+
+    def __repr__(self) -> str:
+        return '<AlertRule id={} fuel_type={} below={}>'.format(
+            self.id, self.fuel_type, self.below)
+
+
+AlertMatch = NamedTuple('AlertMatch', [
+    ('rule', AlertRule),
+    ('price', Price),
+    # The distance from an area rule's centre to the station, in km.
+    ('distance', Optional[float]),
+])
+
+
+class _RuleList(object):
+    """
+    Rules kept sorted by threshold. Changes are applied lazily: added rules
+    are sorted in, and removed ones dropped, on the next lookup.
+    """
+    __slots__ = ('thresholds', 'rules', 'counts', 'removed', 'is_sorted')
+
+    def __init__(self) -> None:
+        self.thresholds: List[float] = []
+        self.rules: List[AlertRule] = []
+        # How many times each rule is in the list, once removals apply.
+        self.counts: Dict[AlertRule, int] = {}
+        # Removed rules still in ``rules``, and how many times.
+        self.removed: Dict[AlertRule, int] = {}
+        self.is_sorted = True
+
+    def add(self, rule: AlertRule) -> None:
+        self.thresholds.append(rule.below)
+        self.rules.append(rule)
+        self.counts[rule] = self.counts.get(rule, 0) + 1
+        self.is_sorted = False
+
+    def remove(self, rule: AlertRule) -> bool:
+        """Removes a rule, returning whether it was in the list."""
+        count = self.counts.get(rule)
+        if count is None:
+            return False
+        if count == 1:
+            del self.counts[rule]
+        else:
+            self.counts[rule] = count - 1
+        self.removed[rule] = self.removed.get(rule, 0) + 1
+        self.is_sorted = False
+        return True
+
+    def _kept(self) -> List[int]:
+        """The positions of the rules which have not been removed."""
+        removed = self.removed
+        kept = []
+        for i, rule in enumerate(self.rules):
+            pending = removed.get(rule)
+            if pending is None:
+                kept.append(i)
+            elif pending == 1:
+                del removed[rule]
+            else:
+                removed[rule] = pending - 1
+        return kept
+
+    def crossed(self, price: float, previous: float) -> List[AlertRule]:
+        """The rules with a threshold above ``price`` but not ``previous``."""
+        if not self.is_sorted:
+            positions: Iterable[int] = self._kept() if self.removed \
+                else range(len(self.rules))
+            order = sorted(positions, key=self.thresholds.__getitem__)
+            self.thresholds = [self.thresholds[i] for i in order]
+            self.rules = [self.rules[i] for i in order]
+            self.is_sorted = True
+        thresholds = self.thresholds
+        return self.rules[bisect_right(thresholds, price):
+                          bisect_right(thresholds, previous)]
+
+
+class AlertEngine(object):
+    """
+    Evaluates alert rules against changed prices, e.g. the ``changed``
+    prices of each :class:`nsw_fuel.PriceDelta`.
+
+    Station rules are indexed by station and fuel type, and area rules by
+    fuel type and every grid cell their area overlaps. Each price is only
+    compared with the rules for its station, or for the cell its station
+    is in, and those rules are kept sorted by threshold so the crossed
+    ones are found by bisection.
+
+    A rule matches when a price drops below its threshold: a price that
+    stays below it does not match again until it has risen back to the
+    threshold or above. The first price seen for a station and fuel type
+    matches every rule whose threshold it is below.
+
+    :param stations: Station locations, used by area rules. Prices from
+    stations without a location never match area rules.
+    :param cell_size: Grid cell size in degrees.
+    """
+
+    def __init__(self, stations: Iterable[Station] = (),
+                 cell_size: float = 0.05) -> None:
+        self._cell_size = cell_size
+        self._locations: Dict[int, Tuple[float, float]] = {}
+        self._station_rules: DefaultDict[PriceKey, _RuleList] = \
+            defaultdict(_RuleList)
+        self._area_rules: DefaultDict[Tuple[Cell, str], _RuleList] = \
+            defaultdict(_RuleList)
+        self._last_prices: Dict[PriceKey, float] = {}
+        self._count = 0
+        self.update_stations(stations)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return (int(math.floor(latitude / self._cell_size)),
+                int(math.floor(longitude / self._cell_size)))
+
+    def update_stations(self, stations: Iterable[Station]) -> None:
+        """Records the location of each station which has one."""
+        for station in stations:
+            if station.latitude is not None and station.longitude is not None:
+                self._locations[station.code] = (
+                    station.latitude, station.longitude)
+
+    def _area_cells(self, rule: AlertRule) -> List[Cell]:
+        latitude, longitude, radius = rule.latitude, rule.longitude, \
+            rule.radius
+        assert latitude is not None and longitude is not None
+        assert radius is not None
+        d_latitude = radius / _KM_PER_DEGREE
+        d_longitude = radius / (_KM_PER_DEGREE * max(
+            math.cos(math.radians(latitude)), 1e-6))
+        min_row, min_col = self._cell(
+            latitude - d_latitude, longitude - d_longitude)
+        max_row, max_col = self._cell(
+            latitude + d_latitude, longitude + d_longitude)
+        return [(row, col) for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)]
+
+    def _rule_lists(self, rule: AlertRule,
+                    create: bool = True) -> List[_RuleList]:
+        """
+        The lists a rule belongs in. Missing lists are created, or if not
+        ``create``, left out.
+        """
+        table: Dict[Any, _RuleList]
+        if rule.station_code is not None:
+            table = self._station_rules
+            keys: List[Any] = [(rule.station_code, rule.fuel_type)]
+        else:
+            table = self._area_rules
+            keys = [(cell, rule.fuel_type) for cell in self._area_cells(rule)]
+        if create:
+            return [table[key] for key in keys]
+        return [rules for rules in map(table.get, keys) if rules is not None]
+
+    def add_rule(self, rule: AlertRule) -> None:
+        for rules in self._rule_lists(rule):
+            rules.add(rule)
+        self._count += 1
+
+    def add_rules(self, rules: Iterable[AlertRule]) -> None:
+        for rule in rules:
+            self.add_rule(rule)
+
+    def remove_rule(self, rule: AlertRule) -> None:
+        """
+        Removes a rule previously added, matched by identity.
+
+        :raises KeyError: If the rule has not been added.
+        """
+        removed = [rules.remove(rule)
+                   for rules in self._rule_lists(rule, create=False)]
+        if not any(removed):
+            raise KeyError(rule)
+        self._count -= 1
+
+    def evaluate(self, prices: Iterable[Price]) -> List[AlertMatch]:
+        """
+        Records the given prices, and finds the rules they newly match.
+        Only prices which have changed need to be given.
+        """
+        matches: List[AlertMatch] = []
+        last_prices = self._last_prices
+        station_rules = self._station_rules
+        area_rules = self._area_rules
+        locations = self._locations
+        for price in prices:
+            code = price.station_code
+            if code is None:
+                continue
+            key = (code, price.fuel_type)
+            previous = last_prices.get(key, math.inf)
+            last_prices[key] = price.price
+            if price.price >= previous:
+                continue
+
+            rules = station_rules.get(key)
+            if rules is not None:
+                for rule in rules.crossed(price.price, previous):
+                    matches.append(AlertMatch(rule, price, None))
+
+            location = locations.get(code)
+            if location is None:
+                continue
+            rules = area_rules.get(
+                (self._cell(*location), price.fuel_type))
+            if rules is None:
+                continue
+            for rule in rules.crossed(price.price, previous):
+                assert rule.latitude is not None
+                assert rule.longitude is not None
+                assert rule.radius is not None
+                distance = haversine_km(rule.latitude, rule.longitude,
+                                        location[0], location[1])
+                if distance <= rule.radius:
+                    matches.append(AlertMatch(rule, price, distance))
+        return matches
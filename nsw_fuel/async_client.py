@@ -0,0 +1,197 @@
+import asyncio
+import datetime
+from types import TracebackType
+from typing import (
+    Any, AsyncIterator, Dict, Iterable, List, Literal, Optional, Set, Tuple,
+    Type, overload)
+
+from .client import (
+    API_URL_BASE, PriceTrends, StationPrice, _get_headers, _lovs_headers,
+    _nearby_body, _parse_price_trends, _parse_prices, _parse_station_prices,
+    _trends_body)
+from .decode import Decoder, get_decoder
+from .dto import (
+    FuelCheckError, FuelPrices, GetFuelPricesResponse,
+    GetReferenceDataResponse, Price)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+class AsyncFuelCheckClient():
+    """
+    Asyncio client for the NSW FuelCheck API.
+
+    Mirrors :class:`nsw_fuel.FuelCheckClient`, returning the same DTOs.
+    Requires ``httpx`` (``pip install nsw-fuel-api-client[async]``).
+
+    :param timeout: Per-request timeout in seconds.
+    :param client: A pre-configured ``httpx.AsyncClient`` to send requests
+    with. The client will not close an ``AsyncClient`` it did not create.
+    :param base_url: Base URL of the fuel API.
+    :param pool_size: Maximum number of concurrent connections.
+    :param max_retries: Number of times a failed connection is retried.
+    :param json_decoder: Decodes response bodies from bytes. Defaults to
+    the fastest installed library, see :mod:`nsw_fuel.decode`.
+    """
+
+    def __init__(self, timeout: Optional[int] = 10,
+                 client: Optional['httpx.AsyncClient'] = None,
+                 base_url: str = API_URL_BASE,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 json_decoder: Optional[Decoder] = None) -> None:
+        if httpx is None:
+            raise ImportError(
+                'AsyncFuelCheckClient requires httpx to be installed')
+
+        self._timeout = timeout
+        self._json_decoder = json_decoder or get_decoder()
+        self._base_url = base_url.rstrip('/')
+        self._owns_client = client is None
+        if client is None:
+            limits = httpx.Limits(max_connections=pool_size,
+                                  max_keepalive_connections=pool_size)
+            client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    limits=limits, retries=max_retries),
+            )
+        self._client = client
+
+    async def aclose(self) -> None:
+        """Releases the pooled connections held by this client."""
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> 'AsyncFuelCheckClient':
+        return self
+
+    async def __aexit__(self, exc_type: Optional[Type[BaseException]],
+                        exc_value: Optional[BaseException],
+                        traceback: Optional[TracebackType]) -> None:
+        await self.aclose()
+
+    async def _request(self, method: str, path: str,
+                       headers: Optional[Dict[str, Any]] = None,
+                       json: Any = None) -> 'httpx.Response':
+        response = await self._client.request(
+            method,
+            '{}{}'.format(self._base_url, path),
+            json=json,
+            headers={**(headers or {}), **_get_headers()},
+            timeout=self._timeout,
+        )
+
+        if not response.is_success:
+            raise FuelCheckError.create(response)
+
+        return response
+
+    @overload
+    async def get_fuel_prices(
+            self, lazy: Literal[False] = False) -> GetFuelPricesResponse:
+        ...
+
+    @overload
+    async def get_fuel_prices(self, lazy: bool) -> FuelPrices:
+        ...
+
+    async def get_fuel_prices(self, lazy: bool = False) -> FuelPrices:
+        """
+        Fetches fuel prices for all stations.
+
+        :param lazy: Build each station and price only when accessed, see
+        :meth:`GetFuelPricesResponse.deserialize`.
+        """
+        response = await self._request('GET', '/prices')
+        return GetFuelPricesResponse.deserialize(
+            self._json_decoder(response.content), lazy=lazy)
+
+    async def get_fuel_prices_for_station(
+            self,
+            station: int
+    ) -> List[Price]:
+        """Gets the fuel prices for a specific fuel station."""
+        response = await self._request(
+            'GET', '/prices/station/{}'.format(station))
+        return _parse_prices(self._json_decoder(response.content))
+
+    async def iter_fuel_prices_for_stations(
+            self,
+            stations: Iterable[int],
+            concurrency: int = 10
+    ) -> AsyncIterator[Tuple[int, List[Price]]]:
+        """
+        Gets the fuel prices for many stations concurrently.
+
+        Yields ``(station, prices)`` pairs in the order the requests
+        complete. At most ``concurrency`` requests are in flight at once.
+
+        Unlike :meth:`FuelCheckClient.get_fuel_prices_for_stations`, errors
+        are not collected per station: if a request fails, its error is
+        raised from the iterator and the remaining requests are cancelled.
+        """
+
+        async def fetch(station: int) -> Tuple[int, List[Price]]:
+            return station, await self.get_fuel_prices_for_station(station)
+
+        remaining = iter(stations)
+        pending: Set['asyncio.Future[Tuple[int, List[Price]]]'] = set()
+        try:
+            while True:
+                for station in remaining:
+                    pending.add(asyncio.ensure_future(fetch(station)))
+                    if len(pending) >= concurrency:
+                        break
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            # Wait for the cancellations, so no request outlives the
+            # iterator.
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def get_fuel_prices_within_radius(
+            self, latitude: float, longitude: float, radius: int,
+            fuel_type: str, brands: Optional[List[str]] = None
+    ) -> List[StationPrice]:
+        """Gets all the fuel prices within the specified radius."""
+        response = await self._request(
+            'POST', '/prices/nearby',
+            json=_nearby_body(latitude, longitude, radius, fuel_type, brands),
+        )
+        return _parse_station_prices(self._json_decoder(response.content))
+
+    async def get_fuel_price_trends(self, latitude: float, longitude: float,
+                                    fuel_types: List[str]) -> PriceTrends:
+        """Gets the fuel price trends for the given location and fuel types."""
+        response = await self._request(
+            'POST', '/prices/trends/',
+            json=_trends_body(latitude, longitude, fuel_types),
+        )
+        return _parse_price_trends(self._json_decoder(response.content))
+
+    async def get_reference_data(
+            self,
+            modified_since: Optional[datetime.datetime] = None
+    ) -> GetReferenceDataResponse:
+        """
+        Fetches API reference data.
+
+        :param modified_since: The response will be empty if no
+        changes have been made to the reference data since this
+        timestamp, otherwise all reference data will be returned.
+        """
+        response = await self._request(
+            'GET', '/lovs', headers=_lovs_headers(modified_since))
+        return GetReferenceDataResponse.deserialize(
+            self._json_decoder(response.content))
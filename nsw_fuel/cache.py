@@ -0,0 +1,167 @@
+"""
+An on-disk cache of the API reference data (stations, brands, fuel types
+and so on), which rarely changes.
+"""
+import datetime
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from .dto import GetReferenceDataResponse
+
+# The keys of each list in the reference data.
+REFERENCE_DATA_KEYS = (
+    'stations', 'brands', 'fueltypes', 'trendperiods', 'sortfields')
+
+_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, _TIME_FORMAT)
+
+
+def _has_items(data: Dict[str, Any], key: str) -> bool:
+    return bool((data.get(key) or {}).get('items'))
+
+
+class ReferenceDataCache(object):
+    """
+    Holds the last successfully fetched reference data in memory and in a
+    JSON file at ``path``, so that it survives restarts.
+
+    Pass the cache to :class:`nsw_fuel.FuelCheckClient` to have
+    ``get_reference_data()`` serve the cached copy while it is younger
+    than ``ttl``, and otherwise ask the API only for changes since the
+    cached copy was fetched. If the API sent its own time with the
+    cached copy, changes are asked for since then, so the local clock
+    being wrong cannot cause changes to be missed.
+
+    :param path: File to persist the reference data to.
+    :param ttl: Age in seconds before the cached copy is revalidated.
+    """
+
+    def __init__(self, path: str, ttl: float = 24 * 60 * 60) -> None:
+        self.path = path
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self._loaded = False
+        self._fetched_at: Optional[datetime.datetime] = None
+        self._modified_since: Optional[datetime.datetime] = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._response: Optional[GetReferenceDataResponse] = None
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            self._fetched_at = _parse_time(stored['fetched_at'])
+            # Cache files written before the server's time was kept.
+            self._modified_since = _parse_time(
+                stored.get('modified_since') or stored['fetched_at'])
+            self._data = stored['data']
+        except (OSError, ValueError, KeyError):
+            # A missing or corrupt cache file is treated as a cold cache.
+            self._fetched_at = None
+            self._modified_since = None
+            self._data = None
+
+    @property
+    def fetched_at(self) -> Optional[datetime.datetime]:
+        """When the cached reference data was last fetched or revalidated."""
+        self._load()
+        return self._fetched_at
+
+    @property
+    def modified_since(self) -> Optional[datetime.datetime]:
+        """
+        The time to ask the API for changes since: the server's time when
+        the cached reference data was last fetched or revalidated, if it
+        sent one, and otherwise :attr:`fetched_at`.
+        """
+        self._load()
+        return self._modified_since
+
+    @property
+    def response(self) -> Optional[GetReferenceDataResponse]:
+        """The cached reference data, if any."""
+        self._load()
+        if self._response is None and self._data is not None:
+            self._response = GetReferenceDataResponse.deserialize(self._data)
+        return self._response
+
+    def is_fresh(self, now: Optional[datetime.datetime] = None) -> bool:
+        fetched_at = self.fetched_at
+        if fetched_at is None:
+            return False
+        if now is None:
+            now = datetime.datetime.now()
+        return now - fetched_at < self.ttl
+
+    def update(self, data: Dict[str, Any],
+               fetched_at: datetime.datetime,
+               modified_since: Optional[datetime.datetime] = None
+               ) -> GetReferenceDataResponse:
+        """
+        Merges a reference data response into the cache and persists it.
+
+        Lists which are empty or missing from ``data`` (as they are when
+        nothing has been modified) keep their cached contents.
+
+        :param fetched_at: When the request was sent, by the local clock.
+        :param modified_since: The server's time when it responded, if
+        known. Defaults to ``fetched_at``.
+
+        :returns: The merged reference data.
+        """
+        self._load()
+        cached = self._data or {}
+        changed = [key for key in REFERENCE_DATA_KEYS if _has_items(data, key)]
+        if changed or not cached:
+            merged = dict(cached)
+            for key in REFERENCE_DATA_KEYS:
+                if key in changed or key not in merged:
+                    merged[key] = data.get(key) or {'items': []}
+            self._data = merged
+            self._response = None
+
+        self._fetched_at = fetched_at
+        self._modified_since = modified_since or fetched_at
+        self._save()
+        response = self.response
+        assert response is not None
+        return response
+
+    def clear(self) -> None:
+        """Empties the cache and removes the cache file."""
+        self._loaded = True
+        self._fetched_at = None
+        self._modified_since = None
+        self._data = None
+        self._response = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _save(self) -> None:
+        assert self._fetched_at is not None
+        assert self._modified_since is not None
+        stored = {
+            'fetched_at': self._fetched_at.strftime(_TIME_FORMAT),
+            'modified_since': self._modified_since.strftime(_TIME_FORMAT),
+            'data': self._data,
+        }
+        # Write to a temporary file and rename it into place, so a crash
+        # never leaves a partially written cache behind.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
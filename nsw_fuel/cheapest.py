@@ -0,0 +1,205 @@
+"""
+Answers "cheapest stations for a fuel" queries from prices held locally,
+keeping them sorted as new prices arrive rather than sorting per query.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import chain, islice
+from typing import (
+    DefaultDict, Dict, Iterable, Iterator, List, Optional, Tuple)
+
+from .client import StationPrice
+from .dto import FuelPrices, Price, Station
+
+# Prices of one fuel type, optionally of one brand, in ascending order
+# with ties broken by station code. Each entry packs the price, in
+# thousandths of a cent, above the station code into one int, which
+# compares several times faster than a (price, code) tuple.
+_Key = Tuple[str, Optional[str]]
+_Entry = int
+
+_CODE_BITS = 32
+_CODE_MASK = (1 << _CODE_BITS) - 1
+
+
+def _entry(price: float, station_code: int) -> _Entry:
+    return (round(price * 1000) << _CODE_BITS) | station_code
+
+
+# Sublists are split once they hold twice this many entries.
+_LOAD = 64
+
+
+class _SortedList(object):
+    """
+    Entries in ascending order, held as sublists of at most ``2 * _LOAD``
+    entries alongside the last entry of each. Adding or removing an entry
+    bisects to its sublist and only shifts entries within it, rather than
+    shifting every entry after it.
+    """
+    __slots__ = ('_lists', '_maxes', '_len')
+
+    def __init__(self) -> None:
+        self._lists: List[List[_Entry]] = []
+        self._maxes: List[_Entry] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[_Entry]:
+        return chain.from_iterable(self._lists)
+
+    def head(self, n: int) -> List[_Entry]:
+        return list(islice(self, n))
+
+    def add(self, entry: _Entry) -> None:
+        lists, maxes = self._lists, self._maxes
+        self._len += 1
+        if not maxes:
+            lists.append([entry])
+            maxes.append(entry)
+            return
+        i = bisect_left(maxes, entry)
+        if i == len(maxes):
+            i -= 1
+            lists[i].append(entry)
+            maxes[i] = entry
+        else:
+            insort(lists[i], entry)
+        sublist = lists[i]
+        if len(sublist) > 2 * _LOAD:
+            half = sublist[_LOAD:]
+            del sublist[_LOAD:]
+            maxes[i] = sublist[-1]
+            lists.insert(i + 1, half)
+            maxes.insert(i + 1, half[-1])
+
+    def move(self, old: _Entry, new: _Entry) -> None:
+        """Replaces an entry, which must be present, with another."""
+        self.remove(old)
+        self.add(new)
+
+    def remove(self, entry: _Entry) -> None:
+        """Removes an entry, which must be present."""
+        lists, maxes = self._lists, self._maxes
+        i = bisect_left(maxes, entry)
+        sublist = lists[i]
+        j = bisect_left(sublist, entry)
+        del sublist[j]
+        self._len -= 1
+        if not sublist:
+            del lists[i]
+            del maxes[i]
+        elif j == len(sublist):
+            maxes[i] = sublist[-1]
+
+
+class CheapestIndex(object):
+    """
+    The current price of each fuel type at each station, sorted by price
+    for each fuel type, and for each fuel type and brand.
+
+    Queries return the cheapest prices without sorting. Each new price
+    moves one entry in its fuel type's list and its brand's list, each
+    found by bisection and moved within a sublist of at most
+    ``2 * _LOAD`` entries. Prices for stations the index does not know
+    are ignored.
+    """
+
+    def __init__(self, stations: Iterable[Station],
+                 prices: Iterable[Price] = ()) -> None:
+        self._stations: Dict[int, Station] = {}
+        self._prices: Dict[Tuple[int, str], Price] = {}
+        self._sorted: DefaultDict[_Key, _SortedList] = defaultdict(
+            _SortedList)
+
+        for station in stations:
+            self.add_station(station)
+        self.update_prices(prices)
+
+    @classmethod
+    def from_response(cls, response: FuelPrices) -> 'CheapestIndex':
+        """Builds an index from a fuel prices snapshot."""
+        return cls(response.stations, response.prices)
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def _keys(self, fuel_type: str, station_code: int) -> List[_Key]:
+        return [(fuel_type, None),
+                (fuel_type, self._stations[station_code].brand)]
+
+    def _insert(self, price: Price, station_code: int) -> None:
+        entry = _entry(price.price, station_code)
+        for key in self._keys(price.fuel_type, station_code):
+            self._sorted[key].add(entry)
+
+    def _remove(self, price: Price, station_code: int) -> None:
+        entry = _entry(price.price, station_code)
+        for key in self._keys(price.fuel_type, station_code):
+            self._sorted[key].remove(entry)
+
+    def add_station(self, station: Station) -> None:
+        """
+        Adds a station to the index, replacing one with the same code and
+        keeping its prices.
+        """
+        code = station.code
+        if not 0 <= code <= _CODE_MASK:
+            raise ValueError('Unsupported station code {}'.format(code))
+        previous = self._stations.get(code)
+        if previous is None or previous.brand == station.brand:
+            self._stations[code] = station
+            return
+        # The station's prices move to its new brand's lists.
+        prices = [price for (station_code, _), price in self._prices.items()
+                  if station_code == code]
+        for price in prices:
+            self._remove(price, code)
+        self._stations[code] = station
+        for price in prices:
+            self._insert(price, code)
+
+    def update_prices(self, prices: Iterable[Price]) -> None:
+        """Replaces the current price of each given station and fuel type."""
+        stations = self._stations
+        current = self._prices
+        sorted_lists = self._sorted
+        for price in prices:
+            code = price.station_code
+            if code is None:
+                continue
+            station = stations.get(code)
+            if station is None:
+                continue
+            fuel_type = price.fuel_type
+            key = (code, fuel_type)
+            previous = current.get(key)
+            current[key] = price
+            entry = _entry(price.price, code)
+            all_brands = sorted_lists[(fuel_type, None)]
+            brand = sorted_lists[(fuel_type, station.brand)]
+            if previous is None:
+                all_brands.add(entry)
+                brand.add(entry)
+            elif previous.price != price.price:
+                old = _entry(previous.price, code)
+                all_brands.move(old, entry)
+                brand.move(old, entry)
+
+    def cheapest(self, fuel_type: str, n: int = 10,
+                 brand: Optional[str] = None) -> List[StationPrice]:
+        """
+        Finds the ``n`` cheapest stations for a fuel type, cheapest first,
+        optionally only of one brand.
+        """
+        entries = self._sorted.get((fuel_type, brand))
+        if entries is None:
+            return []
+        stations = self._stations
+        prices = self._prices
+        codes = [entry & _CODE_MASK for entry in entries.head(n)]
+        return [StationPrice(price=prices[(code, fuel_type)],
+                             station=stations[code])
+                for code in codes]
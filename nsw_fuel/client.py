@@ -1,13 +1,36 @@
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from types import TracebackType
+from typing import (
+    List, Optional, NamedTuple, Dict, Any, Type, Iterator, Iterable, Callable,
+    Hashable, Literal, Set, TypeVar, cast, overload)
+
 import requests
-from typing import List, Optional, NamedTuple, Dict, Any
 
+from .cache import ReferenceDataCache
+from .coalesce import ResponseMemo, SingleFlight
+from .decode import Decoder, get_decoder
 from .dto import (
     Price, Station, Variance, AveragePrice, FuelCheckError,
-    GetReferenceDataResponse, GetFuelPricesResponse)
+    FuelPrices, GetReferenceDataResponse, GetFuelPricesResponse)
+from .instrument import Observer, RequestSpan, count_objects
+from .ratelimit import RetryPolicy, TokenBucket
+from .stream import iter_json_array
+from .transport import (
+    TRANSPORT_ERRORS, RequestsTransport, Transport, TransportResponse)
 
 API_URL_BASE = 'https://api.onegov.nsw.gov.au/FuelCheckApp/v1/fuel'
 
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Batches of at least this many stations are answered from a single
+# /prices call, which is cheaper than this many per-station calls.
+FULL_FETCH_THRESHOLD = 100
+
+T = TypeVar('T')
+
 PriceTrends = NamedTuple('PriceTrends', [
     ('variances', List[Variance]),
     ('average_prices', List[AveragePrice])
@@ -19,117 +42,390 @@ StationPrice = NamedTuple('StationPrice', [
 ])
 
 
+class StationPrices(Dict[int, List[Price]]):
+    """
+    The prices of each station in a batch, keyed by station code.
+
+    :ivar errors: The error raised for each station whose prices could not
+    be fetched. Those stations are not in the mapping itself.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.errors: Dict[int, Exception] = {}
+
+
 class FuelCheckClient():
-    def __init__(self, timeout: Optional[int] = 10) -> None:
+    """
+    Client for the NSW FuelCheck API.
+
+    All endpoints share a single transport, by default a pooled,
+    keep-alive ``requests`` session, so repeated calls reuse open
+    connections rather than paying for a new TCP and TLS handshake on each
+    request. Use the client as a context manager (or call :meth:`close`)
+    to release the pooled connections.
+
+    :param timeout: Per-request timeout in seconds.
+    :param session: A pre-configured ``requests.Session`` to send requests
+    with. The client will not close a session it did not create.
+    :param base_url: Base URL of the fuel API, e.g. to point the client at
+    a local stand-in server.
+    :param pool_size: Maximum number of connections kept alive in the pool.
+    :param max_retries: Number of times a failed connection, read or
+    gateway error (502, 503, 504) is retried before giving up.
+    :param backoff_factor: Exponential backoff factor applied between
+    retries, in seconds.
+    :param reference_data_cache: Cache used by :meth:`get_reference_data`
+    when no ``modified_since`` is given.
+    :param coalesce: Whether identical concurrent calls to
+    :meth:`get_fuel_prices`, :meth:`get_fuel_prices_for_station`,
+    :meth:`get_fuel_prices_within_radius` or :meth:`get_fuel_price_trends`
+    share a single request. Each caller still gets its own result lists,
+    holding the same (immutable) stations and prices.
+    :param memo_ttl: Seconds to reuse the results of those calls for.
+    Disabled by default.
+    :param memo_size: Maximum number of memoized results.
+    :param rate_limiter: A token bucket every request must acquire a token
+    from. Share one between clients using the same API key.
+    :param retry_policy: Retries error responses the policy deems
+    retryable, e.g. 429s. When given, gateway errors are left to the policy
+    rather than also being retried by the connection pool.
+    :param observer: Receives the timings, sizes and outcome of each call,
+    see :mod:`nsw_fuel.instrument`. Streaming calls are not instrumented.
+    :param transport: Sends the client's requests instead of a ``requests``
+    session, see :mod:`nsw_fuel.transport`. The pool and retry options
+    above then only apply if given to the transport itself. The client
+    will not close a transport it did not create.
+    :param json_decoder: Decodes response bodies from bytes. Defaults to
+    the fastest installed library, see :mod:`nsw_fuel.decode`.
+    """
+
+    def __init__(self, timeout: Optional[int] = 10,
+                 session: Optional[requests.Session] = None,
+                 base_url: str = API_URL_BASE,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 reference_data_cache: Optional[ReferenceDataCache] = None,
+                 coalesce: bool = True,
+                 memo_ttl: float = 0,
+                 memo_size: int = 256,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 observer: Optional[Observer] = None,
+                 transport: Optional[Transport] = None,
+                 json_decoder: Optional[Decoder] = None) -> None:
+        if session is not None and transport is not None:
+            raise ValueError('Give either a session or a transport')
+
         self._timeout = timeout
+        self._json_decoder = json_decoder or get_decoder()
+        self._observer = observer
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._reference_data_cache = reference_data_cache
+        self._single_flight = SingleFlight() if coalesce else None
+        self._memo = ResponseMemo(memo_size, memo_ttl) if memo_ttl > 0 \
+            else None
+        self._base_url = base_url.rstrip('/')
+        self._pool_size = pool_size
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = RequestsTransport(
+                session, pool_size, max_retries, backoff_factor,
+                retry_statuses=retry_policy is None)
+        self._transport = transport
+
+    def close(self) -> None:
+        """Releases the pooled connections held by this client."""
+        if self._owns_transport:
+            self._transport.close()
+
+    def __enter__(self) -> 'FuelCheckClient':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def _request(self, method: str, path: str,
+                 headers: Optional[Dict[str, Any]] = None,
+                 json: Any = None,
+                 stream: bool = False,
+                 span: Optional[RequestSpan] = None) -> TransportResponse:
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+
+            if span is not None:
+                span.attempts = attempt
+                sent = time.perf_counter()
+            response = self._transport.request(
+                method,
+                '{}{}'.format(self._base_url, path),
+                headers={**(headers or {}), **_get_headers()},
+                json=json,
+                timeout=self._timeout,
+                stream=stream,
+            )
+            if span is not None:
+                span.lap('request', sent)
+                span.status_code = response.status_code
+
+            if response.ok:
+                return response
+
+            error = FuelCheckError.create(response)
+            response.close()
+            policy = self._retry_policy
+            if policy is None or not policy.should_retry(attempt, error):
+                raise error
+            policy.sleep(policy.delay(attempt, error))
+
+    def _get(self, endpoint: str, method: str, path: str,
+             parse: Callable[[Any], T],
+             headers: Optional[Dict[str, Any]] = None,
+             json: Any = None,
+             allow_empty: bool = False,
+             on_response: Optional[
+                 Callable[[TransportResponse], None]] = None) -> T:
+        """
+        Requests a JSON endpoint and parses the decoded body, reporting the
+        call to the observer if there is one.
+
+        :param endpoint: The endpoint's name when reported.
+        :param allow_empty: Whether an empty body is decoded as ``{}``.
+        :param on_response: Called with the successful response before its
+        body is parsed, e.g. to read its headers.
+        """
+        observer = self._observer
+        if observer is None:
+            response = self._request(method, path, headers=headers, json=json)
+            if on_response is not None:
+                on_response(response)
+            return parse(_decode(response, self._json_decoder, allow_empty))
+
+        span = RequestSpan(endpoint, method)
+        start = time.perf_counter()
+        try:
+            # Stream so the body download is timed separately.
+            response = self._request(method, path, headers=headers,
+                                     json=json, stream=True, span=span)
+            if on_response is not None:
+                on_response(response)
+            mark = time.perf_counter()
+            span.response_bytes = len(response.content)
+            mark = span.lap('download', mark)
+            data = _decode(response, self._json_decoder, allow_empty)
+            mark = span.lap('decode', mark)
+            result = parse(data)
+            span.lap('deserialize', mark)
+            span.objects = count_objects(result)
+            return result
+        except FuelCheckError as e:
+            span.error = e
+            span.error_code = e.error_code
+            raise
+        except Exception as e:
+            span.error = e
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            observer.on_request(span)
+
+    def _coalesce(self, key: Hashable, fetch: Callable[[], T]) -> T:
+        memo = self._memo
+        if memo is not None:
+            hit, value = memo.get(key)
+            if hit:
+                return cast(T, value)
+
+            def fetch_and_memoize() -> T:
+                value = fetch()
+                memo.put(key, value)
+                return value
+        else:
+            fetch_and_memoize = fetch
+
+        if self._single_flight is None:
+            return fetch_and_memoize()
+        return self._single_flight.do(key, fetch_and_memoize)
+
+    @overload
+    def get_fuel_prices(
+            self, lazy: Literal[False] = False) -> GetFuelPricesResponse:
+        ...
+
+    @overload
+    def get_fuel_prices(self, lazy: bool) -> FuelPrices:
+        ...
+
+    def get_fuel_prices(self, lazy: bool = False) -> FuelPrices:
+        """
+        Fetches fuel prices for all stations.
+
+        :param lazy: Build each station and price only when accessed, see
+        :meth:`GetFuelPricesResponse.deserialize`. Worthwhile when only a
+        few fields or a few prices are read.
+        """
+        def fetch() -> FuelPrices:
+            return self._get(
+                '/prices', 'GET', '/prices',
+                lambda data: GetFuelPricesResponse.deserialize(data, lazy))
+        return _copy_fuel_prices(self._coalesce(('prices', lazy), fetch))
 
-    def _format_dt(self, dt: datetime.datetime) -> str:
-        return dt.strftime('%d/%m/%Y %H:%M:%S')
+    def iter_fuel_prices(self) -> Iterator[Price]:
+        """
+        Fetches fuel prices for all stations, yielding each price as it is
+        parsed from the response body rather than loading the whole
+        document into memory. The request is sent on the first iteration.
+        """
+        with self._request('GET', '/prices', stream=True) as response:
+            for data in iter_json_array(
+                    response.iter_content(_STREAM_CHUNK_SIZE), ('prices',)):
+                yield Price.deserialize(data)
 
-    def _get_headers(self) -> Dict[str, Any]:
-        return {
-            'requesttimestamp': self._format_dt(datetime.datetime.now())
-        }
+    @overload
+    def get_new_fuel_prices(
+            self, lazy: Literal[False] = False) -> GetFuelPricesResponse:
+        ...
 
-    def get_fuel_prices(self) -> GetFuelPricesResponse:
-        """Fetches fuel prices for all stations."""
-        response = requests.get(
-            '{}/prices'.format(API_URL_BASE),
-            headers=self._get_headers(),
-            timeout=self._timeout,
-        )
+    @overload
+    def get_new_fuel_prices(self, lazy: bool) -> FuelPrices:
+        ...
 
-        if not response.ok:
-            raise FuelCheckError.create(response)
+    def get_new_fuel_prices(self, lazy: bool = False) -> FuelPrices:
+        """
+        Fetches the fuel prices which have changed since the previous call
+        to this endpoint with the same API key.
 
-        return GetFuelPricesResponse.deserialize(response.json())
+        :param lazy: See :meth:`get_fuel_prices`.
+        """
+        return self._get(
+            '/prices/new', 'GET', '/prices/new',
+            lambda data: GetFuelPricesResponse.deserialize(data, lazy))
 
     def get_fuel_prices_for_station(
             self,
             station: int
     ) -> List[Price]:
         """Gets the fuel prices for a specific fuel station."""
-        response = requests.get(
-            '{}/prices/station/{}'.format(API_URL_BASE, station),
-            headers=self._get_headers(),
-            timeout=self._timeout,
-        )
+        def fetch() -> List[Price]:
+            return self._get('/prices/station', 'GET',
+                             '/prices/station/{}'.format(station),
+                             _parse_prices)
+        return list(self._coalesce(('station', int(station)), fetch))
+
+    def get_fuel_prices_for_stations(
+            self,
+            stations: Iterable[int],
+            max_workers: Optional[int] = None,
+            full_fetch_threshold: Optional[int] = FULL_FETCH_THRESHOLD
+    ) -> StationPrices:
+        """
+        Gets the fuel prices for many stations.
 
-        if not response.ok:
-            raise FuelCheckError.create(response)
+        Small batches are fetched with concurrent per-station calls over
+        the client's connection pool. Batches of ``full_fetch_threshold``
+        stations or more are instead answered from a single call for all
+        prices, filtered to the requested stations.
 
-        data = response.json()
-        return [Price.deserialize(data) for data in data['prices']]
+        A failure for one station does not abort the batch: the error is
+        recorded in the result's ``errors`` instead. Either way, a station
+        with no current prices maps to an empty list, while an unknown
+        station code is recorded as a :class:`FuelCheckError`.
+
+        :param max_workers: Maximum number of concurrent calls. Defaults to,
+        and is capped at, the client's ``pool_size`` so that no call waits
+        on or discards a pooled connection. A custom transport should be
+        given a pool at least that large.
+        :param full_fetch_threshold: Batch size from which all prices are
+        fetched at once, or ``None`` to always fetch per station.
+        """
+        codes = list(dict.fromkeys(int(station) for station in stations))
+        result = StationPrices()
+        if not codes:
+            return result
+
+        threshold = full_fetch_threshold
+        if threshold is not None and len(codes) >= threshold:
+            try:
+                response = self.get_fuel_prices()
+            except (FuelCheckError, *TRANSPORT_ERRORS) as e:
+                result.errors.update((code, e) for code in codes)
+                return result
+            known: Set[Optional[int]] = {
+                station.code for station in response.stations}
+            known.update(price.station_code for price in response.prices)
+            for code in codes:
+                if code in known:
+                    result[code] = []
+                else:
+                    result.errors[code] = FuelCheckError(
+                        description='Unknown station code {}'.format(code))
+            for price in response.prices:
+                prices = result.get(cast(int, price.station_code))
+                if prices is not None:
+                    prices.append(price)
+            return result
+
+        def fetch(code: int) -> None:
+            try:
+                result[code] = self.get_fuel_prices_for_station(code)
+            except (FuelCheckError, *TRANSPORT_ERRORS) as e:
+                result.errors[code] = e
+
+        workers = min(len(codes), max_workers or self._pool_size,
+                      self._pool_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Consume the results so unexpected exceptions propagate.
+            list(executor.map(fetch, codes))
+
+        # Return the stations in the order they were requested.
+        ordered = StationPrices()
+        ordered.errors = result.errors
+        for code in codes:
+            if code in result:
+                ordered[code] = result[code]
+        return ordered
 
     def get_fuel_prices_within_radius(
             self, latitude: float, longitude: float, radius: int,
             fuel_type: str, brands: Optional[List[str]] = None
     ) -> List[StationPrice]:
         """Gets all the fuel prices within the specified radius."""
-
-        if brands is None:
-            brands = []
-        response = requests.post(
-            '{}/prices/nearby'.format(API_URL_BASE),
-            json={
-                'fueltype': fuel_type,
-                'latitude': latitude,
-                'longitude': longitude,
-                'radius': radius,
-                'brand': brands,
-            },
-            headers=self._get_headers(),
-            timeout=self._timeout,
-        )
-
-        if not response.ok:
-            raise FuelCheckError.create(response)
-
-        data = response.json()
-        stations = {
-            station['code']: Station.deserialize(station)
-            for station in data['stations']
-        }
-        station_prices = []  # type: List[StationPrice]
-        for serialized_price in data['prices']:
-            price = Price.deserialize(serialized_price)
-            station_prices.append(StationPrice(
-                price=price,
-                station=stations[price.station_code]
-            ))
-
-        return station_prices
+        def fetch() -> List[StationPrice]:
+            return self._get(
+                '/prices/nearby', 'POST', '/prices/nearby',
+                _parse_station_prices,
+                json=_nearby_body(
+                    latitude, longitude, radius, fuel_type, brands),
+            )
+        key = ('nearby', float(latitude), float(longitude), radius, fuel_type,
+               tuple(sorted(set(brands or []))))
+        return list(self._coalesce(key, fetch))
 
     def get_fuel_price_trends(self, latitude: float, longitude: float,
                               fuel_types: List[str]) -> PriceTrends:
         """Gets the fuel price trends for the given location and fuel types."""
-        response = requests.post(
-            '{}/prices/trends/'.format(API_URL_BASE),
-            json={
-                'location': {
-                    'latitude': latitude,
-                    'longitude': longitude,
-                },
-                'fueltypes': [{'code': type} for type in fuel_types],
-            },
-            headers=self._get_headers(),
-            timeout=self._timeout,
-        )
-
-        if not response.ok:
-            raise FuelCheckError.create(response)
-
-        data = response.json()
-        return PriceTrends(
-            variances=[
-                Variance.deserialize(variance)
-                for variance in data['Variances']
-            ],
-            average_prices=[
-                AveragePrice.deserialize(avg_price)
-                for avg_price in data['AveragePrices']
-            ]
-        )
+        # Request the fuel types in sorted order, so every caller sharing a
+        # request gets the same result.
+        fuel_types = sorted(set(fuel_types))
+
+        def fetch() -> PriceTrends:
+            return self._get(
+                '/prices/trends', 'POST', '/prices/trends/',
+                _parse_price_trends,
+                json=_trends_body(latitude, longitude, fuel_types),
+            )
+        key = ('trends', float(latitude), float(longitude),
+               tuple(fuel_types))
+        trends = self._coalesce(key, fetch)
+        return PriceTrends(variances=list(trends.variances),
+                           average_prices=list(trends.average_prices))
 
     def get_reference_data(
             self,
@@ -141,22 +437,170 @@ class FuelCheckClient():
         :param modified_since: The response will be empty if no
         changes have been made to the reference data since this
         timestamp, otherwise all reference data will be returned.
+
+        If the client has a reference data cache and ``modified_since`` is
+        not given, the cached copy is returned while it is fresh. Once
+        stale, it is revalidated by requesting changes since it was
+        fetched, by the server's clock where it sent one, and any changes
+        are merged into the cache. If revalidation fails without a
+        response, the stale copy is returned.
+        """
+        cache = self._reference_data_cache
+        if cache is None or modified_since is not None:
+            return self._get('/lovs', 'GET', '/lovs',
+                             GetReferenceDataResponse.deserialize,
+                             headers=_lovs_headers(modified_since))
+
+        now = datetime.datetime.now()
+        cached = cache.response
+        if cached is not None and cache.is_fresh(now):
+            return cached
+
+        server_time: List[datetime.datetime] = []
+
+        def read_date(response: TransportResponse) -> None:
+            date = _parse_date(response.headers.get('Date'))
+            if date is not None:
+                server_time.append(date)
+
+        def update(data: Any) -> GetReferenceDataResponse:
+            return cache.update(data, fetched_at=now, modified_since=(
+                server_time[0] if server_time else None))
+
+        try:
+            # An unmodified response may have no body at all.
+            return self._get('/lovs', 'GET', '/lovs', update,
+                             headers=_lovs_headers(cache.modified_since),
+                             allow_empty=True, on_response=read_date)
+        except TRANSPORT_ERRORS:
+            if cached is None:
+                raise
+            return cached
+
+    def iter_reference_stations(
+            self,
+            modified_since: Optional[datetime.datetime] = None
+    ) -> Iterator[Station]:
+        """
+        Fetches the stations from the API reference data, yielding each
+        station as it is parsed from the response body. The rest of the
+        reference data is skipped. The request is sent on the first
+        iteration.
+
+        :param modified_since: Nothing will be yielded if no changes have
+        been made to the reference data since this timestamp.
         """
+        with self._request('GET', '/lovs',
+                           headers=_lovs_headers(modified_since),
+                           stream=True) as response:
+            for data in iter_json_array(
+                    response.iter_content(_STREAM_CHUNK_SIZE),
+                    ('stations', 'items'), allow_empty=True):
+                yield Station.deserialize(data)
+
+
+# Request building and response parsing shared by the sync and async clients.
+
+def _decode(response: TransportResponse, decoder: Decoder,
+            allow_empty: bool = False) -> Any:
+    content = response.content
+    if allow_empty and not content.strip():
+        return {}
+    return decoder(content)
+
+
+def _copy_fuel_prices(response: FuelPrices) -> FuelPrices:
+    """
+    Copies a shared response's lists, so that one caller cannot change
+    another's. Lazy sequences are read-only, so are not copied.
+    """
+    if not isinstance(response, GetFuelPricesResponse):
+        return response
+    return GetFuelPricesResponse(stations=list(response.stations),
+                                 prices=list(response.prices))
+
+
+def _format_dt(dt: datetime.datetime) -> str:
+    return dt.strftime('%d/%m/%Y %H:%M:%S')
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parses an HTTP Date header into a naive local time."""
+    if not value:
+        return None
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.astimezone().replace(tzinfo=None)
+
+
+def _get_headers() -> Dict[str, Any]:
+    return {
+        'requesttimestamp': _format_dt(datetime.datetime.now())
+    }
+
+
+def _lovs_headers(
+        modified_since: Optional[datetime.datetime]) -> Dict[str, Any]:
+    if modified_since is None:
+        modified_since = datetime.datetime(year=2010, month=1, day=1)
+    return {'if-modified-since': _format_dt(modified_since)}
+
+
+def _nearby_body(latitude: float, longitude: float, radius: int,
+                 fuel_type: str,
+                 brands: Optional[List[str]]) -> Dict[str, Any]:
+    return {
+        'fueltype': fuel_type,
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius': radius,
+        'brand': brands or [],
+    }
+
+
+def _trends_body(latitude: float, longitude: float,
+                 fuel_types: List[str]) -> Dict[str, Any]:
+    return {
+        'location': {
+            'latitude': latitude,
+            'longitude': longitude,
+        },
+        'fueltypes': [{'code': type} for type in fuel_types],
+    }
+
+
+def _parse_prices(data: Dict[str, Any]) -> List[Price]:
+    return [Price.deserialize(price) for price in data['prices']]
+
 
-        if modified_since is None:
-            modified_since = datetime.datetime(year=2010, month=1, day=1)
+def _parse_station_prices(data: Dict[str, Any]) -> List[StationPrice]:
+    stations = {
+        station['code']: Station.deserialize(station)
+        for station in data['stations']
+    }
+    station_prices = []  # type: List[StationPrice]
+    for serialized_price in data['prices']:
+        price = Price.deserialize(serialized_price)
+        station_prices.append(StationPrice(
+            price=price,
+            station=stations[price.station_code]
+        ))
 
-        response = requests.get(
-            '{}/lovs'.format(API_URL_BASE),
-            headers={
-                'if-modified-since': self._format_dt(modified_since),
-                **self._get_headers(),
-            },
-            timeout=self._timeout,
-        )
+    return station_prices
 
-        if not response.ok:
-            raise FuelCheckError.create(response)
 
-        # return response.text
-        return GetReferenceDataResponse.deserialize(response.json())
+def _parse_price_trends(data: Dict[str, Any]) -> PriceTrends:
+    return PriceTrends(
+        variances=[
+            Variance.deserialize(variance)
+            for variance in data['Variances']
+        ],
+        average_prices=[
+            AveragePrice.deserialize(avg_price)
+            for avg_price in data['AveragePrices']
+        ]
+    )
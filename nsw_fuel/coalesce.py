@@ -0,0 +1,97 @@
+"""
+Request coalescing: identical concurrent calls share a single upstream
+request, and recent results can be memoized for a short time.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar, cast)
+
+T = TypeVar('T')
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(object):
+    """
+    Deduplicates concurrent calls by key. While a call for a key is in
+    flight, other callers with the same key wait for it and receive its
+    result, or have its exception raised, instead of making their own call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[Any]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return cast(T, call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class ResponseMemo(object):
+    """
+    A thread-safe, size bounded memo of recent results. Entries expire
+    ``ttl`` seconds after being stored, and the least recently used entry
+    is evicted when full.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = \
+            OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """:returns: Whether there was a live entry, and its value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
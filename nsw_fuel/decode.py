@@ -0,0 +1,71 @@
+"""
+JSON decoders for response bodies. Each decodes straight from the raw
+bytes, without first copying them into a ``str``.
+
+The fastest installed library is used by default: ``orjson``, then
+``ujson``, then ``simdjson`` (pysimdjson), falling back to the standard
+library's ``json``.
+"""
+import json
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import ujson  # type: ignore
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import simdjson  # type: ignore
+except ImportError:  # pragma: no cover
+    simdjson = None
+
+Decoder = Callable[[bytes], Any]
+
+# In order of preference.
+DECODER_NAMES = ('orjson', 'ujson', 'simdjson', 'json')
+
+
+def _decoders() -> Dict[str, Decoder]:
+    decoders: Dict[str, Decoder] = {}
+    if orjson is not None:
+        decoders['orjson'] = orjson.loads
+    if ujson is not None:
+        decoders['ujson'] = ujson.loads
+    if simdjson is not None:
+        decoders['simdjson'] = simdjson.loads
+    # Detects the encoding of bytes itself.
+    decoders['json'] = json.loads
+    return decoders
+
+
+_DECODERS = _decoders()
+
+
+def available_decoders() -> Dict[str, Decoder]:
+    """The installed decoders by name, in order of preference."""
+    return {name: _DECODERS[name] for name in DECODER_NAMES
+            if name in _DECODERS}
+
+
+def get_decoder(name: Optional[str] = None) -> Decoder:
+    """
+    Gets a decoder by library name, or the fastest installed one.
+
+    Every decoder raises a ``ValueError`` for invalid JSON.
+
+    :raises ImportError: If the named library is not installed.
+    :raises ValueError: If the name is not one of :data:`DECODER_NAMES`.
+    """
+    if name is None:
+        return next(iter(available_decoders().values()))
+    if name not in DECODER_NAMES:
+        raise ValueError('Unknown JSON decoder {!r}'.format(name))
+    decoder = _DECODERS.get(name)
+    if decoder is None:
+        raise ImportError('{} is not installed'.format(name))
+    return decoder
@@ -0,0 +1,111 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .client import FuelCheckClient
+from .dto import (
+    FuelCheckError, FuelPrices, GetFuelPricesResponse, Price, Station)
+
+PriceKey = Tuple[Optional[int], str]
+
+PriceDelta = NamedTuple('PriceDelta', [
+    ('changed', List[Price]),
+    ('response', GetFuelPricesResponse)
+])
+
+
+class PriceDeltaSync(object):
+    """
+    Keeps an indexed snapshot of state-wide fuel prices and refreshes it
+    incrementally.
+
+    The first :meth:`sync` downloads every price. Subsequent syncs only
+    fetch the prices that changed since the previous sync using the
+    ``/prices/new`` endpoint. If that endpoint fails (or is disabled with
+    ``use_new_prices=False``), the full price list is fetched and diffed
+    against the snapshot instead.
+    """
+
+    def __init__(self, client: FuelCheckClient,
+                 use_new_prices: bool = True) -> None:
+        self._client = client
+        self._use_new_prices = use_new_prices
+        self._stations: Dict[int, Station] = {}
+        self._prices: Dict[PriceKey, Price] = {}
+        self._synced = False
+        self._response: Optional[GetFuelPricesResponse] = None
+
+    @property
+    def response(self) -> GetFuelPricesResponse:
+        """The full, up to date view of every station and price."""
+        if self._response is None:
+            self._response = GetFuelPricesResponse(
+                stations=list(self._stations.values()),
+                prices=list(self._prices.values()),
+            )
+        return self._response
+
+    def sync(self) -> PriceDelta:
+        """
+        Brings the snapshot up to date.
+
+        :returns: The prices that changed since the previous sync and the
+        full view with those changes applied.
+        """
+        changed = None  # type: Optional[List[Price]]
+        if self._synced and self._use_new_prices:
+            try:
+                changed = self.apply(self._client.get_new_fuel_prices())
+            except FuelCheckError:
+                pass
+
+        if changed is None:
+            changed = self.apply(self._client.get_fuel_prices(),
+                                 complete=True)
+
+        self._synced = True
+        return PriceDelta(changed=changed, response=self.response)
+
+    def apply(self, response: FuelPrices,
+              complete: bool = False) -> List[Price]:
+        """
+        Merges a response into the snapshot.
+
+        A price is considered changed when its ``(station_code, fuel_type)``
+        pair is new, or its price or ``last_updated`` differ from the
+        snapshot.
+
+        :param complete: The response holds every current price, so prices
+        and stations absent from it are dropped from the snapshot.
+        :returns: The prices which changed.
+        """
+        for station in response.stations:
+            self._stations[station.code] = station
+
+        changed = []  # type: List[Price]
+        seen = set()
+        for price in response.prices:
+            key = (price.station_code, price.fuel_type)
+            seen.add(key)
+            previous = self._prices.get(key)
+            if previous is None or not _is_same_price(previous, price):
+                self._prices[key] = price
+                changed.append(price)
+
+        if complete:
+            self._prices = {
+                key: price for key, price in self._prices.items()
+                if key in seen
+            }
+            station_codes = {station.code for station in response.stations}
+            self._stations = {
+                code: station for code, station in self._stations.items()
+                if code in station_codes
+            }
+
+        if changed or response.stations or complete:
+            self._response = None
+
+        return changed
+
+
+def _is_same_price(a: Price, b: Price) -> bool:
+    return a.last_updated == b.last_updated and a.price == b.price
@@ -1,45 +1,138 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from enum import Enum
-from typing import Optional, List, Any, Dict
+from bisect import bisect_left
+from functools import cached_property, lru_cache
+from sys import intern
+from types import MappingProxyType
+from typing import (
+    Optional, List, Any, Callable, Dict, Generic, Iterator, Literal, Mapping,
+    Protocol, Sequence, Tuple, Type, TypeVar, Union, overload)
+
+T = TypeVar('T')
+
+
+class Response(Protocol):
+    """The parts of an HTTP response (requests or httpx) used by the DTOs."""
+
+    @property
+    def status_code(self) -> int:
+        ...
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        ...
+
+    @property
+    def text(self) -> str:
+        ...
+
+    def json(self) -> Any:
+        ...
+
+
+@lru_cache(maxsize=8192)
+def _parse_last_updated(value: str) -> Optional[datetime]:
+    """
+    Parses a price timestamp. Many prices share the same timestamp, so
+    results are memoized.
+    """
+    # Stupid API has two different date representations! :O
+    # Slice out the fields of the two known fixed width formats, and only
+    # fall back to strptime for anything unexpected. Every separator and
+    # digit is checked, so the fast path accepts exactly what strptime
+    # would for these formats.
+    if len(value) == 19 and value[10] == ' ' and value[13] == ':' \
+            and value[16] == ':' and value.isascii():
+        clock = (value[11:13], value[14:16], value[17:19])
+        fields: Optional[Tuple[str, ...]] = None
+        if value[2] == '/' and value[5] == '/':
+            fields = (value[6:10], value[3:5], value[0:2]) + clock
+        elif value[4] == '-' and value[7] == '-':
+            fields = (value[0:4], value[5:7], value[8:10]) + clock
+        if fields is not None and ''.join(fields).isdigit():
+            year, month, day, hour, minute, second = map(int, fields)
+            try:
+                return datetime(year, month, day, hour, minute, second)
+            except ValueError:
+                pass
+
+    for fmt in ('%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+
+    return None
+
+
+class _Record(object):
+    """
+    Base class for the immutable DTOs. Fields are stored in ``__slots__``,
+    and instances compare and hash by the value of those fields.
+    """
+    __slots__: Tuple[str, ...] = ()
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple([getattr(self, name) for name in self.__slots__])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            '{} is immutable'.format(type(self).__name__))
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            '{} is immutable'.format(type(self).__name__))
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
 
-from requests import Response
+    def __hash__(self) -> int:
+        return hash(self._values())
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), self._values()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return None if value is None else intern(value)
+
+
+class Price(_Record):
+    __slots__ = ('fuel_type', 'price', 'last_updated', 'price_unit',
+                 'station_code')
+
+    fuel_type: str
+    price: float
+    last_updated: Optional[datetime]
+    price_unit: Optional[str]
+    station_code: Optional[int]
 
-class Price(object):
     def __init__(self, fuel_type: str, price: float,
                  last_updated: Optional[datetime], price_unit: Optional[str],
                  station_code: Optional[int]) -> None:
-        self.fuel_type = fuel_type
-        self.price = price
-        self.last_updated = last_updated
-        self.price_unit = price_unit
-        self.station_code = station_code
+        _set = object.__setattr__
+        _set(self, 'fuel_type', fuel_type)
+        _set(self, 'price', price)
+        _set(self, 'last_updated', last_updated)
+        _set(self, 'price_unit', price_unit)
+        _set(self, 'station_code', station_code)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'Price':
-
-        # Stupid API has two different date representations! :O
-        lastupdated = None
-        try:
-            lastupdated = datetime.strptime(
-                data['lastupdated'], '%d/%m/%Y %H:%M:%S')
-        except ValueError:
-            pass
-        try:
-            lastupdated = datetime.strptime(
-                data['lastupdated'], '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            pass
+        lastupdated = _parse_last_updated(data['lastupdated'])
 
         station_code = None # type: Optional[int]
         if 'stationcode' in data:
             station_code = int(data['stationcode'])
 
         return Price(
-            fuel_type=data['fueltype'],
+            fuel_type=intern(data['fueltype']),
             price=data['price'],
             last_updated=lastupdated,
-            price_unit=data.get('priceunit'),
+            price_unit=_intern(data.get('priceunit')),
             station_code=station_code
         )
 
@@ -48,23 +141,43 @@ class Price(object):
             self.fuel_type, self.price)
 
 
-class Station(object):
+class Station(_Record):
+    __slots__ = ('id', 'brand', 'code', 'name', 'address', 'latitude',
+                 'longitude')
+
+    id: Optional[str]
+    brand: str
+    code: int
+    name: str
+    address: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+
     def __init__(self, id: Optional[str], brand: str, code: int,
-                 name: str, address: str) -> None:
-        self.id = id
-        self.brand = brand
-        self.code = code
-        self.name = name
-        self.address = address
+                 name: str, address: str, latitude: Optional[float] = None,
+                 longitude: Optional[float] = None) -> None:
+        _set = object.__setattr__
+        _set(self, 'id', id)
+        _set(self, 'brand', brand)
+        _set(self, 'code', code)
+        _set(self, 'name', name)
+        _set(self, 'address', address)
+        _set(self, 'latitude', latitude)
+        _set(self, 'longitude', longitude)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'Station':
+        location = data.get('location') or {}
+        latitude = location.get('latitude')
+        longitude = location.get('longitude')
         return Station(
             id=data.get('stationid'),
-            brand=data['brand'],
+            brand=intern(data['brand']),
             code=int(data['code']),
             name=data['name'],
-            address=data['address']
+            address=data['address'],
+            latitude=None if latitude is None else float(latitude),
+            longitude=None if longitude is None else float(longitude),
         )
 
     def __repr__(self) -> str:
@@ -79,16 +192,23 @@ class Period(Enum):
     WEEK = 'Week'
 
 
-class Variance(object):
+class Variance(_Record):
+    __slots__ = ('fuel_type', 'period', 'price')
+
+    fuel_type: str
+    period: Period
+    price: float
+
     def __init__(self, fuel_type: str, period: Period, price: float) -> None:
-        self.fuel_type = fuel_type
-        self.period = period
-        self.price = price
+        _set = object.__setattr__
+        _set(self, 'fuel_type', fuel_type)
+        _set(self, 'period', period)
+        _set(self, 'price', price)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'Variance':
         return Variance(
-            fuel_type=data['Code'],
+            fuel_type=intern(data['Code']),
             period=Period(data['Period']),
             price=data['Price'],
         )
@@ -101,13 +221,21 @@ class Variance(object):
         )
 
 
-class AveragePrice(object):
+class AveragePrice(_Record):
+    __slots__ = ('fuel_type', 'period', 'price', 'captured')
+
+    fuel_type: str
+    period: Period
+    price: float
+    captured: datetime
+
     def __init__(self, fuel_type: str, period: Period, price: float,
                  captured: datetime) -> None:
-        self.fuel_type = fuel_type
-        self.period = period
-        self.price = price
-        self.captured = captured
+        _set = object.__setattr__
+        _set(self, 'fuel_type', fuel_type)
+        _set(self, 'period', period)
+        _set(self, 'price', price)
+        _set(self, 'captured', captured)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'AveragePrice':
@@ -122,7 +250,7 @@ class AveragePrice(object):
             captured = captured_raw
 
         return AveragePrice(
-            fuel_type=data['Code'],
+            fuel_type=intern(data['Code']),
             period=period,
             price=data['Price'],
             captured=captured,
@@ -138,23 +266,35 @@ class AveragePrice(object):
         )
 
 
-class FuelType(object):
+class FuelType(_Record):
+    __slots__ = ('code', 'name')
+
+    code: str
+    name: str
+
     def __init__(self, code: str, name: str) -> None:
-        self.code = code
-        self.name = name
+        _set = object.__setattr__
+        _set(self, 'code', code)
+        _set(self, 'name', name)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'FuelType':
         return FuelType(
-            code=data['code'],
+            code=intern(data['code']),
             name=data['name']
         )
 
 
-class TrendPeriod(object):
+class TrendPeriod(_Record):
+    __slots__ = ('period', 'description')
+
+    period: str
+    description: str
+
     def __init__(self, period: str, description: str) -> None:
-        self.period = period
-        self.description = description
+        _set = object.__setattr__
+        _set(self, 'period', period)
+        _set(self, 'description', description)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'TrendPeriod':
@@ -164,10 +304,16 @@ class TrendPeriod(object):
         )
 
 
-class SortField(object):
+class SortField(_Record):
+    __slots__ = ('code', 'name')
+
+    code: str
+    name: str
+
     def __init__(self, code: str, name: str) -> None:
-        self.code = code
-        self.name = name
+        _set = object.__setattr__
+        _set(self, 'code', code)
+        _set(self, 'name', name)
 
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'SortField':
@@ -177,8 +323,137 @@ class SortField(object):
         )
 
 
-class GetReferenceDataResponse(object):
-    def __init__(self, stations: List[Station], brands: List[str],
+_setattr = object.__setattr__
+
+
+class _LazyRecord(object):
+    """
+    Mixin for lazily deserialized DTOs, which keep their raw JSON object.
+    Fields with a parser in ``_parsers`` are parsed from it on first access,
+    and then stored in the field's slot so later accesses cost nothing
+    extra.
+
+    Lazy records compare equal to, and pickle as, their eager counterparts.
+    """
+    __slots__ = ()
+
+    # The eager DTO type, and parsers for the fields deferred until access.
+    _eager: Type[_Record]
+    _data: Dict[str, Any]
+    _parsers: Dict[str, Callable[[Dict[str, Any]], Any]]
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called while a field's slot is still empty.
+        try:
+            parse = self._parsers[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        value = parse(self._data)
+        _setattr(self, name, value)
+        return value
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple([getattr(self, name) for name in self._eager.__slots__])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, self._eager):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return self._eager, self._values()
+
+
+def _station_code(data: Dict[str, Any]) -> Optional[int]:
+    return int(data['stationcode']) if 'stationcode' in data else None
+
+
+class LazyPrice(_LazyRecord, Price):
+    """
+    A :class:`Price` whose timestamp is parsed on first access. Its other
+    fields are cheap to read, so are set up front.
+    """
+    __slots__ = ('_data',)
+
+    _eager = Price
+    _parsers = {
+        'last_updated': lambda data: _parse_last_updated(data['lastupdated']),
+    }
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        _setattr(self, '_data', data)
+        _setattr(self, 'fuel_type', intern(data['fueltype']))
+        _setattr(self, 'price', data['price'])
+        _setattr(self, 'price_unit', _intern(data.get('priceunit')))
+        _setattr(self, 'station_code', _station_code(data))
+
+
+class LazySequence(Sequence[T], Generic[T]):
+    """
+    A read-only sequence view over raw data, such as a list of JSON
+    objects, building each item from its raw form the first time it is
+    accessed.
+    """
+    __slots__ = ('_data', '_build', '_items')
+
+    def __init__(self, data: Sequence[Any],
+                 build: Callable[[Any], T]) -> None:
+        self._data = data
+        self._build = build
+        self._items: List[Optional[T]] = [None] * len(data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[T]:
+        items = self._items
+        for i, item in enumerate(items):
+            if item is None:
+                item = items[i] = self._build(self._data[i])
+            yield item
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._build(self._data[index])
+        return item
+
+    def __repr__(self) -> str:
+        return '<LazySequence of {} items>'.format(len(self))
+
+
+def _normalize_name(name: str) -> str:
+    """Case folds a name and reduces it to words separated by spaces."""
+    return ' '.join(''.join(
+        c if c.isalnum() else ' ' for c in name.casefold()).split())
+
+
+class ReferenceData(object):
+    """
+    The API reference data, with its stations in any sequence, e.g. one
+    built on access from a snapshot file. :class:`GetReferenceDataResponse`
+    holds them in a list.
+
+    Lookups by station code, station id, brand and fuel code, and station
+    name search, use indexes built on first use. The indexes are read-only
+    snapshots, so the lists should not be modified once they are used.
+    """
+    stations: Sequence[Station]
+
+    def __init__(self, stations: Sequence[Station], brands: List[str],
                  fuel_types: List[FuelType], trend_periods: List[TrendPeriod],
                  sort_fields: List[SortField]) -> None:
         self.stations = stations
@@ -187,6 +462,80 @@ class GetReferenceDataResponse(object):
         self.trend_periods = trend_periods
         self.sort_fields = sort_fields
 
+    @cached_property
+    def stations_by_code(self) -> Mapping[int, Station]:
+        return MappingProxyType(
+            {station.code: station for station in self.stations})
+
+    @cached_property
+    def stations_by_id(self) -> Mapping[str, Station]:
+        return MappingProxyType({
+            station.id: station for station in self.stations
+            if station.id is not None})
+
+    @cached_property
+    def stations_by_brand(self) -> Mapping[str, Tuple[Station, ...]]:
+        by_brand: Dict[str, List[Station]] = {}
+        for station in self.stations:
+            by_brand.setdefault(station.brand, []).append(station)
+        return MappingProxyType({
+            brand: tuple(stations) for brand, stations in by_brand.items()})
+
+    @cached_property
+    def fuel_types_by_code(self) -> Mapping[str, FuelType]:
+        return MappingProxyType(
+            {fuel_type.code: fuel_type for fuel_type in self.fuel_types})
+
+    @cached_property
+    def _name_index(self) -> Tuple[List[str], List[Station]]:
+        # Every word-aligned suffix of every normalized station name, in
+        # sorted order, with the station it came from.
+        entries = []
+        for station in self.stations:
+            words = _normalize_name(station.name).split(' ')
+            for i in range(len(words)):
+                entries.append((' '.join(words[i:]), station.code, station))
+        entries.sort(key=lambda entry: entry[:2])
+        return ([key for key, _, _ in entries],
+                [station for _, _, station in entries])
+
+    def search_stations(self, prefix: str) -> List[Station]:
+        """
+        Finds the stations with a word in their name starting with
+        ``prefix``, ignoring case and punctuation. A multi-word prefix
+        matches consecutive words, e.g. ``'7-eleven hurst'`` matches
+        "7-Eleven Hurstville".
+
+        :returns: Matching stations, ordered by the matched part of their
+        name.
+        """
+        key = _normalize_name(prefix)
+        if not key:
+            return []
+        keys, stations = self._name_index
+        matches: Dict[int, Station] = {}
+        i = bisect_left(keys, key)
+        while i < len(keys) and keys[i].startswith(key):
+            matches.setdefault(stations[i].code, stations[i])
+            i += 1
+        return list(matches.values())
+
+    def __repr__(self) -> str:
+        return ('<{} stations=<{} stations>>').format(
+            type(self).__name__, len(self.stations)
+        )
+
+
+class GetReferenceDataResponse(ReferenceData):
+    """The API reference data, as returned by the API."""
+    stations: List[Station]
+
+    def __init__(self, stations: List[Station], brands: List[str],
+                 fuel_types: List[FuelType], trend_periods: List[TrendPeriod],
+                 sort_fields: List[SortField]) -> None:
+        super().__init__(stations, brands, fuel_types, trend_periods,
+                         sort_fields)
+
     @classmethod
     def deserialize(cls, data: Dict[str, Any]) -> 'GetReferenceDataResponse':
         stations = [Station.deserialize(x) for x in data['stations']['items']]
@@ -206,19 +555,70 @@ class GetReferenceDataResponse(object):
             sort_fields=sort_fields
         )
 
-    def __repr__(self) -> str:
-        return ('<GetReferenceDataResponse stations=<{} stations>>').format(
-            len(self.stations)
-        )
 
+class FuelPrices(object):
+    """
+    A snapshot of stations and their prices, in any sequences, e.g. ones
+    which build each item on access. :class:`GetFuelPricesResponse` holds
+    them in lists.
 
-class GetFuelPricesResponse(object):
-    def __init__(self, stations: List[Station], prices: List[Price]) -> None:
+    :meth:`prices_for` uses an index built on first use, so the sequences
+    should not be modified once it is called.
+    """
+    stations: Sequence[Station]
+    prices: Sequence[Price]
+
+    def __init__(self, stations: Sequence[Station],
+                 prices: Sequence[Price]) -> None:
         self.stations = stations
         self.prices = prices
 
+    @cached_property
+    def _prices_by_station(self) -> Mapping[Optional[int], Tuple[Price, ...]]:
+        by_station: Dict[Optional[int], List[Price]] = {}
+        for price in self.prices:
+            by_station.setdefault(price.station_code, []).append(price)
+        return MappingProxyType({
+            code: tuple(prices) for code, prices in by_station.items()})
+
+    def prices_for(self, station_code: int) -> Tuple[Price, ...]:
+        """The prices at a station, in the order they were given."""
+        return self._prices_by_station.get(station_code, ())
+
+
+class GetFuelPricesResponse(FuelPrices):
+    """A snapshot of stations and their prices, held in lists."""
+    stations: List[Station]
+    prices: List[Price]
+
+    def __init__(self, stations: List[Station], prices: List[Price]) -> None:
+        super().__init__(stations, prices)
+
+    @overload
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any],
+                    lazy: Literal[False] = False) -> 'GetFuelPricesResponse':
+        ...
+
+    @overload
+    @classmethod
+    def deserialize(cls, data: Dict[str, Any], lazy: bool) -> FuelPrices:
+        ...
+
     @classmethod
-    def deserialize(cls, data: Dict[str, Any]) -> 'GetFuelPricesResponse':
+    def deserialize(cls, data: Dict[str, Any],
+                    lazy: bool = False) -> FuelPrices:
+        """
+        :param lazy: Whether to return a :class:`FuelPrices` whose
+        ``stations`` and ``prices`` are sequence views over ``data``,
+        building each station and :class:`LazyPrice` on first access,
+        rather than a response with lists built up front.
+        """
+        if lazy:
+            return FuelPrices(
+                stations=LazySequence(data['stations'], Station.deserialize),
+                prices=LazySequence(data['prices'], LazyPrice),
+            )
         stations = [Station.deserialize(x) for x in data['stations']]
         prices = [Price.deserialize(x) for x in data['prices']]
         return GetFuelPricesResponse(
@@ -227,11 +627,41 @@ class GetFuelPricesResponse(object):
         )
 
 
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
 class FuelCheckError(Exception):
+    """
+    An error response from the API.
+
+    :param error_code: The API's error code, if the response included one.
+    :param status_code: The HTTP status of the response.
+    :param retry_after: Seconds the server asked the client to wait before
+    retrying, from the ``Retry-After`` header.
+    """
+
     def __init__(self, error_code: Optional[str] = None,
-                 description: Optional[str] = None) -> None:
+                 description: Optional[str] = None,
+                 status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None) -> None:
         super(FuelCheckError, self).__init__(description)
         self.error_code = error_code
+        self.status_code = status_code
+        self.retry_after = retry_after
 
     @classmethod
     def create(cls, response: Response) -> 'FuelCheckError':
@@ -254,5 +684,7 @@ class FuelCheckError(Exception):
 
         return FuelCheckError(
             error_code=error_code,
-            description=description
+            description=description,
+            status_code=response.status_code,
+            retry_after=_parse_retry_after(response.headers.get('Retry-After')),
         )
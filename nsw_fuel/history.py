@@ -0,0 +1,184 @@
+"""
+A persistent history of fuel prices, built up from periodic snapshots and
+stored in SQLite.
+"""
+import datetime
+import sqlite3
+import threading
+from types import TracebackType
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Type
+
+from .dto import FuelPrices, Price, Station, _parse_last_updated
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS prices (
+    station_code INTEGER NOT NULL,
+    fuel_type TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    price REAL NOT NULL,
+    price_unit TEXT,
+    PRIMARY KEY (station_code, fuel_type, last_updated)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_fuel_type
+    ON prices (fuel_type, last_updated);
+CREATE INDEX IF NOT EXISTS prices_by_time ON prices (last_updated);
+CREATE TABLE IF NOT EXISTS stations (
+    code INTEGER PRIMARY KEY,
+    id TEXT,
+    brand TEXT NOT NULL,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL
+);
+'''
+
+# Timestamps are stored as text in this format, which sorts
+# chronologically and is parsed by the DTOs' fast path.
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_PRICE_COLUMNS = 'fuel_type, price, last_updated, price_unit, station_code'
+
+
+def _price(row: Tuple[Any, ...]) -> Price:
+    fuel_type, price, last_updated, price_unit, station_code = row
+    return Price(fuel_type=fuel_type, price=price,
+                 last_updated=_parse_last_updated(last_updated),
+                 price_unit=price_unit, station_code=station_code)
+
+
+class PriceHistory(object):
+    """
+    Stores every distinct price seen in the snapshots added to it, so that
+    price history can be queried by station, fuel type and time.
+
+    A price is identified by its station, fuel type and ``last_updated``
+    time. Adding the same price again, as happens when polling faster than
+    prices change, has no effect. Prices without a station code or time
+    cannot be identified, so are not stored.
+
+    Use the history as a context manager (or call :meth:`close`) to close
+    the database.
+
+    :param path: SQLite database file, created if missing. Defaults to an
+    in-memory database.
+    """
+
+    def __init__(self, path: str = ':memory:') -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'PriceHistory':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def add(self, response: FuelPrices) -> int:
+        """
+        Adds a snapshot's prices to the history, and records the latest
+        details of its stations.
+
+        :returns: The number of prices which were not already stored.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO stations VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(station.code, station.id, station.brand, station.name,
+                  station.address, station.latitude, station.longitude)
+                 for station in response.stations])
+            return self._insert_prices(response.prices)
+
+    def add_prices(self, prices: Iterable[Price]) -> int:
+        """
+        Adds prices to the history.
+
+        :returns: The number of prices which were not already stored.
+        """
+        with self._lock, self._connection:
+            return self._insert_prices(prices)
+
+    def _insert_prices(self, prices: Iterable[Price]) -> int:
+        rows = []
+        for price in prices:
+            if price.station_code is None or price.last_updated is None:
+                continue
+            rows.append((price.station_code, price.fuel_type,
+                         price.last_updated.strftime(_TIMESTAMP_FORMAT),
+                         price.price, price.price_unit))
+
+        before = self._connection.total_changes
+        self._connection.executemany(
+            'INSERT OR IGNORE INTO prices VALUES (?, ?, ?, ?, ?)', rows)
+        return self._connection.total_changes - before
+
+    def _query(self, sql: str,
+               parameters: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def __len__(self) -> int:
+        return int(self._query('SELECT COUNT(*) FROM prices')[0][0])
+
+    def prices(self, station_code: Optional[int] = None,
+               fuel_type: Optional[str] = None,
+               since: Optional[datetime.datetime] = None,
+               until: Optional[datetime.datetime] = None) -> List[Price]:
+        """
+        Finds the stored prices matching every given condition, oldest
+        first.
+
+        :param since: Earliest ``last_updated`` time, inclusive.
+        :param until: Latest ``last_updated`` time, exclusive.
+        """
+        conditions = []
+        parameters: List[Any] = []
+        if station_code is not None:
+            conditions.append('station_code = ?')
+            parameters.append(station_code)
+        if fuel_type is not None:
+            conditions.append('fuel_type = ?')
+            parameters.append(fuel_type)
+        if since is not None:
+            conditions.append('last_updated >= ?')
+            parameters.append(since.strftime(_TIMESTAMP_FORMAT))
+        if until is not None:
+            conditions.append('last_updated < ?')
+            parameters.append(until.strftime(_TIMESTAMP_FORMAT))
+
+        sql = 'SELECT {} FROM prices'.format(_PRICE_COLUMNS)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY last_updated, station_code, fuel_type'
+        return [_price(row) for row in self._query(sql, parameters)]
+
+    def latest(self, station_code: int, fuel_type: str,
+               n: int = 1) -> List[Price]:
+        """The last ``n`` prices of a fuel at a station, newest first."""
+        return [_price(row) for row in self._query(
+            'SELECT {} FROM prices WHERE station_code = ? AND fuel_type = ? '
+            'ORDER BY last_updated DESC LIMIT ?'.format(_PRICE_COLUMNS),
+            (station_code, fuel_type, n))]
+
+    def station(self, code: int) -> Optional[Station]:
+        """The latest details recorded for a station, if any."""
+        rows = self._query(
+            'SELECT id, brand, code, name, address, latitude, longitude '
+            'FROM stations WHERE code = ?', (code,))
+        if not rows:
+            return None
+        return Station(*rows[0])
+
+    def stations(self) -> List[Station]:
+        """The latest details recorded for every station, by code."""
+        return [Station(*row) for row in self._query(
+            'SELECT id, brand, code, name, address, latitude, longitude '
+            'FROM stations ORDER BY code')]
@@ -0,0 +1,268 @@
+"""
+Instrumentation hooks for :class:`nsw_fuel.FuelCheckClient`, reporting
+where the time goes in each request, with adapters for ``logging`` and for
+an in-memory, Prometheus-style metrics registry.
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class RequestSpan(object):
+    """
+    Timings and sizes for a single client call, including any retries.
+
+    Phases are measured in seconds:
+
+    * ``request``: connecting and waiting for the response headers, summed
+      over every attempt.
+    * ``download``: reading the response body.
+    * ``decode``: decoding the body as JSON.
+    * ``deserialize``: building DTOs from the decoded JSON.
+
+    Phases which did not run (e.g. after an error) are absent.
+    """
+
+    __slots__ = ('endpoint', 'method', 'status_code', 'attempts',
+                 'response_bytes', 'objects', 'error_code', 'error',
+                 'phases', 'duration')
+
+    def __init__(self, endpoint: str, method: str) -> None:
+        self.endpoint = endpoint
+        self.method = method
+        self.status_code: Optional[int] = None
+        self.attempts = 0
+        self.response_bytes: Optional[int] = None
+        self.objects: Optional[int] = None
+        self.error_code: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.phases: Dict[str, float] = {}
+        self.duration = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def lap(self, phase: str, since: float) -> float:
+        """
+        Records a phase as lasting from ``since`` until now, adding to its
+        time so far if it ran before (e.g. the request of each attempt).
+        """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - since
+        return now
+
+
+class Observer(object):
+    """
+    Receives a :class:`RequestSpan` once each instrumented client call
+    completes, whether or not it succeeded. Subclass and override
+    :meth:`on_request`.
+    """
+
+    def on_request(self, span: RequestSpan) -> None:
+        pass
+
+
+class LoggingObserver(Observer):
+    """Logs a line per request, and a warning for each failed request."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None,
+                 level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger('nsw_fuel')
+        self.level = level
+
+    def on_request(self, span: RequestSpan) -> None:
+        level = self.level if span.ok else logging.WARNING
+        if not self.logger.isEnabledFor(level):
+            return
+        phases = ' '.join('{}={:.1f}ms'.format(phase, seconds * 1000)
+                          for phase, seconds in span.phases.items())
+        self.logger.log(
+            level,
+            '%s %s status=%s attempts=%d bytes=%s objects=%s error=%s '
+            'total=%.1fms %s',
+            span.method, span.endpoint, span.status_code, span.attempts,
+            span.response_bytes, span.objects,
+            span.error_code or (span.error and type(span.error).__name__),
+            span.duration * 1000, phases)
+
+
+def _labels(values: Dict[str, str]) -> Labels:
+    return tuple(sorted(values.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(
+        name, value.replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels) + '}'
+
+
+class Counter(object):
+    """A monotonically increasing value per label set."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name, labels, value)
+                    for labels, value in sorted(self._values.items())]
+
+
+class Histogram(object):
+    """Observations counted into cumulative buckets per label set."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        # Per label set: the count in each bucket (plus +Inf), and the sum.
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = (
+                    [0] * (len(self.buckets) + 1), [0.0])
+            counts, total = entry
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(_labels(labels))
+        return 0 if entry is None else sum(entry[0])
+
+    def sum(self, **labels: str) -> float:
+        entry = self._values.get(_labels(labels))
+        return 0.0 if entry is None else entry[1][0]
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        samples: List[Tuple[str, Labels, float]] = []
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    samples.append((self.name + '_bucket',
+                                    labels + (('le', bound),), cumulative))
+                samples.append((self.name + '_count', labels, cumulative))
+                samples.append((self.name + '_sum', labels, total[0]))
+        return samples
+
+
+class MetricsRegistry(object):
+    """
+    Holds metrics in memory, and renders them in the Prometheus text
+    exposition format, e.g. to serve from a ``/metrics`` endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Gets or creates the counter with the given name."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, documentation)
+            metric: Counter = self._metrics[name]
+            return metric
+
+    def histogram(self, name: str, documentation: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Gets or creates the histogram with the given name."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, buckets)
+            metric: Histogram = self._metrics[name]
+            return metric
+
+    def render(self) -> str:
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append('# HELP {} {}'.format(name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(name, metric.type))
+            for sample_name, labels, value in metric.samples():
+                lines.append('{}{} {}'.format(
+                    sample_name, _format_labels(labels), repr(float(value))))
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsObserver(Observer):
+    """Records request counts, errors, sizes and latencies in a registry."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None,
+                 prefix: str = 'fuelcheck') -> None:
+        self.registry = registry or MetricsRegistry()
+        self.requests = self.registry.counter(
+            prefix + '_requests_total', 'Client calls by endpoint and status.')
+        self.attempts = self.registry.counter(
+            prefix + '_attempts_total', 'HTTP requests, including retries.')
+        self.errors = self.registry.counter(
+            prefix + '_errors_total', 'Failed client calls by error code.')
+        self.response_bytes = self.registry.counter(
+            prefix + '_response_bytes_total', 'Response body bytes read.')
+        self.objects = self.registry.counter(
+            prefix + '_objects_total', 'DTOs deserialized.')
+        self.duration = self.registry.histogram(
+            prefix + '_request_duration_seconds',
+            'Client call latency by phase.')
+
+    def on_request(self, span: RequestSpan) -> None:
+        endpoint = span.endpoint
+        self.requests.inc(endpoint=endpoint, status=str(span.status_code))
+        self.attempts.inc(span.attempts, endpoint=endpoint)
+        if not span.ok:
+            code = span.error_code
+            if code is None:
+                code = type(span.error).__name__
+            self.errors.inc(endpoint=endpoint, code=code)
+        if span.response_bytes is not None:
+            self.response_bytes.inc(span.response_bytes, endpoint=endpoint)
+        if span.objects is not None:
+            self.objects.inc(span.objects, endpoint=endpoint)
+        for phase, seconds in span.phases.items():
+            self.duration.observe(seconds, endpoint=endpoint, phase=phase)
+        self.duration.observe(span.duration, endpoint=endpoint, phase='total')
+
+
+def count_objects(value: Any) -> int:
+    """Counts the DTOs in a client call's result."""
+    if isinstance(value, tuple):
+        return sum(count_objects(item) for item in value)
+    if isinstance(value, Sequence):
+        return len(value)
+    # A response's DTO collections, e.g. lists or lazy sequences.
+    return sum(len(item) for item in vars(value).values()
+               if isinstance(item, Sequence) and not isinstance(item, str))
@@ -0,0 +1,117 @@
+"""
+Client side throttling and retry scheduling, to make the most of the API's
+per-key call quota without tripping it.
+"""
+import random
+import threading
+import time
+from typing import Callable, Container, Optional
+
+from .dto import FuelCheckError
+
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token bucket allowing ``rate`` calls per second on
+    average, with bursts of up to ``capacity`` calls.
+
+    Share one bucket between every client using the same API key to keep
+    their combined call rate under the quota.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens from the bucket, borrowing against future refills if
+        there are not enough.
+
+        :returns: Seconds the caller must wait before the tokens are
+        actually available.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Blocks until the tokens are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is retried.
+
+    Errors are fatal if their ``error_code`` is in ``fatal_error_codes``,
+    retryable if it is in ``retryable_error_codes``, and otherwise
+    retryable when their HTTP status is one of ``retryable_status_codes``
+    (429 and 5xx gateway/server errors by default).
+
+    Retries wait for the server's ``Retry-After`` when given, and otherwise
+    use exponential backoff with full jitter: a random delay of up to
+    ``base_delay * 2 ** (attempt - 1)`` seconds. Either is capped at
+    ``max_delay``.
+
+    :param max_attempts: Total number of attempts, including the first.
+    """
+
+    def __init__(self, max_attempts: int = 5,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 retryable_status_codes: Container[int] =
+                 RETRYABLE_STATUS_CODES,
+                 retryable_error_codes: Container[str] = frozenset(),
+                 fatal_error_codes: Container[str] = frozenset(),
+                 jitter: Callable[[], float] = random.random,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_status_codes = retryable_status_codes
+        self.retryable_error_codes = retryable_error_codes
+        self.fatal_error_codes = fatal_error_codes
+        self._jitter = jitter
+        self.sleep = sleep
+
+    def is_retryable(self, error: FuelCheckError) -> bool:
+        if error.error_code is not None:
+            if error.error_code in self.fatal_error_codes:
+                return False
+            if error.error_code in self.retryable_error_codes:
+                return True
+        return error.status_code in self.retryable_status_codes
+
+    def delay(self, attempt: int, error: FuelCheckError) -> float:
+        """
+        :param attempt: The number of attempts made so far, from 1.
+        :returns: Seconds to wait before the next attempt.
+        """
+        if error.retry_after is not None:
+            return min(self.max_delay, error.retry_after)
+        backoff = min(self.max_delay, self.base_delay * 2.0 ** (attempt - 1))
+        return backoff * self._jitter()
+
+    def should_retry(self, attempt: int, error: FuelCheckError) -> bool:
+        return attempt < self.max_attempts and self.is_retryable(error)
@@ -0,0 +1,139 @@
+"""
+A fuel prices cache shared between processes on one host, e.g. the workers
+of a pre-forking web server, so that only one process polls the API and
+all of them read the same memory mapped snapshot.
+"""
+import os
+import time
+from typing import Optional, Tuple
+
+from .client import FuelCheckClient
+from .dto import FuelCheckError, FuelPrices
+from .snapshot import load_fuel_prices, save
+from .transport import TRANSPORT_ERRORS
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# Identifies a published snapshot file. Publishing replaces the file, so
+# every generation has a new inode.
+Generation = Tuple[int, int, int]
+
+
+class SharedPriceCache(object):
+    """
+    Publishes fuel price snapshots into ``directory``, in the format of
+    :mod:`nsw_fuel.snapshot`, and reads the latest one.
+
+    Each publish writes a new file and atomically renames it over the
+    previous one, so readers only ever open a complete snapshot. Readers
+    keep using the generation they loaded until they notice a newer one,
+    and the operating system shares the mapped pages between processes.
+
+    When the snapshot is older than ``max_age``, the first process to take
+    the refresh lock fetches new prices with ``client`` and publishes them;
+    the others carry on with the current snapshot. Without a client, the
+    cache only reads, e.g. when a dedicated process calls :meth:`refresh`.
+
+    :param directory: Directory shared by the processes.
+    :param client: Client to fetch prices with.
+    :param max_age: Seconds before a snapshot is refreshed.
+    """
+
+    SNAPSHOT_NAME = 'prices.snapshot'
+    LOCK_NAME = 'refresh.lock'
+
+    def __init__(self, directory: str,
+                 client: Optional[FuelCheckClient] = None,
+                 max_age: float = 300) -> None:
+        self.directory = directory
+        self.client = client
+        self.max_age = max_age
+        self.path = os.path.join(directory, self.SNAPSHOT_NAME)
+        self._lock_path = os.path.join(directory, self.LOCK_NAME)
+        self._generation: Optional[Generation] = None
+        self._response: Optional[FuelPrices] = None
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def age(self) -> Optional[float]:
+        """Seconds since the current snapshot was published, if any."""
+        stat = self._stat()
+        if stat is None:
+            return None
+        return max(0.0, time.time() - stat.st_mtime)
+
+    def _is_fresh(self) -> bool:
+        age = self.age()
+        return age is not None and age < self.max_age
+
+    def publish(self, response: FuelPrices) -> None:
+        """Publishes a fuel prices response as the current snapshot."""
+        save(response, self.path)
+
+    def refresh(self, force: bool = False, wait: bool = True) -> bool:
+        """
+        Fetches and publishes new prices, unless another process holds the
+        refresh lock or, after taking it, the snapshot is already fresh.
+
+        :param force: Refresh even if the snapshot is fresh.
+        :param wait: Whether to wait for the lock if another process holds
+        it, rather than returning.
+        :returns: Whether this process published a new snapshot.
+        """
+        if self.client is None:
+            raise ValueError('A client is required to refresh the cache')
+
+        with open(self._lock_path, 'a') as lock:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX
+                if not wait:
+                    flags |= fcntl.LOCK_NB
+                try:
+                    fcntl.flock(lock, flags)
+                except BlockingIOError:
+                    return False
+            # The previous lock holder may have just refreshed.
+            if not force and self._is_fresh():
+                return False
+            self.publish(self.client.get_fuel_prices())
+            return True
+
+    def get_fuel_prices(self) -> FuelPrices:
+        """
+        Returns the latest published snapshot, refreshing it first if it
+        is stale and this cache has a client.
+
+        A stale snapshot is still returned if refreshing fails, or while
+        another process is refreshing. Only when there is no snapshot at
+        all does this wait for one, or raise the refresh error.
+
+        :raises FileNotFoundError: If nothing has been published and there
+        is no client to fetch prices with.
+        """
+        if self.client is not None and not self._is_fresh():
+            has_snapshot = self._stat() is not None
+            try:
+                self.refresh(wait=not has_snapshot)
+            except (FuelCheckError, *TRANSPORT_ERRORS):
+                if not has_snapshot:
+                    raise
+        return self._load()
+
+    def _load(self) -> FuelPrices:
+        stat = self._stat()
+        if stat is None:
+            raise FileNotFoundError(self.path)
+        # If a new generation is published between the stat and the load,
+        # it is simply loaded again on the next call.
+        generation = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+        if generation != self._generation or self._response is None:
+            self._response = load_fuel_prices(self.path)
+            self._generation = generation
+        return self._response
@@ -0,0 +1,294 @@
+"""
+A compact binary snapshot format for fuel prices and reference data, which
+loads in milliseconds by memory mapping the file rather than parsing it.
+
+A snapshot is a header followed by a body:
+
+* Header: magic ``b'NSWF'``, format version and snapshot kind (``u16``
+  each), body length (``u64``), CRC-32 of the body (``u32``) and padding.
+* Body: a string table, then a fixed sequence of typed columns. The string
+  table is a count and byte length (``u32`` each) and the strings encoded
+  as UTF-8, separated by NUL bytes. Each column is a 4 byte typecode, 4
+  bytes of padding, an item count (``u64``), then the items, padded to a
+  multiple of 8 bytes. Strings are stored in columns as indexes into the
+  string table.
+
+All numbers are little-endian. Missing strings, station codes and
+timestamps are stored as the largest ``u32``, the smallest ``i64`` and
+the smallest ``i64`` respectively; missing coordinates as NaN.
+"""
+import datetime
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .dto import (
+    FuelPrices, FuelType, LazySequence, Price, ReferenceData, SortField,
+    Station, TrendPeriod)
+
+MAGIC = b'NSWF'
+VERSION = 1
+
+FUEL_PRICES = 1
+REFERENCE_DATA = 2
+
+_HEADER = struct.Struct('<4sHHQI4x')
+_STRING_TABLE = struct.Struct('<II')
+_COLUMN = struct.Struct('<4s4xQ')
+
+_NO_STRING = 2 ** 32 - 1
+_NO_INT = -2 ** 63
+
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is corrupt, or not of the expected kind or version."""
+
+
+def _pad(length: int) -> bytes:
+    return b'\0' * (-length % 8)
+
+
+class _Writer(object):
+    def __init__(self) -> None:
+        self._strings: Dict[str, int] = {}
+        self._columns: List['array[Any]'] = []
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NO_STRING
+        index = self._strings.get(value)
+        if index is None:
+            if '\0' in value:
+                raise ValueError('Strings cannot contain NUL characters')
+            index = self._strings[value] = len(self._strings)
+        return index
+
+    def strings(self, values: Iterable[Optional[str]]) -> None:
+        self.column('I', [self.string(value) for value in values])
+
+    def column(self, typecode: str, values: Iterable[Any]) -> None:
+        self._columns.append(array(typecode, values))
+
+    def stations(self, stations: Sequence[Station]) -> None:
+        self.strings(station.id for station in stations)
+        self.strings(station.brand for station in stations)
+        self.column('q', [station.code for station in stations])
+        self.strings(station.name for station in stations)
+        self.strings(station.address for station in stations)
+        self.column('d', [_float(station.latitude) for station in stations])
+        self.column('d', [_float(station.longitude) for station in stations])
+
+    def body(self) -> bytes:
+        strings = '\0'.join(self._strings).encode('utf-8')
+        parts = [_STRING_TABLE.pack(len(self._strings), len(strings)),
+                 strings, _pad(len(strings))]
+        for column in self._columns:
+            if sys.byteorder == 'big':  # pragma: no cover
+                column.byteswap()
+            data = column.tobytes()
+            parts.extend([
+                _COLUMN.pack(column.typecode.encode('ascii'), len(column)),
+                data, _pad(len(data))])
+        return b''.join(parts)
+
+
+def _float(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _epoch(value: Optional[datetime.datetime]) -> int:
+    if value is None:
+        return _NO_INT
+    return int((value - _UNIX_EPOCH).total_seconds())
+
+
+@lru_cache(maxsize=8192)
+def _datetime(seconds: int) -> Optional[datetime.datetime]:
+    if seconds == _NO_INT:
+        return None
+    return _UNIX_EPOCH + datetime.timedelta(seconds=seconds)
+
+
+class _Reader(object):
+    def __init__(self, body: memoryview) -> None:
+        self._body = body
+        count, length = _STRING_TABLE.unpack_from(body)
+        offset = _STRING_TABLE.size
+        text = str(body[offset:offset + length], 'utf-8')
+        self.strings: List[str] = text.split('\0') if count else []
+        self._offset = offset + length + len(_pad(length))
+
+    def string(self, index: int) -> Optional[str]:
+        return None if index == _NO_STRING else self.strings[index]
+
+    def column(self, typecode: str) -> Any:
+        """Reads the next column, as a view of the body where possible."""
+        stored, count = _COLUMN.unpack_from(self._body, self._offset)
+        if stored.rstrip(b'\0') != typecode.encode('ascii'):
+            raise SnapshotError('Unexpected column type {!r}'.format(stored))
+        start = self._offset + _COLUMN.size
+        length = count * array(typecode).itemsize
+        if start + length > len(self._body):
+            raise SnapshotError('Truncated column')
+        self._offset = start + length + len(_pad(length))
+        data = self._body[start:start + length]
+        if sys.byteorder == 'big':  # pragma: no cover
+            copy = array(typecode, data.tobytes())
+            copy.byteswap()
+            return copy
+        return data.cast(typecode)  # type: ignore[call-overload]
+
+    def strings_column(self) -> List[str]:
+        strings = self.strings
+        return [strings[i] for i in self.column('I')]
+
+    def stations(self) -> Sequence[Station]:
+        ids, brands, codes, names, addresses, latitudes, longitudes = (
+            self.column('I'), self.column('I'), self.column('q'),
+            self.column('I'), self.column('I'), self.column('d'),
+            self.column('d'))
+        strings, string = self.strings, self.string
+
+        def build(i: int) -> Station:
+            latitude, longitude = latitudes[i], longitudes[i]
+            return Station(
+                id=string(ids[i]),
+                brand=strings[brands[i]],
+                code=codes[i],
+                name=strings[names[i]],
+                address=strings[addresses[i]],
+                latitude=None if latitude != latitude else latitude,
+                longitude=None if longitude != longitude else longitude,
+            )
+        return LazySequence(range(len(codes)), build)
+
+
+def save(response: Union[FuelPrices, ReferenceData],
+         path: str) -> None:
+    """
+    Saves a fuel prices or reference data response as a snapshot. The file
+    is replaced atomically, so readers never see a partial snapshot.
+    """
+    writer = _Writer()
+    if isinstance(response, FuelPrices):
+        kind = FUEL_PRICES
+        prices = response.prices
+        writer.stations(response.stations)
+        writer.column('q', [_NO_INT if price.station_code is None
+                            else price.station_code for price in prices])
+        writer.strings(price.fuel_type for price in prices)
+        writer.column('d', [price.price for price in prices])
+        writer.column('q', [_epoch(price.last_updated) for price in prices])
+        writer.strings(price.price_unit for price in prices)
+    else:
+        kind = REFERENCE_DATA
+        writer.stations(response.stations)
+        writer.strings(response.brands)
+        writer.strings(fuel_type.code for fuel_type in response.fuel_types)
+        writer.strings(fuel_type.name for fuel_type in response.fuel_types)
+        writer.strings(period.period for period in response.trend_periods)
+        writer.strings(
+            period.description for period in response.trend_periods)
+        writer.strings(field.code for field in response.sort_fields)
+        writer.strings(field.name for field in response.sort_fields)
+
+    body = writer.body()
+    header = _HEADER.pack(MAGIC, VERSION, kind, len(body), zlib.crc32(body))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _open(path: str, kind: int) -> _Reader:
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError('Empty snapshot') from None
+    data = memoryview(mapped)
+    if len(data) < _HEADER.size:
+        raise SnapshotError('Truncated header')
+    magic, version, stored_kind, length, crc = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError('Not a snapshot')
+    if version != VERSION:
+        raise SnapshotError('Unsupported version {}'.format(version))
+    if stored_kind != kind:
+        raise SnapshotError('Unexpected snapshot kind {}'.format(stored_kind))
+    body = data[_HEADER.size:_HEADER.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise SnapshotError('Checksum mismatch')
+    return _Reader(body)
+
+
+def load_fuel_prices(path: str) -> FuelPrices:
+    """
+    Loads a fuel prices snapshot. Stations and prices are built from the
+    memory mapped file as they are accessed.
+
+    :raises SnapshotError: If the file is not a valid fuel prices snapshot.
+    """
+    reader = _open(path, FUEL_PRICES)
+    stations = reader.stations()
+    station_codes, fuel_types, prices, timestamps, price_units = (
+        reader.column('q'), reader.column('I'), reader.column('d'),
+        reader.column('q'), reader.column('I'))
+    strings, string = reader.strings, reader.string
+
+    def build(i: int) -> Price:
+        station_code = station_codes[i]
+        return Price(
+            fuel_type=strings[fuel_types[i]],
+            price=prices[i],
+            last_updated=_datetime(timestamps[i]),
+            price_unit=string(price_units[i]),
+            station_code=None if station_code == _NO_INT else station_code,
+        )
+
+    return FuelPrices(
+        stations=stations,
+        prices=LazySequence(range(len(prices)), build))
+
+
+def load_reference_data(path: str) -> ReferenceData:
+    """
+    Loads a reference data snapshot. Stations are built from the memory
+    mapped file as they are accessed.
+
+    :raises SnapshotError: If the file is not a valid reference data
+    snapshot.
+    """
+    reader = _open(path, REFERENCE_DATA)
+    stations = reader.stations()
+    brands = reader.strings_column()
+    fuel_types = _pairs(reader)
+    trend_periods = _pairs(reader)
+    sort_fields = _pairs(reader)
+    return ReferenceData(
+        stations=stations,
+        brands=brands,
+        fuel_types=[FuelType(*pair) for pair in fuel_types],
+        trend_periods=[TrendPeriod(*pair) for pair in trend_periods],
+        sort_fields=[SortField(*pair) for pair in sort_fields],
+    )
+
+
+def _pairs(reader: _Reader) -> List[Tuple[Any, Any]]:
+    return list(zip(reader.strings_column(), reader.strings_column()))
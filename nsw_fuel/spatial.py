@@ -0,0 +1,286 @@
+"""
+Answers radius queries against locally held station locations and prices,
+without a network round trip per query.
+"""
+import math
+from collections import defaultdict
+from typing import (
+    DefaultDict, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+    Sequence, Tuple)
+
+from .client import StationPrice
+from .dto import (
+    FuelPrices, Price, ReferenceData, Station)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres per degree of latitude.
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+Cell = Tuple[int, int]
+Located = Tuple[float, float, Station]
+
+RouteStationPrice = NamedTuple('RouteStationPrice', [
+    ('price', Price),
+    ('station', Station),
+    # The distance from the route to the station, in km.
+    ('distance', float),
+    # The distance along the route to the point nearest the station, in km.
+    ('distance_along_route', float),
+])
+
+
+def haversine_km(latitude1: float, longitude1: float,
+                 latitude2: float, longitude2: float) -> float:
+    """The great circle distance between two points, in kilometres."""
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2
+    a += math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationIndex(object):
+    """
+    A uniform latitude/longitude grid over station locations, holding the
+    current price of each fuel type at each station.
+
+    Stations without a location are not indexed.
+
+    :param cell_size: Grid cell size in degrees. The default (~5.5km) suits
+    the radii typically used with the nearby prices endpoint.
+    """
+
+    def __init__(self, stations: Iterable[Station],
+                 prices: Iterable[Price] = (),
+                 cell_size: float = 0.05) -> None:
+        self._cell_size = cell_size
+        self._stations: Dict[int, Located] = {}
+        self._cells: DefaultDict[Cell, List[Located]] = defaultdict(list)
+        self._prices: DefaultDict[int, Dict[str, Price]] = defaultdict(dict)
+
+        for station in stations:
+            self.add_station(station)
+        self.update_prices(prices)
+
+    @classmethod
+    def from_responses(
+            cls,
+            reference_data: ReferenceData,
+            prices: FuelPrices,
+            cell_size: float = 0.05
+    ) -> 'StationIndex':
+        """
+        Builds an index from the reference data station list and a fuel
+        prices snapshot. Stations only present in the snapshot are also
+        indexed.
+        """
+        index = cls(reference_data.stations, cell_size=cell_size)
+        for station in prices.stations:
+            if station.code not in index._stations:
+                index.add_station(station)
+        index.update_prices(prices.prices)
+        return index
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return (int(math.floor(latitude / self._cell_size)),
+                int(math.floor(longitude / self._cell_size)))
+
+    def add_station(self, station: Station) -> None:
+        """Adds a station to the index, replacing one with the same code."""
+        previous = self._stations.pop(station.code, None)
+        if previous is not None:
+            self._cells[self._cell(previous[0], previous[1])].remove(previous)
+
+        if station.latitude is None or station.longitude is None:
+            return
+        located = (station.latitude, station.longitude, station)
+        self._stations[station.code] = located
+        self._cells[self._cell(station.latitude, station.longitude)].append(
+            located)
+
+    def update_prices(self, prices: Iterable[Price]) -> None:
+        """Replaces the current price of each given station and fuel type."""
+        for price in prices:
+            if price.station_code is not None:
+                self._prices[price.station_code][price.fuel_type] = price
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def _candidate_cells(self, min_latitude: float, max_latitude: float,
+                         min_longitude: float,
+                         max_longitude: float) -> Iterator[List[Located]]:
+        min_row, min_col = self._cell(min_latitude, min_longitude)
+        max_row, max_col = self._cell(max_latitude, max_longitude)
+        cells = self._cells
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                cell = cells.get((row, col))
+                if cell:
+                    yield cell
+
+    def _candidates(self, latitude: float, longitude: float,
+                    radius: float) -> Iterator[List[Located]]:
+        d_latitude = radius / _KM_PER_DEGREE
+        d_longitude = radius / (_KM_PER_DEGREE * max(
+            math.cos(math.radians(latitude)), 1e-6))
+        return self._candidate_cells(
+            latitude - d_latitude, latitude + d_latitude,
+            longitude - d_longitude, longitude + d_longitude)
+
+    def stations_within_radius(
+            self, latitude: float, longitude: float, radius: float
+    ) -> List[Tuple[float, Station]]:
+        """
+        Finds the stations within ``radius`` km of a point.
+
+        :returns: ``(distance, station)`` pairs, nearest first.
+        """
+        results = []
+        for cell in self._candidates(latitude, longitude, radius):
+            for station_latitude, station_longitude, station in cell:
+                distance = haversine_km(latitude, longitude,
+                                        station_latitude, station_longitude)
+                if distance <= radius:
+                    results.append((distance, station))
+        results.sort(key=lambda result: (result[0], result[1].code))
+        return results
+
+    def get_fuel_prices_within_radius(
+            self, latitude: float, longitude: float, radius: float,
+            fuel_type: str, brands: Optional[List[str]] = None,
+            sort_by: str = 'distance'
+    ) -> List[StationPrice]:
+        """
+        Answers :meth:`FuelCheckClient.get_fuel_prices_within_radius`
+        from the index.
+
+        :param sort_by: ``'distance'`` (nearest first) or ``'price'``
+        (cheapest first, then nearest).
+        """
+        if sort_by not in ('distance', 'price'):
+            raise ValueError('Unknown sort order {!r}'.format(sort_by))
+
+        brand_filter = set(brands) if brands else None
+        results = []
+        for distance, station in self.stations_within_radius(
+                latitude, longitude, radius):
+            if brand_filter is not None and station.brand not in brand_filter:
+                continue
+            price = self._prices.get(station.code, {}).get(fuel_type)
+            if price is not None:
+                results.append((distance, price, station))
+
+        if sort_by == 'price':
+            results.sort(key=lambda result: (result[1].price, result[0]))
+
+        return [StationPrice(price=price, station=station)
+                for _, price, station in results]
+
+    def _segment_candidates(
+            self, start: Tuple[float, float], end: Tuple[float, float],
+            buffer: float) -> Iterator[List[Located]]:
+        """The cells within ``buffer`` km of a route segment."""
+        # Long segments are covered piecewise, so that a diagonal does not
+        # scan every cell of its bounding box.
+        span = max(abs(end[0] - start[0]), abs(end[1] - start[1]))
+        pieces = max(1, int(math.ceil(span / self._cell_size)))
+        d_latitude = buffer / _KM_PER_DEGREE
+        d_longitude = buffer / (_KM_PER_DEGREE * max(math.cos(math.radians(
+            max(abs(start[0]), abs(end[0])))), 1e-6))
+        for i in range(pieces):
+            latitude1 = start[0] + (end[0] - start[0]) * i / pieces
+            latitude2 = start[0] + (end[0] - start[0]) * (i + 1) / pieces
+            longitude1 = start[1] + (end[1] - start[1]) * i / pieces
+            longitude2 = start[1] + (end[1] - start[1]) * (i + 1) / pieces
+            yield from self._candidate_cells(
+                min(latitude1, latitude2) - d_latitude,
+                max(latitude1, latitude2) + d_latitude,
+                min(longitude1, longitude2) - d_longitude,
+                max(longitude1, longitude2) + d_longitude)
+
+    def stations_along_route(
+            self, route: Sequence[Tuple[float, float]], buffer: float
+    ) -> List[Tuple[float, float, Station]]:
+        """
+        Finds the stations within ``buffer`` km of a route, a polyline of
+        ``(latitude, longitude)`` points.
+
+        Each segment is measured on a flat projection centred on its start,
+        which is accurate for the segment lengths of driving routes.
+
+        :returns: ``(distance along route, distance, station)`` tuples,
+        in order along the route.
+        """
+        if not route:
+            raise ValueError('A route needs at least one point')
+        points = list(route)
+        if len(points) == 1:
+            points.append(points[0])
+
+        # The nearest point of the route to each station so far, as
+        # (distance, distance along route, station).
+        nearest: Dict[int, Tuple[float, float, Station]] = {}
+        along = 0.0
+        for start, end in zip(points, points[1:]):
+            scale = math.cos(math.radians(start[0])) * _KM_PER_DEGREE
+            end_x = (end[1] - start[1]) * scale
+            end_y = (end[0] - start[0]) * _KM_PER_DEGREE
+            length_squared = end_x * end_x + end_y * end_y
+            length = math.sqrt(length_squared)
+            for cell in self._segment_candidates(start, end, buffer):
+                for station_latitude, station_longitude, station in cell:
+                    x = (station_longitude - start[1]) * scale
+                    y = (station_latitude - start[0]) * _KM_PER_DEGREE
+                    t = 0.0
+                    if length_squared:
+                        t = min(1.0, max(
+                            0.0, (x * end_x + y * end_y) / length_squared))
+                    distance = math.hypot(x - t * end_x, y - t * end_y)
+                    if distance > buffer:
+                        continue
+                    previous = nearest.get(station.code)
+                    if previous is None or distance < previous[0]:
+                        nearest[station.code] = (
+                            distance, along + t * length, station)
+            along += length
+
+        results = [(distance_along, distance, station)
+                   for distance, distance_along, station in nearest.values()]
+        results.sort(key=lambda result: (result[0], result[2].code))
+        return results
+
+    def get_fuel_prices_along_route(
+            self, route: Sequence[Tuple[float, float]], buffer: float,
+            fuel_type: str, brands: Optional[List[str]] = None,
+            sort_by: str = 'price'
+    ) -> List[RouteStationPrice]:
+        """
+        Finds the prices of a fuel at the stations within ``buffer`` km of
+        a route, a polyline of ``(latitude, longitude)`` points.
+
+        :param sort_by: ``'price'`` (cheapest first, then first along the
+        route) or ``'route'`` (in order along the route).
+        """
+        if sort_by not in ('price', 'route'):
+            raise ValueError('Unknown sort order {!r}'.format(sort_by))
+
+        brand_filter = set(brands) if brands else None
+        results = []
+        for distance_along, distance, station in self.stations_along_route(
+                route, buffer):
+            if brand_filter is not None and station.brand not in brand_filter:
+                continue
+            price = self._prices.get(station.code, {}).get(fuel_type)
+            if price is not None:
+                results.append(RouteStationPrice(
+                    price=price, station=station, distance=distance,
+                    distance_along_route=distance_along))
+
+        if sort_by == 'price':
+            results.sort(key=lambda result: (
+                result.price.price, result.distance_along_route))
+        return results
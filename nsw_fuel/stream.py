@@ -0,0 +1,180 @@
+"""
+Incremental JSON parsing, used to process large API responses in constant
+memory.
+
+Only the array being iterated is yielded, one element at a time. Other
+objects and arrays in the document are skipped one member or element at
+a time: each is decoded and discarded, so memory use is bounded by the
+largest of them rather than by the document. (Scanning for the closing
+bracket in Python instead is several times slower than decoding.)
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks: Iterable[bytes], path: Sequence[str],
+                    allow_empty: bool = False) -> Iterator[Any]:
+    """
+    Yields the decoded elements of an array nested within a JSON document.
+
+    :param chunks: The UTF-8 encoded document, in chunks of any size.
+    :param path: The object keys leading to the array from the document
+    root, e.g. ``('stations', 'items')``. Nothing is yielded if the path
+    does not exist or leads to ``null``.
+    :param allow_empty: Whether an empty document yields nothing, rather
+    than being an error.
+    """
+    stream = _JsonStream(chunks)
+    if allow_empty and stream.at_end():
+        return
+    yield from stream.iter_path(path)
+
+
+class _JsonStream(object):
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads the next chunk into the buffer. False once exhausted."""
+        if self._eof:
+            return False
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b'', final=True)
+        else:
+            text = self._decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def _next_char(self) -> Optional[str]:
+        """Skips whitespace and returns the next character, if any."""
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return None
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character."""
+        char = self._next_char()
+        if char is None:
+            raise ValueError('Unexpected end of JSON document')
+        return char
+
+    def at_end(self) -> bool:
+        """Whether only whitespace remains."""
+        return self._next_char() is None
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError('Expected {!r} at position {}, found {!r}'.format(
+                char, self._pos, found))
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number ending at the buffer boundary may continue in the
+            # next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        char = self._peek()
+        if char == '{':
+            for _ in self.iter_object():
+                self.skip_value()
+        elif char == '[':
+            for _ in self.iter_array():
+                pass
+        else:
+            self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Yields the keys of an object. The caller must consume each value
+        before advancing the iterator.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+
+            char = self._peek()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected "," or "}}" at position {}'.format(
+                    self._pos - 1))
+
+    def iter_array(self) -> Iterator[Any]:
+        if self._peek() != '[':
+            if self.read_value() is None:
+                return
+            raise ValueError('Expected an array at position {}'.format(
+                self._pos))
+
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self.read_value()
+
+            char = self._peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError('Expected "," or "]" at position {}'.format(
+                    self._pos - 1))
+
+    def iter_path(self, path: Sequence[str]) -> Iterator[Any]:
+        if not path:
+            yield from self.iter_array()
+            return
+
+        if self._peek() != '{':
+            self.skip_value()
+            return
+
+        for key in self.iter_object():
+            if key == path[0]:
+                yield from self.iter_path(path[1:])
+                return
+            self.skip_value()
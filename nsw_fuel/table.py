@@ -0,0 +1,346 @@
+"""
+A columnar representation of fuel prices for bulk analytics.
+
+Columns are held in NumPy arrays when NumPy is installed, and in typed
+``array.array`` buffers otherwise. Either way, filters, joins to station
+attributes and group-by aggregates run over the columns without creating
+a ``Price`` object per row.
+"""
+import math
+from array import array
+from datetime import datetime
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union)
+
+from .dto import FuelPrices, Price, Station
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+GroupKey = Union[str, Callable[[Station], Hashable]]
+
+STATS = ('count', 'min', 'max', 'mean', 'median')
+
+_UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(price: Price) -> float:
+    # Timestamps are wall clock (Sydney) times, so are converted without
+    # applying any timezone.
+    if price.last_updated is None:
+        return math.nan
+    return (price.last_updated - _UNIX_EPOCH).total_seconds()
+
+
+class PriceTable(object):
+    """
+    Prices stored as contiguous typed columns:
+
+    * ``station_codes``: the station code of each price.
+    * ``fuel_type_ids``: an index into ``fuel_types`` for each price.
+    * ``prices``: the price of each row.
+    * ``timestamps``: ``last_updated`` as seconds since the epoch, or NaN.
+
+    Build one with :meth:`from_response`.
+    """
+
+    def __init__(self, station_codes: Any, fuel_type_ids: Any, prices: Any,
+                 timestamps: Any, fuel_types: List[str],
+                 stations: Dict[int, Station]) -> None:
+        self.station_codes = station_codes
+        self.fuel_type_ids = fuel_type_ids
+        self.prices = prices
+        self.timestamps = timestamps
+        self.fuel_types = fuel_types
+        self.stations = stations
+        self._fuel_type_index = {
+            code: i for i, code in enumerate(fuel_types)}
+
+    @classmethod
+    def from_response(cls, response: FuelPrices,
+                      use_numpy: Optional[bool] = None) -> 'PriceTable':
+        """
+        :param use_numpy: Whether to store columns in NumPy arrays. Defaults
+        to using NumPy when it is installed.
+        """
+        fuel_types: List[str] = []
+        fuel_type_index: Dict[str, int] = {}
+        # Columns are typed as Any as they may be array or NumPy backed.
+        fuel_type_ids: Any = array('i')
+        for price in response.prices:
+            fuel_type_id = fuel_type_index.get(price.fuel_type)
+            if fuel_type_id is None:
+                fuel_type_id = fuel_type_index[price.fuel_type] = \
+                    len(fuel_types)
+                fuel_types.append(price.fuel_type)
+            fuel_type_ids.append(fuel_type_id)
+
+        station_codes: Any = array('q', [
+            -1 if price.station_code is None else price.station_code
+            for price in response.prices])
+        prices: Any = array('d', [price.price for price in response.prices])
+        timestamps: Any = array('d', [
+            _epoch(price) for price in response.prices])
+
+        if use_numpy is None:
+            use_numpy = np is not None
+        if use_numpy:
+            if np is None:
+                raise ImportError('NumPy is not installed')
+            station_codes = np.frombuffer(station_codes, dtype=np.int64)
+            fuel_type_ids = np.frombuffer(fuel_type_ids, dtype=np.intc)
+            prices = np.frombuffer(prices, dtype=np.float64)
+            timestamps = np.frombuffer(timestamps, dtype=np.float64)
+
+        return cls(
+            station_codes=station_codes,
+            fuel_type_ids=fuel_type_ids,
+            prices=prices,
+            timestamps=timestamps,
+            fuel_types=fuel_types,
+            stations={station.code: station for station in response.stations},
+        )
+
+    @property
+    def uses_numpy(self) -> bool:
+        return not isinstance(self.prices, array)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def _take(self, rows: Any) -> 'PriceTable':
+        if self.uses_numpy:
+            columns = [self.station_codes[rows], self.fuel_type_ids[rows],
+                       self.prices[rows], self.timestamps[rows]]
+        else:
+            columns = [
+                array(column.typecode, [column[i] for i in rows])
+                for column in (self.station_codes, self.fuel_type_ids,
+                               self.prices, self.timestamps)]
+        station_codes, fuel_type_ids, prices, timestamps = columns
+        return PriceTable(
+            station_codes=station_codes,
+            fuel_type_ids=fuel_type_ids,
+            prices=prices,
+            timestamps=timestamps,
+            fuel_types=self.fuel_types,
+            stations=self.stations,
+        )
+
+    def filter(self, fuel_type: Optional[str] = None,
+               station_codes: Optional[Iterable[int]] = None,
+               min_price: Optional[float] = None,
+               max_price: Optional[float] = None,
+               updated_since: Optional[float] = None,
+               **station_attributes: Any) -> 'PriceTable':
+        """
+        Returns the rows matching every given condition.
+
+        :param updated_since: Minimum ``timestamps`` value.
+        :param station_attributes: ``Station`` attribute values to match,
+        e.g. ``brand='Shell'``.
+        """
+        conditions: List[Tuple[Any, Callable[[Any], Any]]] = []
+        if fuel_type is not None:
+            fuel_type_id = self._fuel_type_index.get(fuel_type, -1)
+            conditions.append(
+                (self.fuel_type_ids, lambda c: c == fuel_type_id))
+        if min_price is not None:
+            conditions.append((self.prices, lambda c: c >= min_price))
+        if max_price is not None:
+            conditions.append((self.prices, lambda c: c <= max_price))
+        if updated_since is not None:
+            conditions.append(
+                (self.timestamps, lambda c: c >= updated_since))
+
+        codes = None if station_codes is None else set(station_codes)
+        if station_attributes:
+            matching = {
+                code for code, station in self.stations.items()
+                if all(getattr(station, name) == value
+                       for name, value in station_attributes.items())}
+            codes = matching if codes is None else codes & matching
+
+        if self.uses_numpy:
+            mask = np.ones(len(self), dtype=bool)
+            for column, condition in conditions:
+                mask &= condition(column)
+            if codes is not None:
+                mask &= np.isin(self.station_codes,
+                                np.fromiter(codes, dtype=np.int64))
+            return self._take(mask)
+
+        rows: Iterable[int] = range(len(self))
+        for column, condition in conditions:
+            rows = [i for i in rows if condition(column[i])]
+        if codes is not None:
+            rows = [i for i in rows if self.station_codes[i] in codes]
+        return self._take(rows)
+
+    def group_ids(self, by: GroupKey) -> Tuple[Any, List[Hashable]]:
+        """
+        Assigns every row to a group.
+
+        :param by: ``'fuel_type'``, ``'station_code'``, the name of any
+        other ``Station`` attribute (e.g. ``'brand'``), or a function of a
+        ``Station`` (e.g. one extracting the suburb from its address).
+        Prices for stations not in the table's station list are grouped
+        under ``None``.
+        :returns: A column of group ids, and the label of each group id.
+        """
+        if by == 'fuel_type':
+            return self.fuel_type_ids, list(self.fuel_types)
+
+        if by == 'station_code':
+            def label(code: int) -> Hashable:
+                return code
+        else:
+            key = by if callable(by) else _attribute_getter(by)
+
+            def label(code: int) -> Hashable:
+                station = self.stations.get(code)
+                return None if station is None else key(station)
+
+        labels: List[Hashable] = []
+        label_ids: Dict[Hashable, int] = {}
+
+        def label_id(code: int) -> int:
+            value = label(code)
+            if value not in label_ids:
+                label_ids[value] = len(labels)
+                labels.append(value)
+            return label_ids[value]
+
+        if self.uses_numpy:
+            codes, inverse = np.unique(self.station_codes,
+                                       return_inverse=True)
+            lookup = np.array([label_id(int(code)) for code in codes],
+                              dtype=np.intp)
+            return lookup[inverse], labels
+
+        code_ids: Dict[int, int] = {}
+        ids = array('i')
+        for code in self.station_codes:
+            if code not in code_ids:
+                code_ids[code] = label_id(code)
+            ids.append(code_ids[code])
+        return ids, labels
+
+    def aggregate(self, by: GroupKey = 'fuel_type',
+                  stat: str = 'min') -> Dict[Hashable, float]:
+        """
+        Computes a price statistic per group.
+
+        :param by: The grouping, see :meth:`group_ids`.
+        :param stat: One of ``'count'``, ``'min'``, ``'max'``, ``'mean'``
+        or ``'median'``.
+        """
+        if stat not in STATS:
+            raise ValueError('Unknown statistic {!r}'.format(stat))
+        if stat == 'median':
+            return self.percentile(50, by)
+        if len(self) == 0:
+            return {}
+
+        groups, starts, ends, values = self._sorted_groups(by)
+        if self.uses_numpy:
+            counts = ends - starts
+            if stat == 'count':
+                result = counts
+            elif stat == 'min':
+                result = values[starts]
+            elif stat == 'max':
+                result = values[ends - 1]
+            else:
+                result = np.add.reduceat(values, starts) / counts
+            return dict(zip(groups, result.tolist()))
+
+        aggregates: Dict[Hashable, float] = {}
+        for group, start, end in zip(groups, starts, ends):
+            if stat == 'count':
+                aggregates[group] = end - start
+            elif stat == 'min':
+                aggregates[group] = values[start]
+            elif stat == 'max':
+                aggregates[group] = values[end - 1]
+            else:
+                aggregates[group] = math.fsum(values[start:end]) / (
+                    end - start)
+        return aggregates
+
+    def percentile(self, q: float,
+                   by: GroupKey = 'fuel_type') -> Dict[Hashable, float]:
+        """
+        Computes the q-th percentile price per group, interpolating
+        linearly between the closest ranks.
+
+        :param q: Percentile in the range [0, 100].
+        :param by: The grouping, see :meth:`group_ids`.
+        """
+        if not 0 <= q <= 100:
+            raise ValueError('Percentile must be between 0 and 100')
+        if len(self) == 0:
+            return {}
+
+        groups, starts, ends, values = self._sorted_groups(by)
+        if self.uses_numpy:
+            positions = starts + (ends - starts - 1) * (q / 100.0)
+            lower = np.floor(positions).astype(np.intp)
+            upper = np.ceil(positions).astype(np.intp)
+            result = values[lower] + (values[upper] - values[lower]) * (
+                positions - lower)
+            return dict(zip(groups, result.tolist()))
+
+        percentiles: Dict[Hashable, float] = {}
+        for group, start, end in zip(groups, starts, ends):
+            position = start + (end - start - 1) * (q / 100.0)
+            lower = int(math.floor(position))
+            upper = int(math.ceil(position))
+            percentiles[group] = values[lower] + (
+                values[upper] - values[lower]) * (position - lower)
+        return percentiles
+
+    def _sorted_groups(
+            self, by: GroupKey) -> Tuple[List[Hashable], Any, Any, Any]:
+        """
+        Sorts the prices by group and then by price.
+
+        :returns: The label of each non-empty group, the start and end row
+        of each group in the sorted prices, and the sorted prices.
+        """
+        ids, labels = self.group_ids(by)
+        if self.uses_numpy:
+            order = np.lexsort((self.prices, ids))
+            sorted_ids = ids[order]
+            values = self.prices[order]
+            starts = np.flatnonzero(
+                np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+            ends = np.r_[starts[1:], len(values)]
+            groups = [labels[i] for i in sorted_ids[starts].tolist()]
+            return groups, starts, ends, values
+
+        prices = self.prices
+        rows = sorted(range(len(prices)), key=lambda i: (ids[i], prices[i]))
+        values = array('d', [prices[i] for i in rows])
+        starts_list: List[int] = []
+        groups = []
+        previous = None
+        for row, i in enumerate(rows):
+            if ids[i] != previous:
+                previous = ids[i]
+                starts_list.append(row)
+                groups.append(labels[ids[i]])
+        ends_list = starts_list[1:] + [len(values)]
+        return groups, starts_list, ends_list, values
+
+
+def _attribute_getter(name: str) -> Callable[[Station], Hashable]:
+    if name not in Station.__slots__:
+        raise ValueError('Unknown station attribute {!r}'.format(name))
+
+    def get(station: Station) -> Hashable:
+        value: Hashable = getattr(station, name)
+        return value
+    return get
@@ -0,0 +1,427 @@
+"""
+Transports send the requests :class:`nsw_fuel.FuelCheckClient` builds, so
+the HTTP library underneath it can be swapped, e.g. for one which
+multiplexes concurrent requests over a single HTTP/2 connection.
+
+Three are provided:
+
+* :class:`RequestsTransport`, the default, using ``requests``.
+* :class:`HttpxTransport`, using ``httpx``, with HTTP/2 enabled.
+* :class:`HttpClientTransport`, using only the standard library.
+"""
+import abc
+import http.client
+import json as json_module
+import queue
+import threading
+from types import TracebackType
+from typing import (
+    Any, Callable, Dict, Iterator, Mapping, Optional, Protocol, Tuple, Type)
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from .dto import Response
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+class TransportResponse(Response, Protocol):
+    """A response returned by a transport."""
+
+    @property
+    def ok(self) -> bool:
+        ...
+
+    @property
+    def content(self) -> bytes:
+        ...
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        ...
+
+    def close(self) -> None:
+        ...
+
+    def __enter__(self) -> Any:
+        ...
+
+    def __exit__(self, *args: Any) -> Any:
+        ...
+
+
+class TransportError(IOError):
+    """A request could not be sent, or its response could not be read."""
+
+
+# The errors raised by the provided transports when a request fails
+# without a response.
+TRANSPORT_ERRORS = (requests.RequestException, TransportError)
+
+
+class Transport(abc.ABC):
+    """
+    Sends HTTP requests. Subclass and override :meth:`request`, and
+    :meth:`close` if the transport holds connections.
+    """
+
+    @abc.abstractmethod
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                json: Any = None, timeout: Optional[float] = None,
+                stream: bool = False) -> TransportResponse:
+        """
+        Sends a request, with ``json`` encoded as its body if given.
+
+        :param stream: Whether the body may be read incrementally with
+        ``iter_content`` rather than being read before returning.
+        :raises TransportError: If there is no response.
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests with a pooled, keep-alive ``requests.Session``.
+
+    :param session: A pre-configured session to send requests with. The
+    transport will not close a session it did not create.
+    :param pool_size: Maximum number of connections kept alive in the pool.
+    :param max_retries: Number of times a failed connection, read or, if
+    ``retry_statuses``, gateway error (502, 503, 504) is retried.
+    :param backoff_factor: Exponential backoff factor applied between
+    retries, in seconds.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 retry_statuses: bool = True) -> None:
+        self._owns_session = session is None
+        if session is None:
+            session = self._create_session(
+                pool_size, max_retries, backoff_factor, retry_statuses)
+        self.session = session
+
+    @staticmethod
+    def _create_session(pool_size: int, max_retries: int,
+                        backoff_factor: float,
+                        retry_statuses: bool) -> requests.Session:
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504) if retry_statuses else (),
+            # The POST endpoints are read-only queries, so are safe to retry.
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers['Connection'] = 'keep-alive'
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                json: Any = None, timeout: Optional[float] = None,
+                stream: bool = False) -> TransportResponse:
+        return self.session.request(method, url, json=json, headers=headers,
+                                    timeout=timeout, stream=stream)
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+
+class _HttpxResponse(object):
+    def __init__(self, response: 'httpx.Response') -> None:
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    @property
+    def ok(self) -> bool:
+        return self._response.is_success
+
+    def _read(self) -> bytes:
+        try:
+            return self._response.read()
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    @property
+    def content(self) -> bytes:
+        return self._read()
+
+    @property
+    def text(self) -> str:
+        self._read()
+        return self._response.text
+
+    def json(self) -> Any:
+        return json_module.loads(self.content)
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    def close(self) -> None:
+        self._response.close()
+
+    def __enter__(self) -> '_HttpxResponse':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class HttpxTransport(Transport):
+    """
+    Sends requests with an ``httpx.Client``, over HTTP/2 where the server
+    supports it, so that concurrent requests share one connection rather
+    than each taking one from the pool. Requires ``httpx``, and ``h2`` for
+    HTTP/2 (``pip install nsw-fuel-api-client[http2]``).
+
+    Only failed connections are retried. Pair the client with a
+    :class:`nsw_fuel.RetryPolicy` to retry error responses.
+
+    :param client: A pre-configured ``httpx.Client`` to send requests with.
+    The transport will not close a client it did not create.
+    :param http2: Whether to negotiate HTTP/2. Plain ``http://`` URLs
+    always use HTTP/1.1.
+    :param pool_size: Maximum number of connections.
+    :param max_retries: Number of times a failed connection is retried.
+    """
+
+    def __init__(self, client: Optional['httpx.Client'] = None,
+                 http2: bool = True,
+                 pool_size: int = 10,
+                 max_retries: int = 3) -> None:
+        if httpx is None:
+            raise ImportError('HttpxTransport requires httpx to be installed')
+
+        self._owns_client = client is None
+        if client is None:
+            limits = httpx.Limits(max_connections=pool_size,
+                                  max_keepalive_connections=pool_size)
+            client = httpx.Client(
+                http2=http2,
+                transport=httpx.HTTPTransport(
+                    http2=http2, limits=limits, retries=max_retries),
+            )
+        self.client = client
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                json: Any = None, timeout: Optional[float] = None,
+                stream: bool = False) -> TransportResponse:
+        request = self.client.build_request(
+            method, url, json=json, headers=headers, timeout=timeout)
+        try:
+            response = self.client.send(request, stream=stream)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return _HttpxResponse(response)
+
+    def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
+
+
+_Origin = Tuple[str, str, Optional[int]]
+
+
+class _HttpClientResponse(object):
+    """
+    A response read from a pooled connection, which goes back to the pool
+    once the body has been read in full.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse,
+                 release: Callable[[bool], None]) -> None:
+        self._response = response
+        self._release: Optional[Callable[[bool], None]] = release
+        self._content: Optional[bytes] = None
+        self.status_code = response.status
+        self.headers: Mapping[str, str] = CaseInsensitiveDict(
+            response.getheaders())
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def _done(self, reusable: bool) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release(reusable and not self._response.will_close)
+
+    def _read(self) -> bytes:
+        """Reads the whole body, then releases the connection."""
+        if self._content is None:
+            try:
+                self._content = self._response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._done(False)
+                raise TransportError(str(e)) from e
+            self._done(True)
+        return self._content
+
+    @property
+    def content(self) -> bytes:
+        return self._read()
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json_module.loads(self.content)
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        try:
+            while True:
+                chunk = self._response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        except (OSError, http.client.HTTPException) as e:
+            self._done(False)
+            raise TransportError(str(e)) from e
+        self._done(True)
+
+    def close(self) -> None:
+        # A connection with an unread body cannot be reused.
+        self._done(self._response.isclosed())
+
+    def __enter__(self) -> '_HttpClientResponse':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class HttpClientTransport(Transport):
+    """
+    Sends requests over HTTP/1.1 with the standard library's
+    ``http.client``, keeping up to ``pool_size`` idle connections alive
+    for reuse. Has no dependencies beyond the standard library.
+
+    Only failed connections are retried, including a kept-alive connection
+    the server has since closed. Timeouts are not retried. Pair the client
+    with a :class:`nsw_fuel.RetryPolicy` to retry error responses.
+
+    :param pool_size: Maximum number of idle connections kept alive per
+    host.
+    :param max_retries: Number of times a failed connection is retried.
+    """
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 3) -> None:
+        self._pool_size = pool_size
+        self._max_retries = max_retries
+        self._lock = threading.Lock()
+        self._pools: Dict[_Origin, 'queue.LifoQueue[Any]'] = {}
+
+    def _pool(self, origin: _Origin) -> 'queue.LifoQueue[Any]':
+        with self._lock:
+            pool = self._pools.get(origin)
+            if pool is None:
+                pool = self._pools[origin] = queue.LifoQueue(self._pool_size)
+            return pool
+
+    def _connect(self, origin: _Origin,
+                 timeout: Optional[float]) -> http.client.HTTPConnection:
+        try:
+            connection = self._pool(origin).get_nowait()
+        except queue.Empty:
+            scheme, host, port = origin
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, port,
+                                                   timeout=timeout)
+            return http.client.HTTPConnection(host, port, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection  # type: ignore[no-any-return]
+
+    def _release(self, origin: _Origin,
+                 connection: http.client.HTTPConnection,
+                 reusable: bool) -> None:
+        if reusable:
+            try:
+                self._pool(origin).put_nowait(connection)
+                return
+            except queue.Full:
+                pass
+        connection.close()
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                json: Any = None, timeout: Optional[float] = None,
+                stream: bool = False) -> TransportResponse:
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname or '', parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        body = None
+        headers = dict(headers)
+        if json is not None:
+            body = json_module.dumps(json).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        attempt = 0
+        while True:
+            connection = self._connect(origin, timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                raw = connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                attempt += 1
+                # RemoteDisconnected, from a stale keep-alive connection, is
+                # a ConnectionError too.
+                retryable = isinstance(e, ConnectionError)
+                if not retryable or attempt > self._max_retries:
+                    raise TransportError(str(e)) from e
+
+        response = _HttpClientResponse(
+            raw, lambda reusable: self._release(origin, connection, reusable))
+        if not stream:
+            response._read()
+        return response
+
+    def close(self) -> None:
+        """Closes the idle connections."""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
@@ -0,0 +1,252 @@
+"""
+Computes price trends locally from accumulated prices, for any number of
+regions at once, rather than asking the API for one location at a time.
+
+Requires NumPy.
+"""
+import datetime
+from typing import (
+    Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, TypeVar)
+
+from .client import PriceTrends
+from .dto import AveragePrice, Period, Price, Station, Variance
+from .history import PriceHistory
+from .spatial import EARTH_RADIUS_KM
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+K = TypeVar('K', bound=Hashable)
+
+# A circular region: latitude, longitude and radius in km.
+Region = Tuple[float, float, float]
+
+# How far back each variance compares today's average price to.
+VARIANCE_DAYS = (
+    (Period.DAY, 1),
+    (Period.WEEK, 7),
+    (Period.MONTH, 30),
+    (Period.YEAR, 365),
+)
+
+# Days of daily averages reported for the month, and months of monthly
+# averages reported for the year, as the API does.
+MONTH_DAYS = 31
+YEAR_MONTHS = 12
+
+# Enough days to cover the longest variance and a year of whole months.
+_WINDOW_DAYS = 366
+
+_DAY = datetime.timedelta(days=1)
+
+
+class TrendEngine(object):
+    """
+    Holds the daily price of every fuel at every station over the last
+    year, and derives :class:`PriceTrends` for regions from them.
+
+    A station's price on a day is the price in effect at the end of that
+    day. A region's average price on a day is the mean over the stations
+    in the region which had a price. Monthly averages are the mean of the
+    month's daily averages, and each variance is the change in the daily
+    average since the start of its period.
+
+    Each fuel's daily prices are held as a stations by days matrix, so the
+    averages for every region are computed in a single matrix product.
+
+    :param stations: Stations with a location. Prices for other stations
+    are ignored.
+    :param prices: Price updates, in any order. Include the last update
+    before the year being covered so the first days have a price.
+    :param today: The last day covered. Defaults to today.
+    """
+
+    def __init__(self, stations: Iterable[Station], prices: Iterable[Price],
+                 today: Optional[datetime.date] = None) -> None:
+        if np is None:
+            raise ImportError('NumPy is not installed')
+        if today is None:
+            today = datetime.date.today()
+        self.today = today
+        self.start = today - (_WINDOW_DAYS - 1) * _DAY
+
+        located = [station for station in stations
+                   if None not in (station.latitude, station.longitude)]
+        self.stations = located
+        self._latitudes = np.array([s.latitude for s in located])
+        self._longitudes = np.array([s.longitude for s in located])
+        rows = {station.code: row for row, station in enumerate(located)}
+
+        # Price updates of each fuel type, as (row, day, seconds, price).
+        updates: Dict[str, List[Tuple[int, int, float, float]]] = {}
+        start = datetime.datetime.combine(self.start, datetime.time())
+        for price in prices:
+            if price.station_code is None or price.last_updated is None:
+                continue
+            row = rows.get(price.station_code)
+            if row is None:
+                continue
+            seconds = (price.last_updated - start).total_seconds()
+            # Updates before the window give the price on its first day.
+            day = max(0, int(seconds // 86400))
+            if day >= _WINDOW_DAYS:
+                continue
+            updates.setdefault(price.fuel_type, []).append(
+                (row, day, seconds, price.price))
+
+        self._daily = {
+            fuel_type: self._daily_prices(fuel_updates)
+            for fuel_type, fuel_updates in updates.items()}
+
+    @classmethod
+    def from_history(cls, history: PriceHistory,
+                     today: Optional[datetime.date] = None,
+                     lookback_days: int = 30) -> 'TrendEngine':
+        """
+        Builds an engine from the stations and prices in a history.
+
+        :param lookback_days: Days before the covered year to read prices
+        from, to find the price in effect at its start.
+        """
+        if today is None:
+            today = datetime.date.today()
+        since = today - (_WINDOW_DAYS - 1 + lookback_days) * _DAY
+        return cls(
+            history.stations(),
+            history.prices(
+                since=datetime.datetime.combine(since, datetime.time()),
+                until=datetime.datetime.combine(today + _DAY,
+                                                datetime.time())),
+            today=today)
+
+    @property
+    def fuel_types(self) -> List[str]:
+        return sorted(self._daily)
+
+    def _daily_prices(
+            self, updates: List[Tuple[int, int, float, float]]) -> Any:
+        """Builds a stations by days matrix of prices, NaN before any."""
+        update_rows, days, seconds, values = (
+            np.array(column) for column in zip(*updates))
+        # Keep only the last update of each station on each day.
+        order = np.lexsort((seconds, days, update_rows))[::-1]
+        cells = update_rows[order] * _WINDOW_DAYS + days[order]
+        cells, last = np.unique(cells, return_index=True)
+
+        flat = np.full(len(self.stations) * _WINDOW_DAYS, np.nan)
+        flat[cells] = values[order][last]
+        daily = flat.reshape(len(self.stations), _WINDOW_DAYS)
+
+        # Carry each price forward until the station's next update.
+        known = np.where(np.isnan(daily), 0, np.arange(_WINDOW_DAYS))
+        np.maximum.accumulate(known, axis=1, out=known)
+        return daily[np.arange(len(self.stations))[:, None], known]
+
+    def _membership(self, regions: List[Region]) -> Any:
+        """A regions by stations matrix, 1 where a station is in a region."""
+        latitudes = np.radians([region[0] for region in regions])[:, None]
+        longitudes = np.radians([region[1] for region in regions])[:, None]
+        radii = np.array([region[2] for region in regions])[:, None]
+        station_latitudes = np.radians(self._latitudes)[None, :]
+        station_longitudes = np.radians(self._longitudes)[None, :]
+
+        a = np.sin((station_latitudes - latitudes) / 2) ** 2
+        a = a + np.cos(latitudes) * np.cos(station_latitudes) * np.sin(
+            (station_longitudes - longitudes) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(
+            np.minimum(1.0, np.sqrt(a)))
+        return (distances <= radii).astype(np.float64)
+
+    def daily_averages(self, regions: List[Region], fuel_type: str) -> Any:
+        """
+        :returns: A regions by days matrix of average prices, NaN where no
+        station in the region had a price. The last day is ``today``.
+        """
+        return self._averages(self._membership(regions), fuel_type)
+
+    def _averages(self, membership: Any, fuel_type: str) -> Any:
+        daily = self._daily.get(fuel_type)
+        if daily is None:
+            return np.full((len(membership), _WINDOW_DAYS), np.nan)
+        known = ~np.isnan(daily)
+        totals = membership @ np.where(known, daily, 0.0)
+        counts = membership @ known.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return totals / counts
+
+    def _months(self) -> Tuple[List[datetime.datetime], Any]:
+        """The last months, oldest first, and the first day of each."""
+        months = []
+        year, month = self.today.year, self.today.month
+        for _ in range(YEAR_MONTHS):
+            months.append(datetime.datetime(year, month, 1))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        months.reverse()
+        first_days = np.array([
+            (month.date() - self.start).days for month in months])
+        return months, first_days
+
+    def trends(self, regions: Mapping[K, Region],
+               fuel_types: List[str]) -> Dict[K, PriceTrends]:
+        """
+        Computes the trends for many regions in one pass, in the shape
+        :meth:`FuelCheckClient.get_fuel_price_trends` returns.
+
+        :param regions: ``(latitude, longitude, radius)`` of each region,
+        by any key.
+        """
+        keys = list(regions)
+        region_list = [regions[key] for key in keys]
+        results = {key: PriceTrends(variances=[], average_prices=[])
+                   for key in keys}
+        if not keys:
+            return results
+
+        membership = self._membership(region_list)
+        months, first_days = self._months()
+        month_days = [self.today - days * _DAY
+                      for days in range(MONTH_DAYS - 1, -1, -1)]
+        for fuel_type in fuel_types:
+            averages = self._averages(membership, fuel_type)
+
+            # Means of each month's daily averages, ignoring missing days.
+            known = ~np.isnan(averages)
+            sums = np.add.reduceat(np.where(known, averages, 0.0),
+                                   first_days, axis=1)
+            counts = np.add.reduceat(known, first_days, axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                monthly = sums / counts
+
+            latest = averages[:, -1]
+            changes = [
+                (period, latest - averages[:, -1 - days])
+                for period, days in VARIANCE_DAYS]
+
+            for i, key in enumerate(keys):
+                result = results[key]
+                for period, change in changes:
+                    if not np.isnan(change[i]):
+                        result.variances.append(Variance(
+                            fuel_type=fuel_type, period=period,
+                            price=float(change[i])))
+                for day, price in zip(month_days,
+                                      averages[i, -MONTH_DAYS:].tolist()):
+                    if price == price:
+                        result.average_prices.append(AveragePrice(
+                            fuel_type=fuel_type, period=Period.MONTH,
+                            price=price, captured=datetime.datetime.combine(
+                                day, datetime.time())))
+                for month, price in zip(months, monthly[i].tolist()):
+                    if price == price:
+                        result.average_prices.append(AveragePrice(
+                            fuel_type=fuel_type, period=Period.YEAR,
+                            price=price, captured=month))
+        return results
+
+    def trends_at(self, latitude: float, longitude: float, radius: float,
+                  fuel_types: List[str]) -> PriceTrends:
+        """Computes the trends for a single region."""
+        region = (latitude, longitude, radius)
+        return self.trends({region: region}, fuel_types)[region]
@@ -1,4 +1,38 @@
+from .alerts import AlertEngineTest
+from .async_client import AsyncFuelCheckClientTest
+from .cache import ReferenceDataCacheTest
+from .cheapest import CheapestIndexTest
+from .coalesce import (
+    FuelCheckClientCoalesceTest, ResponseMemoTest, SingleFlightTest)
+from .decode import DecoderTest
+from .delta import PriceDeltaSyncTest
+from .history import PriceHistoryTest
+from .instrument import FuelCheckClientInstrumentTest, MetricsRegistryTest
 from .integration import FuelCheckClientIntegrationTest
-from .unit import FuelCheckClientTest
+from .ratelimit import (
+    FuelCheckClientRetryTest, RetryPolicyTest, TokenBucketTest)
+from .shared import SharedPriceCacheTest
+from .snapshot import SnapshotTest
+from .spatial import StationIndexTest
+from .stream import FuelCheckClientStreamTest, IterJsonArrayTest
+from .table import NumpyPriceTableTest, PriceTableTest
+from .transport import (
+    HttpClientTransportTest, HttpxHttp2TransportTest, HttpxTransportTest,
+    RequestsTransportTest)
+from .trends import TrendEngineTest
+from .unit import (
+    FuelCheckClientTest, LazyResponseTest, PriceTest, ResponseIndexTest)
 
-__all__ = ['FuelCheckClientTest', 'FuelCheckClientIntegrationTest']
+__all__ = ['FuelCheckClientTest', 'FuelCheckClientIntegrationTest',
+           'AsyncFuelCheckClientTest', 'PriceDeltaSyncTest',
+           'IterJsonArrayTest', 'FuelCheckClientStreamTest', 'PriceTest',
+           'PriceTableTest', 'NumpyPriceTableTest', 'StationIndexTest',
+           'ReferenceDataCacheTest', 'SingleFlightTest', 'ResponseMemoTest',
+           'FuelCheckClientCoalesceTest', 'TokenBucketTest', 'RetryPolicyTest',
+           'FuelCheckClientRetryTest', 'FuelCheckClientInstrumentTest',
+           'MetricsRegistryTest', 'LazyResponseTest', 'PriceHistoryTest',
+           'TrendEngineTest', 'ResponseIndexTest', 'SnapshotTest',
+           'SharedPriceCacheTest', 'AlertEngineTest',
+           'CheapestIndexTest', 'RequestsTransportTest', 'HttpxTransportTest',
+           'HttpxHttp2TransportTest', 'HttpClientTransportTest',
+           'DecoderTest']
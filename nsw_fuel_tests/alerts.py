@@ -0,0 +1,126 @@
+import unittest
+from typing import Hashable, List, Optional, Tuple
+
+from nsw_fuel import AlertEngine, AlertRule, Price, Station
+
+from .helpers import make_price, make_station
+
+
+class AlertEngineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Roughly 0km, 1.1km and 55km north of Sydney CBD.
+        self.engine = AlertEngine([
+            make_station(1, 'BP', -33.87, 151.21),
+            make_station(2, 'BP', -33.86, 151.21),
+            make_station(3, 'BP', -33.37, 151.21),
+            Station(id=None, brand='BP', code=4, name='Nowhere', address=''),
+        ])
+
+    def matched(
+            self, *prices: Price) -> List[Tuple[Hashable, Optional[int]]]:
+        return [(match.rule.id, match.price.station_code)
+                for match in self.engine.evaluate(prices)]
+
+    def test_rule_needs_station_or_area(self) -> None:
+        with self.assertRaises(ValueError):
+            AlertRule('a', 'E10', 170)
+        with self.assertRaises(ValueError):
+            AlertRule('a', 'E10', 170, station_code=1, radius=5)
+        with self.assertRaises(ValueError):
+            AlertRule('a', 'E10', 170, latitude=-33.87, radius=5)
+
+    def test_station_rule(self) -> None:
+        self.engine.add_rules([
+            AlertRule('low', 'E10', 150, station_code=1),
+            AlertRule('high', 'E10', 170, station_code=1),
+            AlertRule('other fuel', 'U91', 170, station_code=1),
+            AlertRule('other station', 'E10', 170, station_code=2),
+        ])
+        self.assertEqual(len(self.engine), 4)
+        self.assertEqual(self.matched(make_price(1, 160.0)), [('high', 1)])
+
+    def test_matches_only_when_crossing(self) -> None:
+        self.engine.add_rules([
+            AlertRule('low', 'E10', 150, station_code=1),
+            AlertRule('high', 'E10', 170, station_code=1),
+        ])
+        self.assertEqual(self.matched(make_price(1, 180.0)), [])
+        self.assertEqual(self.matched(make_price(1, 160.0)), [('high', 1)])
+        # Still below 170, so only the newly crossed rule matches.
+        self.assertEqual(self.matched(make_price(1, 140.0)), [('low', 1)])
+        self.assertEqual(self.matched(make_price(1, 145.0)), [])
+        self.assertEqual(self.matched(make_price(1, 150.0)), [])
+        self.assertEqual(self.matched(make_price(1, 149.9)), [('low', 1)])
+
+    def test_threshold_is_exclusive(self) -> None:
+        self.engine.add_rule(AlertRule('a', 'E10', 150, station_code=1))
+        self.assertEqual(self.matched(make_price(1, 150.0)), [])
+
+    def test_area_rule(self) -> None:
+        self.engine.add_rule(AlertRule(
+            'near', 'E10', 170, latitude=-33.87, longitude=151.21, radius=5))
+        matches = self.engine.evaluate([
+            make_price(1, 160.0), make_price(2, 180.0), make_price(3, 150.0),
+            make_price(4, 150.0), make_price(2, 165.0, 'U91'),
+        ])
+        self.assertEqual([m.price.station_code for m in matches], [1])
+        self.assertAlmostEqual(matches[0].distance, 0)
+        self.assertEqual(self.matched(make_price(2, 165.0)), [('near', 2)])
+
+    def test_area_rule_spanning_cells(self) -> None:
+        self.engine.add_rule(AlertRule(
+            'wide', 'E10', 170, latitude=-33.87, longitude=151.21, radius=60))
+        self.assertEqual(
+            sorted(self.matched(make_price(1, 160.0), make_price(3, 160.0))),
+            [('wide', 1), ('wide', 3)])
+
+    def test_stations_added_later(self) -> None:
+        self.engine.add_rule(AlertRule(
+            'near', 'E10', 170, latitude=-33.87, longitude=151.21, radius=5))
+        self.engine.update_stations([make_station(5, 'BP', -33.871, 151.21)])
+        self.assertEqual(self.matched(make_price(5, 160.0)), [('near', 5)])
+
+    def test_remove_rule(self) -> None:
+        station_rule = AlertRule('station', 'E10', 170, station_code=1)
+        area_rule = AlertRule(
+            'area', 'E10', 170, latitude=-33.87, longitude=151.21, radius=60)
+        self.engine.add_rules([station_rule, area_rule])
+        self.engine.remove_rule(station_rule)
+        self.engine.remove_rule(area_rule)
+        self.assertEqual(len(self.engine), 0)
+        self.assertEqual(self.matched(make_price(1, 160.0)), [])
+
+    def test_remove_unknown_rule(self) -> None:
+        rule = AlertRule('station', 'E10', 170, station_code=1)
+        self.engine.add_rule(AlertRule('other', 'E10', 170, station_code=1))
+        with self.assertRaises(KeyError):
+            self.engine.remove_rule(rule)
+        with self.assertRaises(KeyError):
+            self.engine.remove_rule(AlertRule(
+                'area', 'E10', 170, latitude=-33.87, longitude=151.21,
+                radius=60))
+        self.assertEqual(len(self.engine), 1)
+
+        self.engine.add_rule(rule)
+        self.engine.remove_rule(rule)
+        with self.assertRaises(KeyError):
+            self.engine.remove_rule(rule)
+        self.assertEqual(len(self.engine), 1)
+        self.assertEqual(self.matched(make_price(1, 160.0)), [('other', 1)])
+
+    def test_remove_rule_added_twice(self) -> None:
+        rule = AlertRule('station', 'E10', 170, station_code=1)
+        other = AlertRule('other', 'E10', 165, station_code=1)
+        self.engine.add_rules([rule, other, rule])
+        self.engine.remove_rule(rule)
+        self.assertEqual(self.matched(make_price(1, 160.0)),
+                         [('other', 1), ('station', 1)])
+        self.engine.remove_rule(rule)
+        self.engine.add_rule(rule)
+        self.engine.remove_rule(other)
+        self.assertEqual(self.matched(make_price(1, 150.0)), [])
+        self.assertEqual(self.matched(make_price(1, 180.0)), [])
+        self.assertEqual(self.matched(make_price(1, 160.0)), [('station', 1)])
+        self.engine.remove_rule(rule)
+        with self.assertRaises(KeyError):
+            self.engine.remove_rule(rule)
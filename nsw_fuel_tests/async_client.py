@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import json
+import os
+import unittest
+
+from nsw_fuel import AsyncFuelCheckClient, FuelCheckError, Period
+
+from .server import MockServer
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class AsyncFuelCheckClientTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.server = MockServer().start()
+        self.client = AsyncFuelCheckClient(base_url=self.server.url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.aclose()
+        self.server.stop()
+
+    def _add_station(self, code: int) -> None:
+        self.server.add('GET', '/prices/station/{}'.format(code), {
+            'prices': [{
+                'fueltype': 'E10',
+                'price': 100.0 + code,
+                'lastupdated': '02/06/2018 02:03:04',
+            }]
+        })
+
+    async def test_get_fuel_prices(self) -> None:
+        fixture_path = os.path.join(os.path.dirname(__file__),
+                                    'fixtures/all_prices.json')
+        with open(fixture_path) as fixture:
+            self.server.add('GET', '/prices', json.load(fixture))
+
+        response = await self.client.get_fuel_prices()
+        self.assertEqual(len(response.stations), 2)
+        self.assertEqual(len(response.prices), 5)
+        self.assertEqual(response.prices[3].station_code, 2)
+
+    async def test_get_fuel_prices_for_station(self) -> None:
+        self._add_station(100)
+        result = await self.client.get_fuel_prices_for_station(100)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].price, 200.0)
+        self.assertEqual(result[0].last_updated,
+                         datetime.datetime(2018, 6, 2, 2, 3, 4))
+
+    async def test_iter_fuel_prices_for_stations(self) -> None:
+        codes = list(range(1, 21))
+        for code in codes:
+            self._add_station(code)
+
+        results = {}
+        async for code, prices in self.client.iter_fuel_prices_for_stations(
+                codes, concurrency=3):
+            results[code] = prices
+
+        self.assertEqual(sorted(results), codes)
+        self.assertEqual(results[7][0].price, 107.0)
+        self.assertLessEqual(len(self.server.connections), 3)
+
+    async def test_iter_fuel_prices_for_stations_error(self) -> None:
+        self._add_station(1)
+        self.server.add('GET', '/prices/station/2', status=400, json_body={
+            'errorDetails': [{'code': 'E0014', 'description': 'Invalid'}]
+        })
+
+        self.server.add('GET', '/prices/station/3', {'prices': []},
+                        delay=0.5)
+
+        with self.assertRaises(FuelCheckError) as cm:
+            async for _ in self.client.iter_fuel_prices_for_stations(
+                    [1, 2, 3]):
+                pass
+        self.assertEqual(cm.exception.error_code, 'E0014')
+        # The request for station 3 was cancelled and awaited.
+        self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+    async def test_get_fuel_prices_within_radius(self) -> None:
+        self.server.add('POST', '/prices/nearby', {
+            'stations': [{
+                'brand': 'Cool Fuel Brand',
+                'code': 678,
+                'name': 'Cool Fuel Brand Luxembourg',
+                'address': '123 Fake Street',
+            }],
+            'prices': [{
+                'stationcode': 678,
+                'fueltype': 'P95',
+                'price': 150.9,
+                'lastupdated': '2018-06-02 00:46:31',
+            }],
+        })
+
+        result = await self.client.get_fuel_prices_within_radius(
+            latitude=-33.0, longitude=151.0, radius=10, fuel_type='P95')
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].station.code, 678)
+        self.assertEqual(result[0].price.price, 150.9)
+
+        request_body = json.loads(self.server.requests[0][3])
+        self.assertEqual(request_body['fueltype'], 'P95')
+        self.assertEqual(request_body['brand'], [])
+
+    async def test_get_fuel_price_trends(self) -> None:
+        self.server.add('POST', '/prices/trends/', {
+            'Variances': [{'Code': 'E10', 'Period': 'Day', 'Price': 150.0}],
+            'AveragePrices': [{'Code': 'E10', 'Period': 'Year',
+                               'Price': 151.0, 'Captured': 'October 2017'}],
+        })
+
+        result = await self.client.get_fuel_price_trends(
+            latitude=-33.0, longitude=151.0, fuel_types=['E10'])
+        self.assertEqual(result.variances[0].period, Period.DAY)
+        self.assertEqual(result.average_prices[0].captured,
+                         datetime.datetime(2017, 10, 1))
+
+    async def test_get_reference_data(self) -> None:
+        fixture_path = os.path.join(os.path.dirname(__file__),
+                                    'fixtures/lovs.json')
+        with open(fixture_path) as fixture:
+            self.server.add('GET', '/lovs', json.load(fixture))
+
+        response = await self.client.get_reference_data()
+        self.assertEqual(len(response.stations), 2)
+        self.assertEqual(response.fuel_types[0].name, 'Ethanol 94')
+        self.assertEqual(self.server.requests[0][2]['if-modified-since'],
+                         '01/01/2010 00:00:00')
+
+    async def test_server_error(self) -> None:
+        self.server.add('GET', '/prices', status=500,
+                        body=b'Internal Server Error.')
+        with self.assertRaises(FuelCheckError) as cm:
+            await self.client.get_fuel_prices()
+        self.assertEqual(str(cm.exception), 'Internal Server Error.')
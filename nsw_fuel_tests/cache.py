@@ -0,0 +1,139 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+import requests
+from requests_mock import Mocker
+
+from nsw_fuel import FuelCheckClient, ReferenceDataCache
+from nsw_fuel.client import API_URL_BASE
+
+from .helpers import load_fixture
+
+LOVS_URL = '{}/lovs'.format(API_URL_BASE)
+
+
+class ReferenceDataCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'lovs.json')
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _client(self, ttl: float = 3600) -> FuelCheckClient:
+        return FuelCheckClient(
+            reference_data_cache=ReferenceDataCache(self.path, ttl=ttl))
+
+    @Mocker()
+    def test_cold_start_reads_local_copy(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        response = self._client().get_reference_data()
+        self.assertEqual(len(response.stations), 2)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(m.last_request.headers['if-modified-since'],
+                         '01/01/2010 00:00:00')
+
+        # A new process with the same cache file does not hit the network.
+        client = self._client()
+        response = client.get_reference_data()
+        self.assertEqual(len(response.stations), 2)
+        self.assertEqual(response.stations[0].name,
+                         'Cool Fuel Brand Hurstville')
+        self.assertIs(client.get_reference_data(), response)
+        self.assertEqual(m.call_count, 1)
+
+    @Mocker()
+    def test_stale_cache_sends_if_modified_since(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        client = self._client(ttl=0)
+        first = client.get_reference_data()
+        cache = client._reference_data_cache
+        assert cache is not None and cache.fetched_at is not None
+        fetched_at = cache.fetched_at
+
+        m.get(LOVS_URL, json={
+            key: {'items': []} for key in
+            ['stations', 'brands', 'fueltypes', 'trendperiods', 'sortfields']
+        })
+        second = client.get_reference_data()
+
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(m.last_request.headers['if-modified-since'],
+                         fetched_at.strftime('%d/%m/%Y %H:%M:%S'))
+        self.assertIs(second, first)
+        self.assertGreaterEqual(cache.fetched_at, fetched_at)
+
+    @Mocker()
+    def test_if_modified_since_uses_server_time(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'),
+              headers={'Date': 'Sat, 02 Jun 2018 02:03:04 GMT'})
+        self._client(ttl=0).get_reference_data()
+
+        m.get(LOVS_URL, text='')
+        self._client(ttl=0).get_reference_data()
+        server_time = datetime.datetime(
+            2018, 6, 2, 2, 3, 4, tzinfo=datetime.timezone.utc).astimezone()
+        self.assertEqual(m.last_request.headers['if-modified-since'],
+                         server_time.strftime('%d/%m/%Y %H:%M:%S'))
+
+    @Mocker()
+    def test_transport_error_returns_stale_copy(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        client = self._client(ttl=0)
+        first = client.get_reference_data()
+        cache = client._reference_data_cache
+        assert cache is not None
+        fetched_at = cache.fetched_at
+
+        m.get(LOVS_URL, exc=requests.ConnectionError)
+        self.assertIs(client.get_reference_data(), first)
+        self.assertEqual(cache.fetched_at, fetched_at)
+
+        cache.clear()
+        with self.assertRaises(requests.ConnectionError):
+            client.get_reference_data()
+
+    @Mocker()
+    def test_empty_body_returns_cached(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        client = self._client(ttl=0)
+        client.get_reference_data()
+
+        m.get(LOVS_URL, text='')
+        response = client.get_reference_data()
+        self.assertEqual(len(response.stations), 2)
+
+    @Mocker()
+    def test_changes_are_merged(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        self._client(ttl=0).get_reference_data()
+
+        changed = load_fixture('lovs.json')
+        changed['stations']['items'] = changed['stations']['items'][:1]
+        changed['brands']['items'] = []
+        m.get(LOVS_URL, json=changed)
+        response = self._client(ttl=0).get_reference_data()
+
+        self.assertEqual(len(response.stations), 1)
+        self.assertEqual(response.brands,
+                         ['Cool Fuel Brand', 'Fake Fuel Brand'])
+
+    @Mocker()
+    def test_explicit_modified_since_bypasses_cache(self, m: Mocker) -> None:
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        client = self._client()
+        client.get_reference_data()
+        client.get_reference_data(
+            modified_since=datetime.datetime(2018, 1, 1))
+        self.assertEqual(m.call_count, 2)
+
+    @Mocker()
+    def test_corrupt_cache_file(self, m: Mocker) -> None:
+        with open(self.path, 'w') as f:
+            f.write('{"fetched_at": ')
+        m.get(LOVS_URL, json=load_fixture('lovs.json'))
+        response = self._client().get_reference_data()
+        self.assertEqual(len(response.stations), 2)
+        self.assertEqual(m.call_count, 1)
@@ -0,0 +1,96 @@
+import random
+import unittest
+from typing import List, Optional, Tuple
+
+from nsw_fuel import CheapestIndex, GetFuelPricesResponse, Price
+from nsw_fuel.cheapest import _LOAD, _SortedList
+
+from .helpers import make_price, make_station
+
+
+class CheapestIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = CheapestIndex.from_response(GetFuelPricesResponse(
+            stations=[make_station(1, 'Shell'), make_station(2, 'BP'),
+                      make_station(3, 'Shell'), make_station(4, 'BP')],
+            prices=[
+                make_price(1, 150.0),
+                make_price(2, 140.0),
+                make_price(3, 140.0),
+                make_price(4, 160.0),
+                make_price(1, 130.0, 'U91'),
+                make_price(5, 100.0),
+            ]))
+
+    def cheapest(self, fuel_type: str = 'E10', n: int = 10,
+                 brand: Optional[str] = None) -> List[Tuple[int, float]]:
+        return [(result.station.code, result.price.price)
+                for result in self.index.cheapest(fuel_type, n, brand)]
+
+    def test_unknown_stations_are_ignored(self) -> None:
+        self.assertEqual(len(self.index), 5)
+
+    def test_cheapest(self) -> None:
+        self.assertEqual(self.cheapest(n=3),
+                         [(2, 140.0), (3, 140.0), (1, 150.0)])
+        self.assertEqual(self.cheapest('U91'), [(1, 130.0)])
+        self.assertEqual(self.cheapest('P98'), [])
+
+    def test_cheapest_by_brand(self) -> None:
+        self.assertEqual(self.cheapest(brand='BP'), [(2, 140.0), (4, 160.0)])
+        self.assertEqual(self.cheapest(brand='Costco'), [])
+
+    def test_returns_station_prices(self) -> None:
+        result = self.index.cheapest('U91')[0]
+        self.assertEqual(result.station.brand, 'Shell')
+        self.assertEqual(result.price, make_price(1, 130.0, 'U91'))
+
+    def test_update_prices(self) -> None:
+        self.index.update_prices([
+            make_price(2, 170.0),
+            make_price(4, 120.0),
+            make_price(3, 135.0, 'U91'),
+        ])
+        self.assertEqual(self.cheapest(), [
+            (4, 120.0), (3, 140.0), (1, 150.0), (2, 170.0)])
+        self.assertEqual(self.cheapest(brand='BP'), [(4, 120.0), (2, 170.0)])
+        self.assertEqual(self.cheapest('U91'), [(1, 130.0), (3, 135.0)])
+        self.assertEqual(len(self.index), 6)
+
+    def test_unchanged_price_replaces_record(self) -> None:
+        self.index.update_prices([Price('U91', 130.0, None, 'CENTS', 1)])
+        self.assertEqual(self.index.cheapest('U91')[0].price.price_unit,
+                         'CENTS')
+
+    def test_station_changes_brand(self) -> None:
+        self.index.add_station(make_station(3, 'BP'))
+        self.assertEqual(self.cheapest(brand='BP'),
+                         [(2, 140.0), (3, 140.0), (4, 160.0)])
+        self.assertEqual(self.cheapest(brand='Shell'), [(1, 150.0)])
+        self.assertEqual(self.index.cheapest('E10', 2)[1].station.brand, 'BP')
+
+    def test_unsupported_station_code(self) -> None:
+        with self.assertRaises(ValueError):
+            self.index.add_station(make_station(-1, 'BP'))
+
+    def test_sorted_list_matches_sort(self) -> None:
+        rng = random.Random(0)
+        entries = _SortedList()
+        expected = []
+        for _ in range(20 * _LOAD):
+            if expected and rng.random() < 0.4:
+                entry = expected.pop(rng.randrange(len(expected)))
+                entries.remove(entry)
+            else:
+                entry = rng.randrange(10 * _LOAD)
+                expected.append(entry)
+                entries.add(entry)
+            expected.sort()
+            self.assertEqual(len(entries), len(expected))
+        self.assertEqual(list(entries), expected)
+        self.assertEqual(entries.head(3), expected[:3])
+        # Entries were split across sublists and they emptied again.
+        self.assertGreater(len(entries._lists), 1)
+        for entry in list(expected):
+            entries.remove(entry)
+        self.assertEqual((list(entries), entries._lists), ([], []))
@@ -0,0 +1,174 @@
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from nsw_fuel import FuelCheckClient, FuelCheckError
+from nsw_fuel.coalesce import ResponseMemo, SingleFlight
+
+from .server import MockServer
+
+STATION_PRICES = {
+    'prices': [{
+        'fueltype': 'E10',
+        'price': 146.9,
+        'lastupdated': '02/06/2018 02:03:04',
+    }]
+}
+
+ALL_PRICES = {
+    'stations': [{'brand': 'BP', 'code': '100', 'name': 'BP 100',
+                  'address': '1 Fake Street',
+                  'location': {'latitude': -33.0, 'longitude': 151.0}}],
+    'prices': [dict(STATION_PRICES['prices'][0], stationcode='100')],
+}
+
+TRENDS = {'Variances': [], 'AveragePrices': []}
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_share_result(self) -> None:
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls: List[int] = []
+
+        def fn() -> int:
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 42
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(single_flight.do, 'key', fn)
+                       for _ in range(5)]
+            started.wait()
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+        # Once complete, the next call runs again.
+        self.assertEqual(single_flight.do('key', lambda: 43), 43)
+
+    def test_exception_is_raised(self) -> None:
+        def fn() -> int:
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            SingleFlight().do('key', fn)
+
+
+class ResponseMemoTest(unittest.TestCase):
+    def test_expiry_and_eviction(self) -> None:
+        now = [0.0]
+        memo = ResponseMemo(max_size=2, ttl=10, clock=lambda: now[0])
+        memo.put('a', 1)
+        memo.put('b', 2)
+        self.assertEqual(memo.get('a'), (True, 1))
+
+        # 'b' is now the least recently used.
+        memo.put('c', 3)
+        self.assertEqual(memo.get('b'), (False, None))
+        self.assertEqual(memo.get('a'), (True, 1))
+
+        now[0] = 10.0
+        self.assertEqual(memo.get('a'), (False, None))
+        self.assertEqual(len(memo), 1)
+
+
+class FuelCheckClientCoalesceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = MockServer().start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def _fan_out(self, client: FuelCheckClient, count: int) -> List[object]:
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [
+                executor.submit(client.get_fuel_prices_for_station, 100)
+                for _ in range(count)]
+            results: List[object] = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except FuelCheckError as e:
+                    results.append(e)
+            return results
+
+    def test_identical_concurrent_requests_coalesce(self) -> None:
+        self.server.add('GET', '/prices/station/100', STATION_PRICES,
+                        delay=0.2)
+        with FuelCheckClient(base_url=self.server.url) as client:
+            results = self._fan_out(client, 8)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertIsInstance(result, list)
+            self.assertEqual(result, results[0])
+        # Callers get their own list.
+        self.assertIsNot(results[0], results[1])
+
+    def test_errors_are_shared(self) -> None:
+        self.server.add('GET', '/prices/station/100', status=500,
+                        body=b'Internal Server Error.', delay=0.2)
+        with FuelCheckClient(base_url=self.server.url) as client:
+            results = self._fan_out(client, 4)
+
+        self.assertEqual(len(self.server.requests), 1)
+        for result in results:
+            self.assertIsInstance(result, FuelCheckError)
+
+    def test_coalescing_disabled(self) -> None:
+        self.server.add('GET', '/prices/station/100', STATION_PRICES,
+                        delay=0.1)
+        with FuelCheckClient(base_url=self.server.url,
+                             coalesce=False) as client:
+            self._fan_out(client, 3)
+
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_memo(self) -> None:
+        self.server.add('GET', '/prices/station/100', STATION_PRICES)
+        self.server.add('GET', '/prices/station/200', STATION_PRICES)
+        with FuelCheckClient(base_url=self.server.url, memo_ttl=60,
+                             memo_size=1) as client:
+            client.get_fuel_prices_for_station(100)
+            client.get_fuel_prices_for_station(100)
+            self.assertEqual(len(self.server.requests), 1)
+
+            client.get_fuel_prices_for_station(200)
+            client.get_fuel_prices_for_station(100)
+            self.assertEqual(len(self.server.requests), 3)
+
+    def test_memoized_result_is_not_shared(self) -> None:
+        self.server.add('GET', '/prices', ALL_PRICES)
+        with FuelCheckClient(base_url=self.server.url,
+                             memo_ttl=60) as client:
+            first = client.get_fuel_prices()
+            first.prices.clear()
+            first.stations.append(first.stations[0])
+            second = client.get_fuel_prices()
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(second.prices), 1)
+        self.assertEqual(len(second.stations), 1)
+
+    def test_trends_fuel_types_are_requested_in_order(self) -> None:
+        self.server.add('POST', '/prices/trends/', TRENDS, delay=0.2)
+        with FuelCheckClient(base_url=self.server.url) as client, \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(client.get_fuel_price_trends,
+                                -33.0, 151.0, fuel_types)
+                for fuel_types in (['U91', 'E10'], ['E10', 'U91', 'E10'])]
+            for future in futures:
+                future.result()
+
+        self.assertEqual(len(self.server.requests), 1)
+        body = json.loads(self.server.requests[0][3])
+        self.assertEqual(body['fueltypes'], [{'code': 'E10'},
+                                             {'code': 'U91'}])
@@ -0,0 +1,65 @@
+import json
+import unittest
+from typing import Any, List
+
+from requests_mock import Mocker
+
+from nsw_fuel import FuelCheckClient
+from nsw_fuel.client import API_URL_BASE
+from nsw_fuel.decode import (
+    DECODER_NAMES, available_decoders, get_decoder, orjson)
+
+from .helpers import read_fixture
+
+
+class DecoderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.body = read_fixture('all_prices.json')
+
+    def test_available_decoders(self) -> None:
+        decoders = available_decoders()
+        self.assertIn('json', decoders)
+        self.assertEqual(list(decoders),
+                         [name for name in DECODER_NAMES if name in decoders])
+        self.assertIs(get_decoder(), next(iter(decoders.values())))
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_prefers_orjson(self) -> None:
+        self.assertIs(get_decoder(), orjson.loads)
+
+    def test_decoders_agree(self) -> None:
+        expected = json.loads(self.body.decode('utf-8'))
+        for name, decoder in available_decoders().items():
+            with self.subTest(name):
+                self.assertEqual(decoder(self.body), expected)
+                self.assertEqual(decoder('{"name": "Café"}'.encode('utf-8')),
+                                 {'name': 'Café'})
+
+    def test_invalid_json_raises_value_error(self) -> None:
+        for name, decoder in available_decoders().items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    decoder(b'{"prices": [')
+
+    def test_unknown_or_missing_decoder(self) -> None:
+        with self.assertRaises(ValueError):
+            get_decoder('yaml')
+        missing = [name for name in DECODER_NAMES
+                   if name not in available_decoders()]
+        for name in missing:
+            with self.assertRaises(ImportError):
+                get_decoder(name)
+
+    @Mocker()
+    def test_client_decodes_bytes_with_decoder(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE), content=self.body)
+        bodies: List[Any] = []
+
+        def decoder(body: bytes) -> Any:
+            bodies.append(body)
+            return json.loads(body)
+
+        client = FuelCheckClient(json_decoder=decoder)
+        response = client.get_fuel_prices()
+        self.assertEqual(bodies, [self.body])
+        self.assertEqual(len(response.prices), 5)
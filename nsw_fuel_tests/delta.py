@@ -0,0 +1,68 @@
+import unittest
+
+from requests_mock import Mocker
+
+from nsw_fuel import FuelCheckClient, PriceDeltaSync
+from nsw_fuel.client import API_URL_BASE
+
+from .helpers import load_fixture
+
+
+class PriceDeltaSyncTest(unittest.TestCase):
+    @Mocker()
+    def test_sync_uses_new_prices_endpoint(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE), json=load_fixture('all_prices.json'))
+        m.get('{}/prices/new'.format(API_URL_BASE), json={
+            'stations': [],
+            'prices': [{
+                'stationcode': '2',
+                'fueltype': 'P95',
+                'price': 169.9,
+                'lastupdated': '24/05/2018 08:00:00',
+            }],
+        })
+
+        sync = PriceDeltaSync(FuelCheckClient())
+        delta = sync.sync()
+        self.assertEqual(len(delta.changed), 5)
+        self.assertEqual(len(delta.response.prices), 5)
+
+        delta = sync.sync()
+        self.assertEqual(len(delta.changed), 1)
+        self.assertEqual(delta.changed[0].price, 169.9)
+        self.assertEqual(len(delta.response.prices), 5)
+        self.assertEqual(len(delta.response.stations), 2)
+        self.assertIn(169.9, [p.price for p in delta.response.prices])
+        self.assertNotIn(175.9, [p.price for p in delta.response.prices])
+        self.assertEqual(m.call_count, 2)
+
+    @Mocker()
+    def test_sync_falls_back_to_diff(self, m: Mocker) -> None:
+        first = load_fixture('all_prices.json')
+        second = load_fixture('all_prices.json')
+        second['prices'][0]['price'] = 150.0
+        second['prices'][0]['lastupdated'] = '30/05/2018 10:00:00'
+        del second['prices'][4]
+        m.get('{}/prices'.format(API_URL_BASE),
+              [{'json': first}, {'json': second}])
+        m.get('{}/prices/new'.format(API_URL_BASE), status_code=500)
+
+        sync = PriceDeltaSync(FuelCheckClient())
+        sync.sync()
+        delta = sync.sync()
+
+        self.assertEqual(len(delta.changed), 1)
+        self.assertEqual(delta.changed[0].fuel_type, 'DL')
+        self.assertEqual(delta.changed[0].price, 150.0)
+        self.assertEqual(len(delta.response.prices), 4)
+
+    @Mocker()
+    def test_sync_without_changes(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE), json=load_fixture('all_prices.json'))
+
+        sync = PriceDeltaSync(FuelCheckClient(), use_new_prices=False)
+        sync.sync()
+        delta = sync.sync()
+
+        self.assertEqual(delta.changed, [])
+        self.assertEqual(len(delta.response.prices), 5)
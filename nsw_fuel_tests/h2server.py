@@ -0,0 +1,139 @@
+"""
+A local HTTP/2 stand-in for the FuelCheck API, served over cleartext with
+prior knowledge (no TLS or upgrade), for testing and benchmarking HTTP/2
+transports. Routes are registered, and requests recorded, as with
+:class:`nsw_fuel_tests.server.MockServer`. Requires ``h2``.
+"""
+import asyncio
+import json
+import threading
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+import h2.config
+import h2.connection
+import h2.events
+
+Route = Tuple[int, bytes, float]
+
+
+class _Protocol(asyncio.Protocol):
+    def __init__(self, server: 'H2Server') -> None:
+        self._server = server
+        self._connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False))
+        self._transport: Optional[asyncio.Transport] = None
+        self._requests: Dict[int, Tuple[Dict[str, str], bytearray]] = {}
+        # Response bodies waiting for the flow control window to open.
+        self._pending: Dict[int, bytes] = {}
+
+    def connection_made(self, transport: Any) -> None:
+        self._transport = transport
+        self._server.connections.add(transport.get_extra_info('peername'))
+        self._connection.initiate_connection()
+        self._flush()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._transport = None
+
+    def _flush(self) -> None:
+        if self._transport is not None:
+            self._transport.write(self._connection.data_to_send())
+
+    def data_received(self, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        for event in self._connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                headers = {name.decode(): value.decode()
+                           for name, value in event.headers}
+                self._requests[event.stream_id] = (headers, bytearray())
+            elif isinstance(event, h2.events.DataReceived):
+                self._requests[event.stream_id][1].extend(event.data)
+                self._connection.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                headers, request_body = self._requests.pop(event.stream_id)
+                method = headers.pop(':method')
+                path = headers.pop(':path')
+                self._server.requests.append((
+                    method, path,
+                    {name: value for name, value in headers.items()
+                     if not name.startswith(':')},
+                    bytes(request_body)))
+                status, body, delay = self._server.routes.get(
+                    (method, path.split('?')[0]), (404, b'Not Found', 0))
+                loop.call_later(delay, self._respond, event.stream_id,
+                                status, body)
+            elif isinstance(event, h2.events.WindowUpdated):
+                for stream_id in list(self._pending):
+                    self._send(stream_id)
+        self._flush()
+
+    def _respond(self, stream_id: int, status: int, body: bytes) -> None:
+        if self._transport is None:
+            return
+        self._connection.send_headers(stream_id, [
+            (':status', str(status)),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(body))),
+        ])
+        self._pending[stream_id] = body
+        self._send(stream_id)
+        self._flush()
+
+    def _send(self, stream_id: int) -> None:
+        body = self._pending.pop(stream_id)
+        while body:
+            size = min(self._connection.local_flow_control_window(stream_id),
+                       self._connection.max_outbound_frame_size, len(body))
+            if size <= 0:
+                self._pending[stream_id] = body
+                return
+            self._connection.send_data(stream_id, body[:size])
+            body = body[size:]
+        self._connection.end_stream(stream_id)
+
+
+class H2Server(object):
+    def __init__(self) -> None:
+        self.routes: Dict[Tuple[str, str], Route] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str], bytes]] = []
+        self.connections: Set[Any] = set()
+        self._loop = asyncio.new_event_loop()
+        self._servers: List[asyncio.AbstractServer] = []
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True)
+        self._port = 0
+
+    @property
+    def url(self) -> str:
+        return 'http://127.0.0.1:{}'.format(self._port)
+
+    def add(self, method: str, path: str, json_body: Any = None,
+            status: int = 200, body: Optional[bytes] = None,
+            delay: float = 0) -> None:
+        if body is None:
+            body = json.dumps(json_body).encode('utf-8')
+        self.routes[(method, path)] = (status, body, delay)
+
+    def start(self) -> 'H2Server':
+        server = self._loop.run_until_complete(self._loop.create_server(
+            lambda: _Protocol(self), '127.0.0.1', 0))
+        self._servers.append(server)
+        self._port = server.sockets[0].getsockname()[1]
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.close()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> 'H2Server':
+        return self.start()
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.stop()
@@ -0,0 +1,29 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from nsw_fuel import Price, Station
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as fixture:
+        return fixture.read()
+
+
+def load_fixture(name: str) -> Dict[str, Any]:
+    data: Dict[str, Any] = json.loads(read_fixture(name))
+    return data
+
+
+def make_station(code: int, brand: str = 'BP',
+                 latitude: Optional[float] = None,
+                 longitude: Optional[float] = None) -> Station:
+    return Station(id=None, brand=brand, code=code,
+                   name='{} {}'.format(brand, code), address='',
+                   latitude=latitude, longitude=longitude)
+
+
+def make_price(code: int, price: float, fuel_type: str = 'E10') -> Price:
+    return Price(fuel_type, price, None, None, code)
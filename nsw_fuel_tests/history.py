@@ -0,0 +1,92 @@
+import datetime
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+from nsw_fuel import GetFuelPricesResponse, PriceHistory
+
+
+def snapshot(prices: List[Dict[str, Any]]) -> GetFuelPricesResponse:
+    return GetFuelPricesResponse.deserialize({
+        'stations': [{
+            'stationid': 'SAAAAAA',
+            'brand': 'Caltex',
+            'code': '1',
+            'name': 'Caltex Hurstville',
+            'address': '1 Fake Street, Hurstville NSW 2220',
+            'location': {'latitude': -33.96, 'longitude': 151.1},
+        }],
+        'prices': prices,
+    })
+
+
+def price(station_code: int, fuel_type: str, price: float,
+          lastupdated: str) -> Dict[str, Any]:
+    return {'stationcode': str(station_code), 'fueltype': fuel_type,
+            'price': price, 'lastupdated': lastupdated}
+
+
+class PriceHistoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.history = PriceHistory()
+        self.addCleanup(self.history.close)
+        self.history.add(snapshot([
+            price(1, 'E10', 140.0, '01/06/2018 08:00:00'),
+            price(1, 'U91', 150.0, '01/06/2018 08:00:00'),
+            price(2, 'E10', 141.0, '01/06/2018 09:00:00'),
+        ]))
+
+    def test_deduplicates_snapshots(self) -> None:
+        added = self.history.add(snapshot([
+            price(1, 'E10', 140.0, '01/06/2018 08:00:00'),
+            price(1, 'U91', 150.0, '01/06/2018 08:00:00'),
+            price(2, 'E10', 139.0, '02/06/2018 07:30:00'),
+            {'fueltype': 'E10', 'price': 1.0, 'lastupdated': 'never'},
+        ]))
+        self.assertEqual(added, 1)
+        self.assertEqual(len(self.history), 4)
+
+    def test_range_queries(self) -> None:
+        self.history.add(snapshot([
+            price(1, 'E10', 138.0, '2018-06-02 08:00:00')]))
+
+        e10 = self.history.prices(fuel_type='E10')
+        self.assertEqual([p.price for p in e10], [140.0, 141.0, 138.0])
+        self.assertEqual(e10[0].last_updated,
+                         datetime.datetime(2018, 6, 1, 8))
+
+        station = self.history.prices(
+            station_code=1, since=datetime.datetime(2018, 6, 1, 8),
+            until=datetime.datetime(2018, 6, 2, 8))
+        self.assertEqual([(p.fuel_type, p.price) for p in station],
+                         [('E10', 140.0), ('U91', 150.0)])
+
+    def test_latest(self) -> None:
+        for day in range(2, 6):
+            self.history.add_prices(snapshot([price(
+                1, 'E10', 140.0 + day,
+                '0{}/06/2018 08:00:00'.format(day))]).prices)
+
+        latest = self.history.latest(1, 'E10', n=2)
+        self.assertEqual([p.price for p in latest], [145.0, 144.0])
+        self.assertEqual(latest[0].station_code, 1)
+        self.assertEqual(self.history.latest(3, 'E10'), [])
+
+    def test_stations(self) -> None:
+        station = self.history.station(1)
+        assert station is not None
+        self.assertEqual(station.brand, 'Caltex')
+        self.assertEqual(station.latitude, -33.96)
+        self.assertIsNone(self.history.station(2))
+        self.assertEqual(self.history.stations(), [station])
+
+    def test_persists(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'history.db')
+            with PriceHistory(path) as history:
+                history.add(snapshot([
+                    price(1, 'E10', 140.0, '01/06/2018 08:00:00')]))
+            with PriceHistory(path) as history:
+                self.assertEqual(len(history), 1)
+                self.assertEqual(history.latest(1, 'E10')[0].price, 140.0)
@@ -0,0 +1,161 @@
+import time
+import unittest
+from typing import List
+
+from nsw_fuel import (
+    FuelCheckClient, FuelCheckError, LoggingObserver, MetricsObserver,
+    MetricsRegistry, Observer)
+from nsw_fuel.instrument import RequestSpan
+
+from .server import MockServer
+
+ALL_PRICES = {
+    'stations': [{
+        'brand': 'Cool Fuel Brand',
+        'code': 100,
+        'name': 'Cool Fuel Brand Hurstville',
+        'address': '123 Fake Street',
+        'location': {'latitude': -33.0, 'longitude': 151.0},
+    }],
+    'prices': [{
+        'stationcode': 100,
+        'fueltype': 'E10',
+        'price': 146.9,
+        'lastupdated': '02/06/2018 02:03:04',
+    }, {
+        'stationcode': 100,
+        'fueltype': 'P95',
+        'price': 150.0,
+        'lastupdated': '02/06/2018 02:03:04',
+    }]
+}
+
+STATION_PRICES = {
+    'prices': [{
+        'fueltype': 'E10',
+        'price': 146.9,
+        'lastupdated': '02/06/2018 02:03:04',
+    }, {
+        'fueltype': 'P95',
+        'price': 150.0,
+        'lastupdated': '02/06/2018 02:03:04',
+    }]
+}
+
+
+class RecordingObserver(Observer):
+    def __init__(self) -> None:
+        self.spans: List[RequestSpan] = []
+
+    def on_request(self, span: RequestSpan) -> None:
+        self.spans.append(span)
+
+
+class FuelCheckClientInstrumentTest(unittest.TestCase):
+    def test_span_for_successful_call(self) -> None:
+        observer = RecordingObserver()
+        with MockServer() as server, FuelCheckClient(
+                base_url=server.url, observer=observer) as client:
+            server.add('GET', '/prices/station/100', STATION_PRICES)
+            prices = client.get_fuel_prices_for_station(100)
+
+        self.assertEqual(len(prices), 2)
+        span, = observer.spans
+        self.assertTrue(span.ok)
+        self.assertEqual(span.endpoint, '/prices/station')
+        self.assertEqual(span.method, 'GET')
+        self.assertEqual(span.status_code, 200)
+        self.assertEqual(span.attempts, 1)
+        self.assertEqual(span.objects, 2)
+        self.assertGreater(span.response_bytes, 0)
+        self.assertEqual(sorted(span.phases), [
+            'decode', 'deserialize', 'download', 'request'])
+        self.assertGreaterEqual(span.duration, sum(span.phases.values()))
+
+    def test_span_for_error(self) -> None:
+        observer = RecordingObserver()
+        with MockServer() as server, FuelCheckClient(
+                base_url=server.url, observer=observer) as client:
+            server.add('GET', '/prices/station/100', status=400, json_body={
+                'errorDetails': {'code': 'E0014', 'message': 'Invalid'}})
+            with self.assertRaises(FuelCheckError):
+                client.get_fuel_prices_for_station(100)
+
+        span, = observer.spans
+        self.assertFalse(span.ok)
+        self.assertEqual(span.status_code, 400)
+        self.assertEqual(span.error_code, 'E0014')
+        self.assertEqual(list(span.phases), ['request'])
+
+    def test_span_counts_lazy_objects(self) -> None:
+        observer = RecordingObserver()
+        with MockServer() as server, FuelCheckClient(
+                base_url=server.url, observer=observer) as client:
+            server.add('GET', '/prices', ALL_PRICES)
+            client.get_fuel_prices(lazy=True)
+
+        span, = observer.spans
+        self.assertEqual(span.objects, 3)
+
+    def test_repeated_phase_is_summed(self) -> None:
+        span = RequestSpan('/prices', 'GET')
+        span.lap('request', time.perf_counter() - 1)
+        span.lap('request', time.perf_counter() - 2)
+        self.assertGreaterEqual(span.phases['request'], 3)
+
+    def test_logging_observer(self) -> None:
+        with MockServer() as server, FuelCheckClient(
+                base_url=server.url, observer=LoggingObserver()) as client:
+            server.add('GET', '/prices/station/100', STATION_PRICES)
+            with self.assertLogs('nsw_fuel', 'DEBUG') as logs:
+                client.get_fuel_prices_for_station(100)
+
+        message, = logs.output
+        self.assertIn('GET /prices/station status=200', message)
+        self.assertIn('objects=2', message)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_observer_records_metrics(self) -> None:
+        observer = MetricsObserver()
+        with MockServer() as server, FuelCheckClient(
+                base_url=server.url, observer=observer) as client:
+            server.add('GET', '/prices/station/100', STATION_PRICES)
+            server.add('GET', '/prices/station/200', status=500,
+                       body=b'Internal Server Error.')
+            client.get_fuel_prices_for_station(100)
+            client.get_fuel_prices_for_station(100)
+            with self.assertRaises(FuelCheckError):
+                client.get_fuel_prices_for_station(200)
+
+        labels = {'endpoint': '/prices/station'}
+        self.assertEqual(observer.requests.get(status='200', **labels), 2)
+        self.assertEqual(observer.requests.get(status='500', **labels), 1)
+        self.assertEqual(
+            observer.errors.get(code='FuelCheckError', **labels), 1)
+        self.assertEqual(observer.objects.get(**labels), 4)
+        self.assertEqual(
+            observer.duration.count(phase='total', **labels), 3)
+        self.assertEqual(
+            observer.duration.count(phase='deserialize', **labels), 2)
+
+    def test_render(self) -> None:
+        registry = MetricsRegistry()
+        registry.counter('calls_total', 'Calls.').inc(endpoint='/lovs')
+        histogram = registry.histogram('latency_seconds', 'Latency.',
+                                       buckets=[0.1, 1.0])
+        histogram.observe(0.1)
+        histogram.observe(5.0)
+
+        self.assertEqual(registry.render(), '\n'.join([
+            '# HELP calls_total Calls.',
+            '# TYPE calls_total counter',
+            'calls_total{endpoint="/lovs"} 1.0',
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{le="0.1"} 1.0',
+            'latency_seconds_bucket{le="1.0"} 1.0',
+            'latency_seconds_bucket{le="+Inf"} 2.0',
+            'latency_seconds_count 2.0',
+            'latency_seconds_sum 5.1',
+        ]) + '\n')
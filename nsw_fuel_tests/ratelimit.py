@@ -0,0 +1,151 @@
+import threading
+import unittest
+from typing import List
+
+from requests_mock import Mocker
+
+from nsw_fuel import FuelCheckClient, FuelCheckError, RetryPolicy, TokenBucket
+from nsw_fuel.client import API_URL_BASE
+
+STATION_URL = '{}/prices/station/100'.format(API_URL_BASE)
+
+
+class FakeClock(object):
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_throttle(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock,
+                             sleep=clock.sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [0.5, 0.5])
+
+        # Idle time refills the bucket, up to its capacity.
+        clock.now += 100
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(len(clock.sleeps), 2)
+
+    def test_reservations_are_queued(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=1, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+    def test_thread_safe(self) -> None:
+        bucket = TokenBucket(rate=1, capacity=1, clock=FakeClock())
+        threads = [threading.Thread(target=lambda: [
+            bucket.reserve() for _ in range(100)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Every reservation was counted exactly once.
+        self.assertEqual(bucket.reserve(), 800)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_classification(self) -> None:
+        policy = RetryPolicy(fatal_error_codes={'E0014'},
+                             retryable_error_codes={'E9999'})
+        self.assertTrue(policy.is_retryable(FuelCheckError(status_code=429)))
+        self.assertTrue(policy.is_retryable(FuelCheckError(status_code=503)))
+        self.assertFalse(policy.is_retryable(FuelCheckError(status_code=400)))
+        self.assertFalse(policy.is_retryable(
+            FuelCheckError('E0014', status_code=503)))
+        self.assertTrue(policy.is_retryable(
+            FuelCheckError('E9999', status_code=400)))
+
+    def test_delay(self) -> None:
+        policy = RetryPolicy(base_delay=1, max_delay=5, jitter=lambda: 1.0)
+        error = FuelCheckError(status_code=503)
+        self.assertEqual([policy.delay(n, error) for n in range(1, 6)],
+                         [1, 2, 4, 5, 5])
+        self.assertEqual(
+            policy.delay(1, FuelCheckError(status_code=429, retry_after=3)),
+            3)
+
+        policy = RetryPolicy(base_delay=1, jitter=lambda: 0.25)
+        self.assertEqual(policy.delay(3, error), 1.0)
+
+    def test_retry_after_is_capped(self) -> None:
+        policy = RetryPolicy(max_delay=5)
+        for retry_after in (7, 1e12, float('inf')):
+            self.assertEqual(policy.delay(1, FuelCheckError(
+                status_code=429, retry_after=retry_after)), 5)
+
+
+class FuelCheckClientRetryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sleeps: List[float] = []
+        self.client = FuelCheckClient(retry_policy=RetryPolicy(
+            max_attempts=3, base_delay=1, jitter=lambda: 1.0,
+            sleep=self.sleeps.append))
+
+    @Mocker()
+    def test_retries_rate_limited_requests(self, m: Mocker) -> None:
+        m.get(STATION_URL, [
+            {'status_code': 429, 'headers': {'Retry-After': '3'}},
+            {'status_code': 503, 'text': 'Unavailable'},
+            {'json': {'prices': []}},
+        ])
+        self.assertEqual(self.client.get_fuel_prices_for_station(100), [])
+        self.assertEqual(self.sleeps, [3.0, 2.0])
+
+    @Mocker()
+    def test_infinite_retry_after_waits_max_delay(self, m: Mocker) -> None:
+        m.get(STATION_URL, [
+            {'status_code': 429, 'headers': {'Retry-After': 'inf'}},
+            {'status_code': 429, 'headers': {'Retry-After': '86400'}},
+            {'json': {'prices': []}},
+        ])
+        self.assertEqual(self.client.get_fuel_prices_for_station(100), [])
+        self.assertEqual(self.sleeps, [30.0, 30.0])
+
+    @Mocker()
+    def test_gives_up_after_max_attempts(self, m: Mocker) -> None:
+        m.get(STATION_URL, status_code=429, text='Too many requests')
+        with self.assertRaises(FuelCheckError) as cm:
+            self.client.get_fuel_prices_for_station(100)
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertEqual(m.call_count, 3)
+
+    @Mocker()
+    def test_fatal_errors_are_not_retried(self, m: Mocker) -> None:
+        m.get(STATION_URL, status_code=400, json={
+            'errorDetails': [{'code': 'E0014', 'description': 'Invalid'}]
+        })
+        with self.assertRaises(FuelCheckError) as cm:
+            self.client.get_fuel_prices_for_station(100)
+        self.assertEqual(cm.exception.error_code, 'E0014')
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(self.sleeps, [])
+
+    @Mocker()
+    def test_rate_limiter_is_applied(self, m: Mocker) -> None:
+        m.get(STATION_URL, json={'prices': []})
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock,
+                             sleep=clock.sleep)
+        client = FuelCheckClient(rate_limiter=bucket, coalesce=False)
+        other = FuelCheckClient(rate_limiter=bucket, coalesce=False)
+        client.get_fuel_prices_for_station(100)
+        other.get_fuel_prices_for_station(100)
+        self.assertEqual(clock.sleeps, [1.0])
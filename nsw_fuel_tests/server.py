@@ -0,0 +1,98 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+Route = Tuple[int, bytes, float]
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients may drop a connection mid-response, e.g. by closing a
+        # stream before reading it all.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockServer(object):
+    """
+    A local stand-in for the FuelCheck API, served over HTTP/1.1 with
+    keep-alive so that connection reuse can be observed.
+    """
+
+    def __init__(self) -> None:
+        self.routes: Dict[Tuple[str, str], Route] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str], bytes]] = []
+        self.connections: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.01},
+                                        daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def add(self, method: str, path: str, json_body: Any = None,
+            status: int = 200, body: Optional[bytes] = None,
+            delay: float = 0) -> None:
+        if body is None:
+            body = json.dumps(json_body).encode('utf-8')
+        self.routes[(method, path)] = (status, body, delay)
+
+    def start(self) -> 'MockServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.stop()
+
+    def _handler(self) -> Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, which would
+            # otherwise wait on the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def _respond(self) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                request_body = self.rfile.read(length)
+                with server._lock:
+                    server.connections.add(self.client_address[:2])
+                    server.requests.append((
+                        self.command, self.path, dict(self.headers),
+                        request_body))
+
+                status, body, delay = server.routes.get(
+                    (self.command, self.path), (404, b'Not Found', 0))
+                time.sleep(delay)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
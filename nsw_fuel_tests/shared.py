@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from typing import Any, Dict
+
+from requests_mock import Mocker
+
+from nsw_fuel import (
+    FuelCheckClient, FuelCheckError, GetFuelPricesResponse, SharedPriceCache)
+from nsw_fuel.client import API_URL_BASE
+from nsw_fuel.shared import fcntl
+
+PRICES_URL = '{}/prices'.format(API_URL_BASE)
+
+
+def prices(price: float) -> Dict[str, Any]:
+    return {
+        'stations': [{
+            'brand': 'Caltex',
+            'code': '1',
+            'name': 'Caltex Hurstville',
+            'address': '1 Fake Street, Hurstville NSW 2220',
+        }],
+        'prices': [{
+            'stationcode': '1',
+            'fueltype': 'E10',
+            'price': price,
+            'lastupdated': '02/06/2018 02:03:04',
+        }],
+    }
+
+
+class SharedPriceCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.client = FuelCheckClient(coalesce=False)
+        self.addCleanup(self.client.close)
+
+    @Mocker()
+    def test_refreshes_once_then_reads(self, m: Mocker) -> None:
+        m.get(PRICES_URL, json=prices(146.9))
+        cache = SharedPriceCache(self.directory, self.client, max_age=60)
+        response = cache.get_fuel_prices()
+        self.assertEqual(response.prices[0].price, 146.9)
+        self.assertIs(cache.get_fuel_prices(), response)
+        self.assertEqual(m.call_count, 1)
+
+        # Another process reads the published snapshot without fetching.
+        reader = SharedPriceCache(self.directory)
+        self.assertEqual(list(reader.get_fuel_prices().prices),
+                         list(response.prices))
+        self.assertEqual(m.call_count, 1)
+
+    @Mocker()
+    def test_readers_switch_generations(self, m: Mocker) -> None:
+        m.get(PRICES_URL, [{'json': prices(146.9)}, {'json': prices(150.0)}])
+        writer = SharedPriceCache(self.directory, self.client)
+        reader = SharedPriceCache(self.directory)
+        writer.refresh()
+        old = reader.get_fuel_prices()
+
+        self.assertTrue(writer.refresh(force=True))
+        new = reader.get_fuel_prices()
+        self.assertEqual(new.prices[0].price, 150.0)
+        # The previous generation remains readable after being replaced.
+        self.assertEqual(old.prices[0].price, 146.9)
+
+    @unittest.skipIf(fcntl is None, 'File locking is not supported')
+    @Mocker()
+    def test_stale_snapshot_served_while_locked(self, m: Mocker) -> None:
+        m.get(PRICES_URL, json=prices(146.9))
+        cache = SharedPriceCache(self.directory, self.client, max_age=0)
+        cache.refresh()
+
+        with open(os.path.join(self.directory, 'refresh.lock')) as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.assertFalse(cache.refresh(wait=False))
+            self.assertEqual(cache.get_fuel_prices().prices[0].price, 146.9)
+        self.assertEqual(m.call_count, 1)
+
+    @Mocker()
+    def test_refresh_errors(self, m: Mocker) -> None:
+        m.get(PRICES_URL, status_code=500, text='Internal Server Error.')
+        cache = SharedPriceCache(self.directory, self.client, max_age=0)
+        with self.assertRaises(FuelCheckError):
+            cache.get_fuel_prices()
+
+        # A stale snapshot is better than none.
+        cache.publish(GetFuelPricesResponse.deserialize(prices(146.9)))
+        self.assertEqual(cache.get_fuel_prices().prices[0].price, 146.9)
+
+    def test_nothing_published(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            SharedPriceCache(self.directory).get_fuel_prices()
@@ -0,0 +1,77 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from nsw_fuel import (
+    GetFuelPricesResponse, GetReferenceDataResponse, Price, Station)
+from nsw_fuel.snapshot import (
+    SnapshotError, load_fuel_prices, load_reference_data, save)
+
+from .helpers import load_fixture
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'snapshot.bin')
+
+    def test_fuel_prices_round_trip(self) -> None:
+        response = GetFuelPricesResponse(
+            stations=[
+                Station(id='SAAAAAA', brand='Caltex', code=1,
+                        name='Caltex Hurstville ⛽', address='1 Fake St',
+                        latitude=-33.96, longitude=151.1),
+                Station(id=None, brand='BP', code=2, name='BP',
+                        address='2 Fake St'),
+            ],
+            prices=[
+                Price(fuel_type='E10', price=146.9,
+                      last_updated=datetime.datetime(2018, 6, 2, 2, 3, 4),
+                      price_unit='litre', station_code=1),
+                Price(fuel_type='U91', price=150.0, last_updated=None,
+                      price_unit=None, station_code=None),
+            ])
+        save(response, self.path)
+        loaded = load_fuel_prices(self.path)
+
+        self.assertEqual(list(loaded.stations), response.stations)
+        self.assertEqual(list(loaded.prices), response.prices)
+        self.assertEqual(loaded.prices_for(1), (response.prices[0],))
+
+    def test_reference_data_round_trip(self) -> None:
+        response = GetReferenceDataResponse.deserialize(
+            load_fixture('lovs.json'))
+        save(response, self.path)
+        loaded = load_reference_data(self.path)
+
+        self.assertEqual(list(loaded.stations), response.stations)
+        self.assertEqual(loaded.brands, response.brands)
+        self.assertEqual(loaded.fuel_types, response.fuel_types)
+        self.assertEqual(loaded.trend_periods, response.trend_periods)
+        self.assertEqual(loaded.sort_fields, response.sort_fields)
+        self.assertEqual(loaded.stations_by_code[2].name,
+                         'Fake Fuel Brand Kogarah')
+
+    def test_invalid_snapshots(self) -> None:
+        save(GetFuelPricesResponse(stations=[], prices=[]), self.path)
+        with self.assertRaisesRegex(SnapshotError, 'kind'):
+            load_reference_data(self.path)
+
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 1]))
+        with self.assertRaisesRegex(SnapshotError, 'Checksum'):
+            load_fuel_prices(self.path)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'{"prices": []}' * 4)
+        with self.assertRaisesRegex(SnapshotError, 'Not a snapshot'):
+            load_fuel_prices(self.path)
+
+        open(self.path, 'wb').close()
+        with self.assertRaises(SnapshotError):
+            load_fuel_prices(self.path)
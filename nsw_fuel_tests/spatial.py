@@ -0,0 +1,119 @@
+import unittest
+
+from nsw_fuel import (
+    GetFuelPricesResponse, GetReferenceDataResponse, Station)
+from nsw_fuel.spatial import StationIndex, haversine_km
+
+from .helpers import make_price, make_station
+
+
+class StationIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Roughly 0km, 1.1km, 5.6km and 55km north of Sydney CBD.
+        stations = [
+            make_station(1, 'Shell', -33.87, 151.21),
+            make_station(2, 'BP', -33.86, 151.21),
+            make_station(3, 'Shell', -33.82, 151.21),
+            make_station(4, 'BP', -33.37, 151.21),
+            Station(id=None, brand='BP', code=5, name='Nowhere', address=''),
+        ]
+        prices = [
+            make_price(1, 150.0),
+            make_price(2, 140.0),
+            make_price(2, 145.0, 'U91'),
+            make_price(3, 130.0),
+            make_price(4, 120.0),
+        ]
+        self.index = StationIndex.from_responses(
+            GetReferenceDataResponse(stations[:3], [], [], [], []),
+            GetFuelPricesResponse(stations[3:], prices))
+
+    def test_haversine(self) -> None:
+        self.assertAlmostEqual(
+            haversine_km(-33.87, 151.21, -33.37, 151.21), 55.6, places=1)
+        self.assertEqual(haversine_km(-33.87, 151.21, -33.87, 151.21), 0)
+
+    def test_stations_without_location_are_skipped(self) -> None:
+        self.assertEqual(len(self.index), 4)
+
+    def test_sorted_by_distance(self) -> None:
+        result = self.index.get_fuel_prices_within_radius(
+            latitude=-33.87, longitude=151.21, radius=10, fuel_type='E10')
+        self.assertEqual([r.station.code for r in result], [1, 2, 3])
+        self.assertEqual([r.price.price for r in result],
+                         [150.0, 140.0, 130.0])
+
+    def test_sorted_by_price(self) -> None:
+        result = self.index.get_fuel_prices_within_radius(
+            latitude=-33.87, longitude=151.21, radius=100, fuel_type='E10',
+            sort_by='price')
+        self.assertEqual([r.station.code for r in result], [4, 3, 2, 1])
+
+    def test_brand_and_fuel_type_filter(self) -> None:
+        result = self.index.get_fuel_prices_within_radius(
+            latitude=-33.87, longitude=151.21, radius=100, fuel_type='E10',
+            brands=['BP'])
+        self.assertEqual([r.station.code for r in result], [2, 4])
+
+        result = self.index.get_fuel_prices_within_radius(
+            latitude=-33.87, longitude=151.21, radius=100, fuel_type='U91')
+        self.assertEqual([r.station.code for r in result], [2])
+
+    def test_updates(self) -> None:
+        self.index.add_station(make_station(1, 'Shell', -33.37, 151.22))
+        self.index.update_prices([make_price(3, 110.0)])
+
+        result = self.index.get_fuel_prices_within_radius(
+            latitude=-33.87, longitude=151.21, radius=10, fuel_type='E10')
+        self.assertEqual([(r.station.code, r.price.price) for r in result],
+                         [(2, 140.0), (3, 110.0)])
+
+    def test_matches_brute_force(self) -> None:
+        for radius in [0.5, 1.2, 6, 56]:
+            expected = [
+                code for code, lat in [(1, -33.87), (2, -33.86),
+                                       (3, -33.82), (4, -33.37)]
+                if haversine_km(-33.87, 151.21, lat, 151.21) <= radius]
+            result = self.index.stations_within_radius(-33.87, 151.21, radius)
+            self.assertEqual([s.code for _, s in result], expected)
+
+    def test_along_route(self) -> None:
+        # North past stations 1-3, about 0.9km west of them, then east.
+        route = [(-33.90, 151.20), (-33.80, 151.20), (-33.80, 151.30)]
+        self.index.add_station(make_station(6, 'BP', -33.79, 151.25))
+        self.index.update_prices([make_price(6, 135.0)])
+
+        result = self.index.get_fuel_prices_along_route(
+            route, buffer=1, fuel_type='E10', sort_by='route')
+        self.assertEqual([r.station.code for r in result], [1, 2, 3])
+        self.assertAlmostEqual(result[0].distance, 0.92, places=2)
+        self.assertAlmostEqual(
+            result[0].distance_along_route, 3.34, places=2)
+        self.assertAlmostEqual(
+            result[2].distance_along_route, 8.90, places=2)
+
+        result = self.index.get_fuel_prices_along_route(
+            route, buffer=2, fuel_type='E10')
+        self.assertEqual([r.station.code for r in result], [3, 6, 2, 1])
+        self.assertAlmostEqual(result[1].distance, 1.11, places=2)
+        self.assertAlmostEqual(
+            result[1].distance_along_route, 11.12 + 4.62, places=1)
+
+        self.assertEqual(self.index.get_fuel_prices_along_route(
+            route, buffer=0.5, fuel_type='E10'), [])
+
+    def test_along_route_nearest_point(self) -> None:
+        # The route passes station 1 twice; the nearest pass is reported.
+        route = [(-33.87, 151.22), (-33.87, 151.30), (-33.87, 151.211)]
+        result = self.index.get_fuel_prices_along_route(
+            route, buffer=1, fuel_type='E10', brands=['Shell'])
+        self.assertEqual([r.station.code for r in result], [1])
+        self.assertAlmostEqual(result[0].distance, 0.09, places=2)
+
+    def test_along_single_point_route(self) -> None:
+        result = self.index.stations_along_route([(-33.87, 151.21)], 2)
+        self.assertEqual([(along, station.code)
+                          for along, _, station in result],
+                         [(0, 1), (0, 2)])
+        with self.assertRaises(ValueError):
+            self.index.stations_along_route([], 2)
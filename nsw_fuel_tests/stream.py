@@ -0,0 +1,102 @@
+import datetime
+import json
+import unittest
+from typing import Iterator
+
+from requests_mock import Mocker
+
+from nsw_fuel import FuelCheckClient, FuelCheckError
+from nsw_fuel.client import API_URL_BASE
+from nsw_fuel.stream import iter_json_array
+
+from .helpers import read_fixture
+
+
+def chunked(data: bytes, size: int) -> Iterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def test_matches_json_loads_for_any_chunk_size(self) -> None:
+        data = read_fixture('lovs.json')
+        expected = json.loads(data)['stations']['items']
+        for size in [1, 2, 7, 64, len(data)]:
+            items = list(iter_json_array(chunked(data, size),
+                                         ('stations', 'items')))
+            self.assertEqual(items, expected)
+
+    def test_skips_other_values(self) -> None:
+        data = json.dumps({
+            'a': {'b': [1, [2, 3], {'c': None}], 'd': 'x,]}'},
+            'e': ['"quoted" [', '\\', {'f': '\\"}]'}],
+            'n': 12345,
+            'target': [{'v': 1.5}, 'é', 67890, True],
+            'after': [1, 2],
+        }).encode('utf-8')
+        items = list(iter_json_array(chunked(data, 1), ('target',)))
+        self.assertEqual(items, [{'v': 1.5}, 'é', 67890, True])
+
+    def test_missing_or_null_path(self) -> None:
+        data = b'{"stations": null, "prices": []}'
+        self.assertEqual(list(iter_json_array([data], ('stations',))), [])
+        self.assertEqual(list(iter_json_array([data], ('prices',))), [])
+        self.assertEqual(list(iter_json_array([data], ('other',))), [])
+
+    def test_truncated_document(self) -> None:
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"prices": [{"a": 1}, '], ('prices',)))
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"other": [{"a": "]'], ('prices',)))
+
+    def test_empty_document(self) -> None:
+        for data in [b'', b' \r\n']:
+            self.assertEqual(list(iter_json_array(
+                [data], ('prices',), allow_empty=True)), [])
+            with self.assertRaises(ValueError):
+                list(iter_json_array([data], ('prices',)))
+
+
+class FuelCheckClientStreamTest(unittest.TestCase):
+    @Mocker()
+    def test_iter_fuel_prices(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE),
+              content=read_fixture('all_prices.json'))
+        client = FuelCheckClient()
+        prices = list(client.iter_fuel_prices())
+
+        expected = client.get_fuel_prices().prices
+        self.assertEqual(len(prices), 5)
+        self.assertEqual(
+            [(p.station_code, p.fuel_type, p.price, p.last_updated)
+             for p in prices],
+            [(p.station_code, p.fuel_type, p.price, p.last_updated)
+             for p in expected])
+
+    @Mocker()
+    def test_iter_reference_stations(self, m: Mocker) -> None:
+        m.get('{}/lovs'.format(API_URL_BASE),
+              content=read_fixture('lovs.json'))
+        client = FuelCheckClient()
+        stations = list(client.iter_reference_stations())
+
+        names = [station.name for station in stations]
+        self.assertEqual(names, ['Cool Fuel Brand Hurstville',
+                                 'Fake Fuel Brand Kogarah'])
+        self.assertEqual(stations[1].code, 2)
+
+    @Mocker()
+    def test_iter_reference_stations_unmodified(self, m: Mocker) -> None:
+        m.get('{}/lovs'.format(API_URL_BASE), content=b'')
+        client = FuelCheckClient()
+        self.assertEqual(list(client.iter_reference_stations(
+            modified_since=datetime.datetime(2018, 6, 1))), [])
+
+    @Mocker()
+    def test_iter_fuel_prices_server_error(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE), status_code=500,
+              text='Internal Server Error.')
+        client = FuelCheckClient()
+        with self.assertRaises(FuelCheckError) as cm:
+            list(client.iter_fuel_prices())
+        self.assertEqual(str(cm.exception), 'Internal Server Error.')
@@ -0,0 +1,101 @@
+import datetime
+import unittest
+
+from nsw_fuel import GetFuelPricesResponse, Price, Station
+from nsw_fuel.table import PriceTable
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+
+def make_response() -> GetFuelPricesResponse:
+    stations = [
+        Station(id=None, brand='Shell', code=1, name='Shell Kogarah',
+                address='1 Fake Street, Kogarah NSW 2217'),
+        Station(id=None, brand='BP', code=2, name='BP Kogarah',
+                address='2 Fake Street, Kogarah NSW 2217'),
+        Station(id=None, brand='Shell', code=3, name='Shell Penrith',
+                address='3 Fake Street, Penrith NSW 2750'),
+    ]
+    updated = datetime.datetime(2018, 6, 1)
+    prices = [
+        Price('E10', 150.0, updated, None, 1),
+        Price('E10', 140.0, updated, None, 2),
+        Price('E10', 160.0, None, None, 3),
+        Price('U91', 155.0, updated, None, 1),
+        Price('U91', 145.0, updated + datetime.timedelta(days=1), None, 2),
+        Price('E10', 130.0, updated, None, 99),
+    ]
+    return GetFuelPricesResponse(stations=stations, prices=prices)
+
+
+class PriceTableTest(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self) -> None:
+        self.table = PriceTable.from_response(make_response(),
+                                              use_numpy=self.use_numpy)
+
+    def test_columns(self) -> None:
+        self.assertEqual(self.table.uses_numpy, self.use_numpy)
+        self.assertEqual(len(self.table), 6)
+        self.assertEqual(self.table.fuel_types, ['E10', 'U91'])
+        self.assertEqual(list(self.table.fuel_type_ids), [0, 0, 0, 1, 1, 0])
+        self.assertEqual(list(self.table.station_codes), [1, 2, 3, 1, 2, 99])
+        self.assertEqual(self.table.timestamps[0], 1527811200.0)
+
+    def test_aggregate_by_fuel_type(self) -> None:
+        self.assertEqual(self.table.aggregate('fuel_type', 'min'),
+                         {'E10': 130.0, 'U91': 145.0})
+        self.assertEqual(self.table.aggregate('fuel_type', 'max'),
+                         {'E10': 160.0, 'U91': 155.0})
+        self.assertEqual(self.table.aggregate('fuel_type', 'count'),
+                         {'E10': 4, 'U91': 2})
+        self.assertEqual(self.table.aggregate('fuel_type', 'mean'),
+                         {'E10': 145.0, 'U91': 150.0})
+        self.assertEqual(self.table.aggregate('fuel_type', 'median'),
+                         {'E10': 145.0, 'U91': 150.0})
+
+    def test_percentile(self) -> None:
+        self.assertEqual(self.table.percentile(0), {'E10': 130.0,
+                                                    'U91': 145.0})
+        self.assertEqual(self.table.percentile(75), {'E10': 152.5,
+                                                     'U91': 152.5})
+        with self.assertRaises(ValueError):
+            self.table.percentile(101)
+
+    def test_aggregate_by_station_attribute(self) -> None:
+        e10 = self.table.filter(fuel_type='E10')
+        self.assertEqual(e10.aggregate('brand', 'median'),
+                         {'Shell': 155.0, 'BP': 140.0, None: 130.0})
+
+        def suburb(station: Station) -> str:
+            return station.address.split(', ')[1].rsplit(' ', 2)[0]
+        self.assertEqual(e10.aggregate(suburb, 'min'),
+                         {'Kogarah': 140.0, 'Penrith': 160.0, None: 130.0})
+
+    def test_filter(self) -> None:
+        shell = self.table.filter(brand='Shell', max_price=155.0)
+        self.assertEqual(list(shell.prices), [150.0, 155.0])
+
+        recent = self.table.filter(updated_since=1527811200.0 + 1)
+        self.assertEqual(list(recent.prices), [145.0])
+
+        selected = self.table.filter(fuel_type='U91', station_codes=[2, 3])
+        self.assertEqual(list(selected.prices), [145.0])
+
+        self.assertEqual(len(self.table.filter(fuel_type='LPG')), 0)
+        self.assertEqual(self.table.filter(fuel_type='LPG').aggregate(), {})
+
+    def test_unknown_grouping(self) -> None:
+        with self.assertRaises(ValueError):
+            self.table.aggregate('suburb')
+        with self.assertRaises(ValueError):
+            self.table.aggregate('fuel_type', 'mode')
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class NumpyPriceTableTest(PriceTableTest):
+    use_numpy = True
@@ -0,0 +1,189 @@
+import json
+import socket
+import unittest
+from abc import ABCMeta, abstractmethod
+from typing import TYPE_CHECKING, Any, List
+
+from nsw_fuel import (
+    FuelCheckClient, FuelCheckError, HttpClientTransport, HttpxTransport,
+    RequestsTransport, Transport, TransportError)
+from nsw_fuel.transport import httpx
+
+from .server import MockServer
+
+try:
+    from .h2server import H2Server
+except ImportError:  # pragma: no cover
+    H2Server = None  # type: ignore
+
+if TYPE_CHECKING:
+    _TestCase = unittest.TestCase
+else:
+    _TestCase = object
+
+PRICES = {
+    'stations': [{'brand': 'Cool Fuel Brand', 'code': 1,
+                  'name': 'Cool Fuel Brand Hurstville',
+                  'address': '123 Fake Street',
+                  'location': {'latitude': -33.0, 'longitude': 151.0}}],
+    'prices': [{'fueltype': 'E10', 'price': 146.9, 'stationcode': 1,
+                'lastupdated': '02/06/2018 02:03:04', 'priceunit': 'CENTS'}],
+}
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return int(sock.getsockname()[1])
+
+
+class TransportTestMixin(_TestCase, metaclass=ABCMeta):
+    """
+    The tests every transport must pass, run by mixing this into a
+    ``unittest.TestCase`` for each transport.
+    """
+
+    @abstractmethod
+    def create_transport(self) -> Transport:
+        pass
+
+    def create_server(self) -> Any:
+        return MockServer()
+
+    def setUp(self) -> None:
+        self.server = self.create_server().start()
+        self.server.add('GET', '/prices', PRICES)
+        self.server.add('GET', '/prices/station/1',
+                        {'prices': PRICES['prices']})
+        self.server.add('POST', '/prices/nearby', PRICES)
+        self.transport = self.create_transport()
+        self.client = FuelCheckClient(base_url=self.server.url,
+                                      transport=self.transport)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.transport.close()
+        self.server.stop()
+
+    def test_get(self) -> None:
+        response = self.client.get_fuel_prices()
+        self.assertEqual(len(response.prices), 1)
+        self.assertEqual(response.prices[0].price, 146.9)
+
+    def test_post_json(self) -> None:
+        result = self.client.get_fuel_prices_within_radius(
+            -33.0, 151.0, 10, 'E10')
+        self.assertEqual(result[0].station.code, 1)
+        _, _, headers, body = self.server.requests[-1]
+        self.assertEqual(json.loads(body)['fueltype'], 'E10')
+        self.assertIn('requesttimestamp', {key.lower() for key in headers})
+
+    def test_error_response(self) -> None:
+        self.server.add('GET', '/prices', status=400, body=json.dumps({
+            'errorDetails': {'code': 'E0014', 'message': 'Invalid'}
+        }).encode('utf-8'))
+        with self.assertRaises(FuelCheckError) as cm:
+            self.client.get_fuel_prices()
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertEqual(cm.exception.error_code, 'E0014')
+
+    def test_stream(self) -> None:
+        prices = list(self.client.iter_fuel_prices())
+        self.assertEqual([p.price for p in prices], [146.9])
+
+    def test_connection_reused(self) -> None:
+        for _ in range(3):
+            self.client.get_fuel_prices_for_station(1)
+        self.client.get_fuel_prices()
+        list(self.client.iter_fuel_prices())
+        self.client.get_fuel_prices_for_station(1)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_connection_error(self) -> None:
+        client = FuelCheckClient(
+            base_url='http://127.0.0.1:{}'.format(unused_port()),
+            transport=self.transport)
+        with self.assertRaises(TransportError):
+            client.get_fuel_prices()
+        result = client.get_fuel_prices_for_stations([1, 2])
+        self.assertEqual(set(result.errors), {1, 2})
+
+
+class RequestsTransportTest(TransportTestMixin, unittest.TestCase):
+    def create_transport(self) -> Transport:
+        return RequestsTransport(max_retries=0)
+
+    def test_connection_error(self) -> None:
+        # requests raises its own connection errors.
+        client = FuelCheckClient(
+            base_url='http://127.0.0.1:{}'.format(unused_port()),
+            transport=self.transport)
+        result = client.get_fuel_prices_for_stations([1, 2])
+        self.assertEqual(set(result.errors), {1, 2})
+
+    def test_session_and_transport_are_exclusive(self) -> None:
+        assert isinstance(self.transport, RequestsTransport)
+        with self.assertRaises(ValueError):
+            FuelCheckClient(session=self.transport.session,
+                            transport=self.transport)
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class HttpxTransportTest(TransportTestMixin, unittest.TestCase):
+    def create_transport(self) -> Transport:
+        return HttpxTransport(max_retries=0)
+
+
+@unittest.skipIf(httpx is None or H2Server is None,
+                 'httpx and h2 are not installed')
+class HttpxHttp2TransportTest(TransportTestMixin, unittest.TestCase):
+    def create_server(self) -> Any:
+        return H2Server()
+
+    def create_transport(self) -> Transport:
+        self.http_versions: List[str] = []
+        # Cleartext HTTP/2 needs prior knowledge, so HTTP/1.1 is disabled.
+        self.httpx_client = httpx.Client(
+            http1=False, http2=True, event_hooks={'response': [
+                lambda response: self.http_versions.append(
+                    response.http_version)]})
+        self.addCleanup(self.httpx_client.close)
+        return HttpxTransport(client=self.httpx_client)
+
+    def test_http2(self) -> None:
+        self.client.get_fuel_prices()
+        self.assertEqual(self.http_versions, ['HTTP/2'])
+
+    def test_concurrent_requests_share_connection(self) -> None:
+        for code in range(1, 6):
+            self.server.add('GET', '/prices/station/{}'.format(code),
+                            {'prices': PRICES['prices']}, delay=0.05)
+        result = self.client.get_fuel_prices_for_stations(
+            range(1, 6), full_fetch_threshold=None)
+        self.assertEqual(list(result), [1, 2, 3, 4, 5])
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+
+class HttpClientTransportTest(TransportTestMixin, unittest.TestCase):
+    def create_transport(self) -> Transport:
+        return HttpClientTransport(max_retries=0)
+
+    def test_timeout_is_not_retried(self) -> None:
+        self.server.add('GET', '/prices/station/1', {'prices': []},
+                        delay=0.5)
+        transport = HttpClientTransport(max_retries=3)
+        with self.assertRaises(TransportError):
+            transport.request('GET', self.server.url + '/prices/station/1',
+                              {}, timeout=0.1)
+        transport.close()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unread_stream_is_not_reused(self) -> None:
+        self.server.add('GET', '/prices/station/1', body=b'x' * 100000)
+        response = self.transport.request(
+            'GET', self.server.url + '/prices/station/1', {}, stream=True)
+        next(response.iter_content(10))
+        response.close()
+        self.client.get_fuel_prices()
+        self.assertEqual(len(self.server.connections), 2)
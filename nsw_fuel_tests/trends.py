@@ -0,0 +1,90 @@
+import datetime
+import unittest
+
+from nsw_fuel import Period, Price, PriceHistory, Station
+from nsw_fuel.dto import GetFuelPricesResponse
+from nsw_fuel.trends import TrendEngine, np
+
+TODAY = datetime.date(2018, 6, 30)
+
+STATIONS = [
+    Station(id='A', brand='BP', code=1, name='A', address='A',
+            latitude=-33.9, longitude=151.1),
+    Station(id='B', brand='BP', code=2, name='B', address='B',
+            latitude=-33.91, longitude=151.11),
+    Station(id='C', brand='BP', code=3, name='C', address='C',
+            latitude=-32.0, longitude=150.0),
+]
+
+
+def price(station_code: int, value: float, *when: int) -> Price:
+    return Price(fuel_type='E10', price=value,
+                 last_updated=datetime.datetime(*when), price_unit=None,
+                 station_code=station_code)
+
+
+PRICES = [
+    price(1, 140.0, 2018, 6, 1, 8),
+    price(1, 152.0, 2018, 6, 29, 11),
+    price(1, 150.0, 2018, 6, 29, 10),
+    # Before the year covered, so in effect from its first day.
+    price(2, 130.0, 2017, 1, 1),
+    price(3, 100.0, 2018, 6, 30, 9),
+]
+
+NEAR = (-33.9, 151.1, 5.0)
+FAR = (-32.0, 150.0, 5.0)
+EMPTY = (0.0, 0.0, 1.0)
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class TrendEngineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = TrendEngine(STATIONS, PRICES, today=TODAY)
+
+    def test_variances(self) -> None:
+        trends = self.engine.trends_at(*NEAR, fuel_types=['E10'])
+        self.assertEqual(
+            {(v.fuel_type, v.period): v.price for v in trends.variances}, {
+                ('E10', Period.DAY): 0.0,
+                ('E10', Period.WEEK): 6.0,
+                ('E10', Period.MONTH): 11.0,
+                ('E10', Period.YEAR): 11.0,
+            })
+
+    def test_average_prices(self) -> None:
+        trends = self.engine.trends_at(*NEAR, fuel_types=['E10'])
+        month = [p for p in trends.average_prices if p.period == Period.MONTH]
+        self.assertEqual(len(month), 31)
+        self.assertEqual(month[0].captured, datetime.datetime(2018, 5, 31))
+        self.assertEqual(month[0].price, 130.0)
+        self.assertEqual(month[-2].price, 141.0)
+        self.assertEqual(month[-1].captured, datetime.datetime(2018, 6, 30))
+
+        year = [p for p in trends.average_prices if p.period == Period.YEAR]
+        self.assertEqual(len(year), 12)
+        self.assertEqual(year[0].captured, datetime.datetime(2017, 7, 1))
+        self.assertEqual(year[0].price, 130.0)
+        self.assertAlmostEqual(year[-1].price, 135.4)
+
+    def test_many_regions(self) -> None:
+        trends = self.engine.trends(
+            {'near': NEAR, 'far': FAR, 'empty': EMPTY}, ['E10', 'P98'])
+        self.assertEqual(trends['near'],
+                         self.engine.trends_at(*NEAR, fuel_types=['E10']))
+        # Only today has a price, so there is nothing to compare to.
+        self.assertEqual(trends['far'].variances, [])
+        self.assertEqual([(p.period, p.price)
+                          for p in trends['far'].average_prices],
+                         [(Period.MONTH, 100.0), (Period.YEAR, 100.0)])
+        self.assertEqual(trends['empty'].variances, [])
+        self.assertEqual(trends['empty'].average_prices, [])
+
+    def test_from_history(self) -> None:
+        with PriceHistory() as history:
+            history.add(GetFuelPricesResponse(STATIONS, PRICES))
+            engine = TrendEngine.from_history(
+                history, today=TODAY, lookback_days=600)
+        self.assertEqual(engine.fuel_types, ['E10'])
+        self.assertEqual(engine.trends_at(*NEAR, fuel_types=['E10']),
+                         self.engine.trends_at(*NEAR, fuel_types=['E10']))
@@ -1,18 +1,65 @@
 import datetime
 import json
 import os
+import pickle
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-from requests_mock import Mocker
+import requests
+from requests_mock import ANY, Mocker
 
-from nsw_fuel import FuelCheckClient, Period, FuelCheckError
+from nsw_fuel import (
+    FuelCheckClient, Period, FuelCheckError, FuelPrices, GetFuelPricesResponse,
+    GetReferenceDataResponse, Price)
 from nsw_fuel.client import API_URL_BASE
 
+from .helpers import load_fixture
+from .server import MockServer
+
 
 class FuelCheckClientTest(unittest.TestCase):
     def test_construction(self) -> None:
         FuelCheckClient()
 
+    def test_context_manager_closes_owned_session(self) -> None:
+        client = FuelCheckClient()
+        with mock.patch.object(client._transport.session, 'close') as close:
+            with client:
+                pass
+        close.assert_called_once_with()
+
+    def test_injected_session_is_not_closed(self) -> None:
+        session = requests.Session()
+        with mock.patch.object(session, 'close') as close:
+            with FuelCheckClient(session=session) as client:
+                self.assertIs(client._transport.session, session)
+        close.assert_not_called()
+
+    def test_connection_reused_across_requests(self) -> None:
+        with MockServer() as server:
+            server.add('GET', '/prices/station/100', {'prices': []})
+            server.add('GET', '/prices/station/200', {'prices': []})
+            with FuelCheckClient(base_url=server.url) as client:
+                client.get_fuel_prices_for_station(100)
+                client.get_fuel_prices_for_station(200)
+                client.get_fuel_prices_for_station(100)
+
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(len(server.connections), 1)
+
+    def test_gateway_errors_are_retried(self) -> None:
+        with MockServer() as server:
+            server.add('GET', '/prices', status=503, body=b'Unavailable')
+            client = FuelCheckClient(base_url=server.url, max_retries=2,
+                                     backoff_factor=0)
+            with self.assertRaises(FuelCheckError) as cm:
+                client.get_fuel_prices()
+            client.close()
+
+            self.assertEqual(str(cm.exception), 'Unavailable')
+            self.assertEqual(len(server.requests), 3)
+
     @Mocker()
     def test_get_fuel_prices(self, m: Mocker) -> None:
         fixture_path = os.path.join(os.path.dirname(__file__), 'fixtures/all_prices.json')
@@ -78,6 +125,64 @@ class FuelCheckClientTest(unittest.TestCase):
             second=4,
         ))
 
+    @Mocker()
+    def test_get_fuel_prices_for_stations(self, m: Mocker) -> None:
+        for code in (100, 101):
+            m.get('{}/prices/station/{}'.format(API_URL_BASE, code), json={
+                'prices': [{
+                    'fueltype': 'E10',
+                    'price': float(code),
+                    'lastupdated': '02/06/2018 02:03:04',
+                }]
+            })
+        m.get('{}/prices/station/102'.format(API_URL_BASE), status_code=400,
+              json={'errorDetails': {'code': 'E0014',
+                                     'message': 'Invalid station code'}})
+        client = FuelCheckClient()
+        result = client.get_fuel_prices_for_stations(
+            [101, 102, 100, 101], max_workers=3)
+        self.assertEqual(list(result), [101, 100])
+        self.assertEqual(result[100][0].price, 100.0)
+        self.assertEqual(result[101][0].price, 101.0)
+        self.assertEqual(list(result.errors), [102])
+        self.assertEqual(result.errors[102].error_code, 'E0014')
+        self.assertEqual(len(m.request_history), 3)
+
+    @Mocker()
+    def test_get_fuel_prices_for_stations_full_fetch(self, m: Mocker) -> None:
+        m.get('{}/prices'.format(API_URL_BASE), json={
+            'stations': [
+                {'brand': 'BP', 'code': code, 'name': 'BP {}'.format(code),
+                 'address': ''}
+                for code in (1, 2, 3, 4)
+            ],
+            'prices': [
+                {'stationcode': code, 'fueltype': 'E10', 'price': 150.0,
+                 'lastupdated': '02/06/2018 02:03:04'}
+                for code in (1, 2, 3)
+            ]
+        })
+        client = FuelCheckClient()
+        result = client.get_fuel_prices_for_stations(
+            [1, 3, 4, 5], full_fetch_threshold=3)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(list(result), [1, 3, 4])
+        self.assertEqual([p.station_code for p in result[1]], [1])
+        self.assertEqual(result[4], [])
+        self.assertEqual(list(result.errors), [5])
+        self.assertIsInstance(result.errors[5], FuelCheckError)
+
+    @Mocker()
+    def test_get_fuel_prices_for_stations_caps_workers(
+            self, m: Mocker) -> None:
+        m.get(ANY, json={'prices': []})
+        client = FuelCheckClient(pool_size=2)
+        with mock.patch('nsw_fuel.client.ThreadPoolExecutor',
+                        wraps=ThreadPoolExecutor) as executor:
+            client.get_fuel_prices_for_stations(
+                range(5), max_workers=8, full_fetch_threshold=None)
+        executor.assert_called_once_with(max_workers=2)
+
     @Mocker()
     def test_get_fuel_prices_within_radius(self, m: Mocker) -> None:
         m.post('{}/prices/nearby'.format(API_URL_BASE), json={
@@ -280,6 +385,8 @@ class FuelCheckClientTest(unittest.TestCase):
             self.assertEqual(response.fuel_types[0].code, 'E10')
             self.assertEqual(response.fuel_types[0].name, 'Ethanol 94')
             self.assertEqual(response.stations[0].name, 'Cool Fuel Brand Hurstville')
+            self.assertEqual(response.stations[0].latitude, -33.0)
+            self.assertEqual(response.stations[0].longitude, 151.0)
             self.assertEqual(response.trend_periods[0].period, 'Day')
             self.assertEqual(response.trend_periods[0].description, 'Description for day')
             self.assertEqual(response.sort_fields[0].code, 'Sort 1')
@@ -319,3 +426,167 @@ class FuelCheckClientTest(unittest.TestCase):
             client.get_reference_data()
 
         self.assertEqual(str(cm.exception), 'Internal Server Error.')
+
+
+class PriceTest(unittest.TestCase):
+    def _deserialize(self, lastupdated: str) -> Price:
+        return Price.deserialize({
+            'fueltype': 'E10',
+            'price': 146.9,
+            'lastupdated': lastupdated,
+        })
+
+    def test_deserialize_last_updated_formats(self) -> None:
+        expected = datetime.datetime(2018, 6, 2, 14, 3, 4)
+        self.assertEqual(
+            self._deserialize('02/06/2018 14:03:04').last_updated, expected)
+        self.assertEqual(
+            self._deserialize('2018-06-02 14:03:04').last_updated, expected)
+        self.assertEqual(
+            self._deserialize('2/6/2018 14:03:04').last_updated, expected)
+
+    def test_deserialize_invalid_last_updated(self) -> None:
+        self.assertIsNone(self._deserialize('31/02/2018 14:03:04').last_updated)
+        self.assertIsNone(self._deserialize('2018-06-02T14:03:04').last_updated)
+        self.assertIsNone(self._deserialize('yesterday').last_updated)
+
+    def test_deserialize_malformed_fixed_width_last_updated(self) -> None:
+        for value in ['02/06/2018 14-03-04', '02/06/2018 14:03-04',
+                      '02/06/2018 +1:03:04', '02/06/2018 0_:03:04',
+                      '02/06/2018 14:03: 4', '2018/06/02 14:03:04',
+                      '02-06-2018 14:03:04', '02/06/2018 14:03:60']:
+            with self.subTest(value=value):
+                self.assertIsNone(self._deserialize(value).last_updated)
+
+        # Left to strptime, which accepts them.
+        self.assertEqual(
+            self._deserialize('02/06/2018  1:03:04').last_updated,
+            datetime.datetime(2018, 6, 2, 1, 3, 4))
+
+    def test_value_semantics(self) -> None:
+        price = self._deserialize('02/06/2018 14:03:04')
+        same = self._deserialize('2018-06-02 14:03:04')
+        self.assertEqual(price, same)
+        self.assertEqual(hash(price), hash(same))
+        self.assertEqual(len({price, same}), 1)
+        self.assertNotEqual(price, self._deserialize('02/06/2018 14:03:05'))
+        self.assertEqual(pickle.loads(pickle.dumps(price)), price)
+
+    def test_immutable(self) -> None:
+        price = self._deserialize('02/06/2018 14:03:04')
+        with self.assertRaises(AttributeError):
+            price.price = 100.0  # type: ignore
+        with self.assertRaises(AttributeError):
+            price.extra = 1  # type: ignore
+        with self.assertRaises(AttributeError):
+            del price.fuel_type
+
+
+class LazyResponseTest(unittest.TestCase):
+    DATA = {
+        'stations': [{
+            'stationid': 'SAAAAAA',
+            'brand': 'Caltex',
+            'code': '1',
+            'name': 'Caltex Woolworths Hurstville',
+            'address': '1 Fake Street, Hurstville NSW 2220',
+            'location': {'latitude': -33.96, 'longitude': 151.1},
+        }],
+        'prices': [{
+            'stationcode': '1',
+            'fueltype': 'E10',
+            'price': 146.9,
+            'priceunit': 'litre',
+            'lastupdated': '02/06/2018 02:03:04',
+        }, {
+            'stationcode': '1',
+            'fueltype': 'P95',
+            'price': 150.0,
+            'lastupdated': 'yesterday',
+        }],
+    }
+
+    def test_matches_eager_response(self) -> None:
+        eager = GetFuelPricesResponse.deserialize(self.DATA)
+        lazy = GetFuelPricesResponse.deserialize(self.DATA, lazy=True)
+        self.assertEqual(len(lazy.prices), 2)
+        self.assertEqual(list(lazy.prices), eager.prices)
+        self.assertEqual(list(lazy.stations), eager.stations)
+        self.assertEqual(lazy.prices[-1:], eager.prices[-1:])
+
+    def test_only_eager_response_has_lists(self) -> None:
+        eager = GetFuelPricesResponse.deserialize(self.DATA)
+        lazy = GetFuelPricesResponse.deserialize(self.DATA, lazy=True)
+        self.assertIsInstance(eager.prices, list)
+        self.assertIsInstance(lazy, FuelPrices)
+        self.assertNotIsInstance(lazy, GetFuelPricesResponse)
+        self.assertEqual(lazy.prices_for(1), eager.prices_for(1))
+        self.assertEqual(hash(lazy.prices[0]), hash(eager.prices[0]))
+        self.assertIsInstance(lazy.prices[0], Price)
+
+    def test_builds_on_access(self) -> None:
+        lazy = GetFuelPricesResponse.deserialize(self.DATA, lazy=True)
+        with mock.patch('nsw_fuel.dto._parse_last_updated') as parse:
+            price = lazy.prices[0]
+            self.assertIs(lazy.prices[0], price)
+            self.assertEqual(price.price, 146.9)
+            self.assertEqual(price.station_code, 1)
+            parse.assert_not_called()
+
+        self.assertEqual(price.last_updated,
+                         datetime.datetime(2018, 6, 2, 2, 3, 4))
+        # Once parsed, fields no longer refer back to the raw JSON.
+        self.DATA['prices'][0]['price'] = 0
+        try:
+            self.assertEqual(price.price, 146.9)
+        finally:
+            self.DATA['prices'][0]['price'] = 146.9
+
+    def test_immutable_and_pickles_as_eager(self) -> None:
+        price = GetFuelPricesResponse.deserialize(
+            self.DATA, lazy=True).prices[0]
+        with self.assertRaises(AttributeError):
+            price.price = 100.0  # type: ignore
+        with self.assertRaises(AttributeError):
+            price.extra  # type: ignore
+        unpickled = pickle.loads(pickle.dumps(price))
+        self.assertIs(type(unpickled), Price)
+        self.assertEqual(unpickled, price)
+
+
+class ResponseIndexTest(unittest.TestCase):
+    def test_reference_data_indexes(self) -> None:
+        data = load_fixture('lovs.json')
+        data['stations']['items'][0]['stationid'] = 'SAAAAAA'
+        response = GetReferenceDataResponse.deserialize(data)
+        first, second = response.stations
+
+        self.assertIs(response.stations_by_code[2], second)
+        self.assertEqual(dict(response.stations_by_id), {'SAAAAAA': first})
+        self.assertEqual(response.stations_by_brand['Fake Fuel Brand'],
+                         (second,))
+        self.assertEqual(response.fuel_types_by_code['U91'].name,
+                         'Unleaded 91')
+        with self.assertRaises(TypeError):
+            response.stations_by_code[3] = first  # type: ignore
+
+    def test_search_stations(self) -> None:
+        response = GetReferenceDataResponse.deserialize(
+            load_fixture('lovs.json'))
+        first, second = response.stations
+        self.assertEqual(response.search_stations('KOG'), [second])
+        self.assertEqual(response.search_stations('fuel brand'),
+                         [first, second])
+        self.assertEqual(response.search_stations('  cool   fuel'), [first])
+        self.assertEqual(response.search_stations('ogarah'), [])
+        self.assertEqual(response.search_stations(''), [])
+
+    def test_prices_for(self) -> None:
+        response = GetFuelPricesResponse.deserialize(
+            load_fixture('all_prices.json'))
+        self.assertEqual([p.fuel_type for p in response.prices_for(1)],
+                         ['DL', 'E10', 'P95'])
+        self.assertEqual(len(response.prices_for(2)), 2)
+        self.assertEqual(response.prices_for(3), ())
+        with self.assertRaises(TypeError):
+            response._prices_by_station[3] = ()  # type: ignore
@@ -18,11 +18,17 @@ setup(
     url='https://github.com/nickw444/nsw-fuel-api-client',
     zip_safe=False,
     install_requires=['requests'],
+    extras_require={
+        'async': ['httpx'],
+        'http2': ['httpx[http2]'],
+        'orjson': ['orjson'],
+        'numpy': ['numpy'],
+    },
     classifiers=[
         'Intended Audience :: Developers',
         'Programming Language :: Python',
         'License :: OSI Approved :: MIT License',
     ],
     test_suite="nsw_fuel_tests",
-    tests_require=['requests-mock']
+    tests_require=['requests-mock', 'httpx', 'numpy']
 )